@@ -0,0 +1,173 @@
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+
+from reglas_limpieza import COLUMNAS_ECONOMIA, COLUMNAS_ESTILO_VIDA, tipo_tabla
+
+# --- CAPA DE DATOS LIMPIOS (02_limpios) ---
+# Los datos limpios se guardan en formato columnar Arrow IPC (Feather v2), sin
+# compresión para que las etapas siguientes puedan abrirlos con memory-map y
+# leer solo las columnas que usan. Es el mismo formato compacto que arma la
+# limpieza y que pasa de una etapa a otra: etiquetas canónicas como categóricas
+# ordenadas (códigos int8), Numero_Cuenta como entero con nulos (Int64) y las
+# medidas numéricas en float32. Si pyarrow no está instalado se usa CSV, y el CSV
+# también puede exportarse para análisis.
+#
+# Un archivo Feather no admite agregar filas en el lugar: para anexar (modo
+# incremental) se copian sus lotes tal cual, sin pasar por pandas, a un archivo
+# nuevo y detrás se escriben las filas nuevas.
+#
+# --- PUBLICACIÓN EN MEMORIA COMPARTIDA ---
+# En el modo memoria (remoto.py --memoria) los Feather limpios no se escriben
+# primero en 02_limpios: cada etapa los publica en un directorio de la corrida en
+# /dev/shm (memoria compartida; donde no existe, el temporal del sistema) y las
+# etapas siguientes los abren desde ahí con memory-map, sin pasar por el disco.
+# Las tablas Arrow de quien lee apuntan directamente a esas páginas. Copiar el
+# archivo publicado a 02_limpios queda para el planificador, en segundo plano
+# (persistir). La variable de entorno VARIABLE_MEMORIA dice a cada proceso qué
+# directorio usa la corrida; sin ella, todo se lee y escribe en 02_limpios.
+
+dir_limpios = '../data/02_limpios/'
+VARIABLE_MEMORIA = 'ANALISIS_DIR_MEMORIA'
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.feather as feather
+    FORMATO_PREDETERMINADO = 'feather'
+except ImportError:
+    pa = None
+    FORMATO_PREDETERMINADO = 'csv'
+
+EXTENSIONES = {'feather': 'feather', 'csv': 'csv'}
+
+# Tipo de cada columna limpia (vale para economía, estilo de vida y el combinado)
+TIPOS_ETIQUETAS = {columna: tipo_tabla(tabla)
+                   for columna, (_, tabla) in {**COLUMNAS_ECONOMIA, **COLUMNAS_ESTILO_VIDA}.items()}
+TIPOS_LIMPIOS = {
+    'Timestamp': 'datetime64[ns]',
+    'Numero_Cuenta': 'Int64',
+    **TIPOS_ETIQUETAS,
+    'Horas_Sueño': 'float32',
+    'Promedio_Escolar': 'float32',
+}
+# Decimales con los que se capturan las medidas (float32 no guarda 8.3 exacto)
+DECIMALES_MEDIDAS = {'Promedio_Escolar': 1}
+
+
+def ruta_limpio(nombre, formato=FORMATO_PREDETERMINADO):
+    return os.path.join(dir_limpios, f'{nombre}_limpio.{EXTENSIONES[formato]}')
+
+
+def crear_dir_memoria():
+    """Directorio nuevo en memoria compartida para publicar los Feather de una corrida."""
+    return tempfile.mkdtemp(prefix='analisis-', dir='/dev/shm' if os.path.isdir('/dev/shm') else None)
+
+
+def ruta_publicacion(ruta, dir_memoria=None):
+    """Dónde se publica un Feather limpio en el modo memoria (o `ruta` misma fuera de él)."""
+    dir_memoria = dir_memoria or os.environ.get(VARIABLE_MEMORIA)
+    if not dir_memoria or not ruta.endswith(f".{EXTENSIONES['feather']}"):
+        return ruta
+    return os.path.join(dir_memoria, os.path.basename(ruta))
+
+
+def ruta_vigente(ruta, dir_memoria=None):
+    """La copia publicada de `ruta` si esta corrida ya la publicó; si no, `ruta`."""
+    publicada = ruta_publicacion(ruta, dir_memoria)
+    return publicada if os.path.exists(publicada) else ruta
+
+
+def persistir(ruta, dir_memoria):
+    """Copia a `ruta` (02_limpios) lo publicado en memoria; devuelve `ruta`."""
+    temporal = f'{ruta}.parcial'
+    shutil.copyfile(ruta_publicacion(ruta, dir_memoria), temporal)
+    os.replace(temporal, ruta)
+    return ruta
+
+
+def aplicar_tipos(df, tipos=TIPOS_LIMPIOS):
+    """Convierte las columnas conocidas a sus tipos de la capa limpia."""
+    return df.astype({columna: tipo for columna, tipo in tipos.items() if columna in df.columns})
+
+
+class EscritorLimpio:
+    """Escribe un conjunto limpio por partes (un bloque a la vez) en los formatos pedidos.
+
+    Con `anexar`, las partes se agregan después de las filas que ya tiene el conjunto.
+    """
+
+    def __init__(self, nombre, formatos=(FORMATO_PREDETERMINADO,), anexar=False):
+        self.rutas = {formato: ruta_limpio(nombre, formato) for formato in formatos}
+        # En el modo memoria el Feather se escribe donde se publica, no en 02_limpios
+        self._destinos = {formato: ruta_publicacion(ruta) for formato, ruta in self.rutas.items()}
+        self._escritor_ipc = None
+        self._csv_iniciado = False
+        os.makedirs(dir_limpios, exist_ok=True)
+        if anexar:
+            self._copiar_existente()
+
+    def _copiar_existente(self):
+        if 'feather' in self.rutas:
+            existente = feather.read_table(ruta_vigente(self.rutas['feather']), memory_map=True)
+            self._abrir_ipc(existente.schema)
+            self._escritor_ipc.write_table(existente)
+        if 'csv' in self.rutas:
+            shutil.copyfile(self.rutas['csv'], self._temporal('csv'))
+            self._csv_iniciado = True
+
+    def _abrir_ipc(self, esquema):
+        self._esquema = esquema
+        self._escritor_ipc = pa.ipc.new_file(self._temporal('feather'), esquema)
+
+    def escribir(self, df):
+        df = aplicar_tipos(df)
+        if 'feather' in self.rutas:
+            tabla = pa.Table.from_pandas(df, preserve_index=False)
+            if self._escritor_ipc is None:
+                self._abrir_ipc(tabla.schema)
+            self._escritor_ipc.write_table(tabla.cast(self._esquema))
+        if 'csv' in self.rutas:
+            df.to_csv(self._temporal('csv'), mode='a' if self._csv_iniciado else 'w',
+                      header=not self._csv_iniciado, index=False)
+            self._csv_iniciado = True
+
+    def cerrar(self):
+        # Se escribe a temporales y se reemplaza al final: nunca queda un archivo a medias
+        if self._escritor_ipc is not None:
+            self._escritor_ipc.close()
+        for formato, destino in self._destinos.items():
+            os.replace(self._temporal(formato), destino)
+
+    def _temporal(self, formato):
+        return f'{self._destinos[formato]}.parcial'
+
+
+def guardar_limpio(df, nombre, formatos=(FORMATO_PREDETERMINADO,), anexar=False):
+    """Guarda un DataFrame limpio completo (o lo anexa al existente); devuelve las rutas escritas."""
+    escritor = EscritorLimpio(nombre, formatos, anexar)
+    escritor.escribir(df)
+    escritor.cerrar()
+    return list(escritor.rutas.values())
+
+
+def leer_limpio(nombre, columnas=None, filtro=None):
+    """Lee un conjunto limpio (solo `columnas` si se indican) con sus tipos canónicos.
+
+    `filtro` ({columna: valor}) deja solo esas filas. En Feather se filtra sobre el
+    archivo mapeado en memoria y solo las filas elegidas pasan a pandas: varios
+    procesos pueden leer cada uno su parte del mismo archivo sin copiarlo entero.
+    """
+    ruta = ruta_vigente(ruta_limpio(nombre, 'feather'))
+    if pa is not None and os.path.exists(ruta):
+        tabla = feather.read_table(ruta, memory_map=True)
+        for columna, valor in (filtro or {}).items():
+            tabla = tabla.filter(pc.equal(tabla[columna], pa.scalar(valor)))
+        return (tabla.select(columnas) if columnas else tabla).to_pandas()
+    leidas = list(dict.fromkeys(columnas + list(filtro or {}))) if columnas else None
+    df = aplicar_tipos(pd.read_csv(ruta_limpio(nombre, 'csv'), usecols=leidas))
+    for columna, valor in (filtro or {}).items():
+        df = df[df[columna] == valor].reset_index(drop=True)
+    return df[columnas] if columnas else df
@@ -0,0 +1,229 @@
+import argparse
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+from almacen import leer_limpio
+from cubo import dir_kpis
+from instrumentacion import medir
+from renderizado import renderizar
+
+try:
+    from scipy.special import gammaincc
+except ImportError:  # scipy es opcional: sin él se usa la implementación de abajo
+    gammaincc = None
+
+# --- MATRIZ DE ASOCIACIONES DEL COMBINADO ---
+# Mide la asociación entre todos los pares de columnas categóricas del combinado:
+# tabla de contingencia, chi-cuadrada, V de Cramér y p-valor por par, y el promedio
+# de cada medida (Promedio_Escolar, Horas_Sueño) en cada categoría de cada columna.
+#
+# Todo sale de una sola pasada sobre los códigos de las categorías: cada bloque de
+# filas se convierte en una matriz indicadora (una columna por categoría de cada
+# columna) y su producto X.T @ X contiene a la vez las tablas de contingencia de
+# todos los pares; X.T @ medidas da las sumas por categoría. Así el costo no crece
+# con la cantidad de pares (pd.crosstab por par sí). Las respuestas nulas de una
+# columna quedan fuera solo de los pares de esa columna.
+
+output_dir_graficos = '../resultados/'
+ruta_pares = os.path.join(dir_kpis, 'asociaciones_pares.csv')
+ruta_promedios = os.path.join(dir_kpis, 'asociaciones_promedios.csv')
+ruta_contingencias = os.path.join(dir_kpis, 'asociaciones_contingencias.csv')
+
+MEDIDAS = ['Promedio_Escolar', 'Horas_Sueño']
+FILAS_POR_BLOQUE = 100_000
+
+
+def columnas_categoricas(df):
+    return [columna for columna in df.columns if isinstance(df[columna].dtype, pd.CategoricalDtype)]
+
+
+# --- Conteos en una pasada ---
+
+def acumular(df, columnas, medidas):
+    """Matriz de conteos conjuntos (categoría x categoría) y sumas/no nulos de cada medida por categoría.
+
+    Devuelve (conteos, sumas, no_nulos, desplazamientos); las categorías de
+    `columnas[i]` ocupan las posiciones desplazamientos[i]:desplazamientos[i + 1].
+    """
+    niveles = [len(df[columna].cat.categories) for columna in columnas]
+    desplazamientos = np.concatenate(([0], np.cumsum(niveles)))
+    total_niveles = desplazamientos[-1]
+    conteos = np.zeros((total_niveles, total_niveles), dtype='int64')
+    sumas = np.zeros((total_niveles, len(medidas)))
+    no_nulos = np.zeros((total_niveles, len(medidas)), dtype='int64')
+
+    for inicio in range(0, len(df), FILAS_POR_BLOQUE):
+        bloque = df.iloc[inicio:inicio + FILAS_POR_BLOQUE]
+        filas = np.arange(len(bloque))
+        # float32 es exacto para conteos de hasta 2**24 filas por bloque
+        indicadora = np.zeros((len(bloque), total_niveles), dtype='float32')
+        for columna, desplazamiento in zip(columnas, desplazamientos):
+            codigos = bloque[columna].cat.codes.to_numpy()
+            validos = codigos >= 0
+            indicadora[filas[validos], desplazamiento + codigos[validos]] = 1
+        conteos += (indicadora.T @ indicadora).round().astype('int64')
+        if medidas:
+            valores = bloque[medidas].to_numpy(dtype='float64')
+            presentes = ~np.isnan(valores)
+            sumas += indicadora.T.astype('float64') @ np.where(presentes, valores, 0.0)
+            no_nulos += (indicadora.T @ presentes.astype('float32')).round().astype('int64')
+    return conteos, sumas, no_nulos, desplazamientos
+
+
+# --- Estadísticos por par ---
+
+def _gamma_q(a, x):
+    """Gamma incompleta regularizada superior Q(a, x) (serie o fracción continua)."""
+    if x <= 0:
+        return 1.0
+    prefactor = math.exp(-x + a * math.log(x) - math.lgamma(a))
+    if x < a + 1:
+        termino = suma = 1.0 / a
+        denominador = a
+        for _ in range(10_000):
+            denominador += 1
+            termino *= x / denominador
+            suma += termino
+            if abs(termino) < abs(suma) * 1e-15:
+                break
+        return max(0.0, 1.0 - suma * prefactor)
+    # Fracción continua de Lentz
+    minimo = 1e-300
+    b = x + 1 - a
+    c, d = 1 / minimo, 1 / b
+    resultado = d
+    for i in range(1, 10_000):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = minimo if abs(d) < minimo else d
+        c = b + an / c
+        c = minimo if abs(c) < minimo else c
+        d = 1 / d
+        resultado *= d * c
+        if abs(d * c - 1) < 1e-15:
+            break
+    return prefactor * resultado
+
+
+def p_valor_chi2(chi2, grados):
+    """P(X >= chi2) para una chi-cuadrada con `grados` grados de libertad."""
+    if gammaincc is not None:
+        return float(gammaincc(grados / 2, chi2 / 2))
+    return _gamma_q(grados / 2, chi2 / 2)
+
+
+def estadisticos(tabla):
+    """Chi-cuadrada, grados de libertad, V de Cramér y p-valor de una tabla de contingencia."""
+    # Las categorías que nadie eligió no aportan grados de libertad
+    tabla = tabla[tabla.sum(axis=1) > 0][:, tabla.sum(axis=0) > 0]
+    n = tabla.sum()
+    filas, columnas = tabla.shape
+    grados = (filas - 1) * (columnas - 1)
+    if n == 0 or grados == 0:
+        return {'n': int(n), 'chi2': np.nan, 'grados_libertad': grados, 'v_cramer': np.nan, 'p_valor': np.nan}
+    esperados = np.outer(tabla.sum(axis=1), tabla.sum(axis=0)) / n
+    chi2 = float(((tabla - esperados) ** 2 / esperados).sum())
+    return {
+        'n': int(n),
+        'chi2': chi2,
+        'grados_libertad': grados,
+        'v_cramer': math.sqrt(chi2 / n / min(filas - 1, columnas - 1)),
+        'p_valor': p_valor_chi2(chi2, grados),
+    }
+
+
+def asociaciones(df, medidas=MEDIDAS):
+    """Pares ordenados por V de Cramér, promedios por categoría y contingencias (formato largo)."""
+    columnas = columnas_categoricas(df)
+    medidas = [medida for medida in medidas if medida in df.columns]
+    conteos, sumas, no_nulos, desplazamientos = acumular(df, columnas, medidas)
+    categorias = [list(df[columna].cat.categories) for columna in columnas]
+    bloques = [slice(desplazamientos[i], desplazamientos[i + 1]) for i in range(len(columnas))]
+
+    pares, contingencias = [], []
+    for i, columna_a in enumerate(columnas):
+        for j in range(i + 1, len(columnas)):
+            tabla = conteos[bloques[i], bloques[j]]
+            pares.append({'columna_a': columna_a, 'columna_b': columnas[j], **estadisticos(tabla)})
+            filas, cols = np.nonzero(tabla)
+            contingencias += [(columna_a, categorias[i][f], columnas[j], categorias[j][c], int(tabla[f, c]))
+                              for f, c in zip(filas, cols)]
+    pares = (pd.DataFrame(pares).sort_values('v_cramer', ascending=False, kind='stable', na_position='last')
+             .reset_index(drop=True))
+
+    # La diagonal de la matriz de conteos es cuántas respuestas tiene cada categoría
+    promedios = pd.DataFrame({
+        'columna': np.repeat(columnas, [len(c) for c in categorias]),
+        'categoria': [categoria for lista in categorias for categoria in lista],
+        'n': np.diag(conteos),
+    })
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for posicion, medida in enumerate(medidas):
+            promedios[medida] = sumas[:, posicion] / no_nulos[:, posicion]
+    promedios = promedios[promedios['n'] > 0].reset_index(drop=True)
+    contingencias = pd.DataFrame(contingencias, columns=['columna_a', 'categoria_a', 'columna_b', 'categoria_b', 'n'])
+    return pares, promedios, contingencias
+
+
+def matriz_v(pares):
+    """Matriz simétrica de V de Cramér, con las columnas más asociadas primero (sin las que no tienen V)."""
+    columnas = list(dict.fromkeys(pares['columna_a'].tolist() + pares['columna_b'].tolist()))
+    matriz = pd.DataFrame(np.nan, index=columnas, columns=columnas)
+    for par in pares.itertuples():
+        matriz.loc[par.columna_a, par.columna_b] = matriz.loc[par.columna_b, par.columna_a] = par.v_cramer
+    # Una columna con una sola respuesta (p. ej. la del grupo en un reporte por grupo) no tiene V
+    matriz = matriz.dropna(how='all').dropna(axis=1, how='all')
+    orden = matriz.max(axis=1).sort_values(ascending=False, kind='stable').index
+    return matriz.loc[orden, orden]
+
+
+def trabajos_graficos(pares, dir_graficos=output_dir_graficos):
+    return [
+        ('mapa_asociaciones', matriz_v(pares),
+         os.path.join(dir_graficos, 'asociaciones_v_cramer.png'),
+         {'titulo': 'Asociación entre las Respuestas de Ambas Encuestas (V de Cramér)', 'dpi': 150}),
+    ]
+
+
+def ejecutar():
+    """Etapa de asociaciones: todos los pares de columnas categóricas del combinado.
+
+    Devuelve {'salidas': rutas de los pares, promedios y contingencias, 'graficos': trabajos de renderizado}.
+    """
+    os.makedirs(output_dir_graficos, exist_ok=True)
+    os.makedirs(dir_kpis, exist_ok=True)
+    try:
+        with medir('lectura') as paso:
+            df = leer_limpio('combinado')
+            paso['filas_salida'] = len(df)
+    except FileNotFoundError:
+        print("Error: No se encontró el combinado; ejecuta primero analizar_combinado.py.")
+        raise
+
+    with medir('asociaciones', filas_entrada=len(df)) as paso:
+        pares, promedios, contingencias = asociaciones(df)
+        paso['filas_salida'] = len(pares)
+    with medir('escritura', filas_entrada=len(pares)):
+        pares.to_csv(ruta_pares, index=False)
+        promedios.to_csv(ruta_promedios, index=False)
+        contingencias.to_csv(ruta_contingencias, index=False)
+
+    print(f"\n{len(pares)} pares de columnas evaluados. Asociaciones más fuertes:")
+    print(pares.head().to_string(index=False, columns=['columna_a', 'columna_b', 'v_cramer', 'p_valor']))
+    trabajos = trabajos_graficos(pares)
+    return {'salidas': [ruta_pares, ruta_promedios, ruta_contingencias], 'graficos': trabajos}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Asociaciones entre todas las columnas categóricas del combinado.')
+    parser.add_argument('--solo-datos', action='store_true',
+                        help='Guarda los pares, promedios y contingencias sin dibujar el heatmap.')
+    args = parser.parse_args()
+    resultado = ejecutar()
+    if not args.solo_datos:
+        renderizar(resultado['graficos'])
+    print(f"\nResultados en '{dir_kpis}' y '{output_dir_graficos}'.")
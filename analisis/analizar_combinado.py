@@ -1,109 +1,233 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import re
 import os
+import argparse
+from almacen import FORMATO_PREDETERMINADO, guardar_limpio, leer_limpio, ruta_limpio
+from cubo import (calcular_cubo, conteo, dir_kpis, guardar_cubo, leer_cubo, orden_completo, ruta_cubo, sumar_cubos,
+                  tabla_cruzada, total)
+from incremental import base_de, firma, marca_agua, marca_de, marca_limpio, marcas_vigentes, posteriores, registrar_marcas
+from union import (POLITICA_PREDETERMINADA, POLITICAS_DUPLICADOS, IndiceClaves, armar, claves_de, depurar,
+                   guardar_informe, informe_claves, particiones_necesarias, unir_particionado)
+from instrumentacion import medir
+from remuestreo import guardar_intervalos, intervalo_conteo, intervalo_promedio
+from renderizado import renderizar
 
 # ---  DEFINICIÓN DE RUTAS ---
 output_dir_graficos = '../resultados/'
 output_dir_datos = '../data/02_limpios/'
+ruta_informe_union = os.path.join(dir_kpis, 'combinado_union.json')
 
-os.makedirs(output_dir_graficos, exist_ok=True)
-os.makedirs(output_dir_datos, exist_ok=True)
-print(f"Los gráficos se guardarán en: '{output_dir_graficos}'")
-
-# ---  CARGA DE DATOS LIMPIOS ---
-path_bienestar = '../data/02_limpios/estilo_vida_limpio.csv'
-path_economia = '../data/02_limpios/economia_limpio.csv'
-
-try:
-    df_bienestar = pd.read_csv(path_bienestar)
-    df_economia = pd.read_csv(path_economia)
-    print("Archivos CSV limpios cargados exitosamente.")
-except FileNotFoundError:
-    print(f"Error: No se encontraron los archivos limpios en '{output_dir_datos}'.")
-    print("Asegúrate de ejecutar primero los scripts de análisis individuales.")
-    exit()
-
-# --- UNIÓN Y CÁLCULO DE KPIS ---
-df_completo = pd.merge(df_bienestar, df_economia, on='Numero_Cuenta', how='inner')
-print(f"Unión exitosa. Se encontraron {len(df_completo)} estudiantes en ambas encuestas.")
-
-# Guardamos el CSV limpio en la carpeta data/02_limpios/
-ruta_limpia = os.path.join(output_dir_datos, 'combinado_limpio.csv')
-df_completo.to_csv(ruta_limpia, index=False)
-print(f"\nDataFrame limpio guardado en: '{ruta_limpia}'")
-
-# --- CONFIGURACIÓN DE GRÁFICOS ---
-sns.set_style("whitegrid")
-plt.rcParams['font.family'] = 'sans-serif'
-
-# --- GRÁFICO 1: Heatmap ---
-contingency_table = pd.crosstab(df_completo['Situacion_Economica'], df_completo['Nivel_Ansiedad'])
-ansiedad_orden = ['Ninguno', 'Leve', 'Moderada', 'Grave']
-situacion_orden = ['Buena', 'Estable', 'Regular', 'Complicada/Mala']
-contingency_table = contingency_table.reindex(columns=ansiedad_orden, index=situacion_orden, fill_value=0)
-plt.figure(figsize=(12, 8))
-sns.heatmap(contingency_table, annot=True, fmt='d', cmap='YlGnBu')
-plt.title('Relación entre Situación Económica y Nivel de Ansiedad', fontsize=16, fontweight='bold')
-plt.ylabel('Situación Económica', fontsize=12)
-plt.xlabel('Nivel de Ansiedad', fontsize=12)
-plt.tight_layout()
-plt.savefig(os.path.join(output_dir_graficos, 'combinado_heatmap_economia_vs_ansiedad.png'), dpi=150)
-plt.close() 
-
-# --- GRÁFICO 2: Promedio vs. Estrés Financiero ---
-promedio_por_estres = df_completo.groupby('Sentimiento_Financiero')['Promedio_Escolar'].mean().sort_values(ascending=False)
-fig, ax = plt.subplots(figsize=(12, 7))
-sns.barplot(x=promedio_por_estres.index, 
-            y=promedio_por_estres.values, 
-            palette='viridis', 
-            ax=ax,
-            hue=promedio_por_estres.index, 
-            legend=False)
-ax.set_title('El Estrés Financiero se Correlaciona con un Menor Promedio', fontsize=16, fontweight='bold', pad=25)
-fig.suptitle('Promedio escolar según el sentimiento generado por las finanzas personales', fontsize=12, color='gray')
-ax.set_ylabel('Promedio Escolar (GPA)', fontsize=12, fontweight='bold')
-ax.set_xlabel('')
-ax.bar_label(ax.containers[0], fmt='%.2f', size=12, fontweight='bold')
-sns.despine(left=True, bottom=True)
-if not promedio_por_estres.empty:
-    plt.ylim(promedio_por_estres.min() * 0.95, promedio_por_estres.max() * 1.02)
-plt.tight_layout(rect=[0, 0.05, 1, 0.95])
-plt.figtext(0.99, 0.01, f'Fuente: Encuesta Estudiantil (N={len(df_completo)})', horizontalalignment='right', size=8, color='grey')
-plt.savefig(os.path.join(output_dir_graficos, 'combinado_promedio_vs_estres.png'), dpi=150)
-plt.close()
-
-# --- GRÁFICO 3: Déficit de Energía por Gasto ---
-df_sin_energia = df_completo[df_completo['Siente_Energia'] == 'No']
-energia_por_gasto = df_sin_energia['Gasto_Principal'].value_counts().sort_values()
-fig, ax = plt.subplots(figsize=(12, 7))
-ax.barh(energia_por_gasto.index, energia_por_gasto.values, color=sns.color_palette('viridis', len(energia_por_gasto)))
-ax.set_title('El Transporte es el Gasto que Más Drena la Energía', fontsize=16, fontweight='bold', pad=25)
-fig.suptitle('Principal gasto de los estudiantes que reportan sentirse sin energía', fontsize=12, color='gray')
-ax.set_xlabel('Cantidad de Estudiantes sin Energía', fontsize=12, fontweight='bold')
-ax.set_ylabel('')
-ax.bar_label(ax.containers[0], size=12, padding=5)
-sns.despine(left=True, bottom=True)
-plt.tight_layout(rect=[0, 0.05, 1, 0.95])
-plt.figtext(0.99, 0.01, f'Fuente: Encuesta Estudiantil (N={len(df_sin_energia)})', horizontalalignment='right', size=8, color='grey')
-plt.savefig(os.path.join(output_dir_graficos, 'combinado_energia_vs_gasto.png'), dpi=150)
-plt.close()
-
-# --- GRÁFICO 4: Desglose de Ansiedad Exacerbada ---
-df_ansiedad_financiera = df_completo[df_completo['Sentimiento_Financiero'] == 'Ansiedad/Preocupación']
-ansiedad_counts = df_ansiedad_financiera['Nivel_Ansiedad'].value_counts().reindex(ansiedad_orden).fillna(0) 
-fig, ax = plt.subplots(figsize=(12, 7))
-ax.barh(ansiedad_counts.index, ansiedad_counts.values, color=sns.color_palette('viridis_r', len(ansiedad_counts)))
-ax.set_title('Ansiedad Moderada a Grave Domina en Estudiantes con Estrés Financiero', fontsize=16, fontweight='bold', pad=25)
-fig.suptitle('Desglose del nivel de ansiedad para el grupo con preocupación financiera', fontsize=12, color='gray')
-ax.set_xlabel('Cantidad de Estudiantes', fontsize=12, fontweight='bold')
-ax.set_ylabel('')
-ax.bar_label(ax.containers[0], size=12, padding=5)
-sns.despine(left=True, bottom=True)
-plt.tight_layout(rect=[0, 0.05, 1, 0.95])
-plt.figtext(0.99, 0.01, f'Fuente: Encuesta Estudiantil (N={len(df_ansiedad_financiera)})', horizontalalignment='right', size=8, color='grey')
-plt.savefig(os.path.join(output_dir_graficos, 'combinado_ansiedad_exacerbada.png'), dpi=150)
-plt.close()
-
-print("\nAnálisis completo y generación de imágenes finalizados.")
+FUENTES = ('estilo_vida', 'economia')
+
+# --- CUBO DE KPIs ---
+# Todas las tablas de los gráficos salen de un cubo sobre estas dimensiones
+# (ver cubo.py). Promedio_Escolar (con un decimal) es una dimensión más y no una
+# medida: así el cubo guarda la distribución de los promedios y no solo su suma,
+# que es lo que necesita el intervalo de confianza del promedio (remuestreo.py).
+
+DIMENSIONES_CUBO = ['Situacion_Economica', 'Nivel_Ansiedad', 'Sentimiento_Financiero',
+                    'Siente_Energia', 'Gasto_Principal', 'Promedio_Escolar']
+
+def agregar_para_graficos(df_completo):
+    return calcular_cubo(df_completo, DIMENSIONES_CUBO)
+
+# --- GENERACIÓN DE GRÁFICOS ---
+
+def trabajos_graficos(cubo, dir_graficos=output_dir_graficos):
+    # Aquí solo se leen del cubo las tablas de cada gráfico; el dibujo son trabajos
+    # (tipo, datos, ruta, estilo) de graficos.py que corren en el pool de renderizado.py.
+    # Cada KPI lleva su intervalo de confianza bootstrap (remuestreo.py). Las
+    # categorías fuera de los órdenes de abajo van al final: ninguna se descarta.
+    ansiedad_orden = ['Ninguno', 'Leve', 'Moderada', 'Grave']
+    situacion_orden = ['Buena', 'Estable', 'Regular', 'Complicada', 'Mala']
+
+    # --- GRÁFICO 1: Heatmap ---
+    contingency_table = tabla_cruzada(cubo, 'Situacion_Economica', 'Nivel_Ansiedad')
+    contingency_table = contingency_table.reindex(columns=orden_completo(ansiedad_orden, contingency_table.columns),
+                                                  index=orden_completo(situacion_orden, contingency_table.index),
+                                                  fill_value=0)
+    intervalos_tabla = intervalo_conteo(cubo, ['Situacion_Economica', 'Nivel_Ansiedad'])
+
+    # --- GRÁFICO 2: Promedio vs. Estrés Financiero ---
+    intervalos_promedio = intervalo_promedio(cubo, 'Sentimiento_Financiero', 'Promedio_Escolar')
+    promedio_por_estres = intervalos_promedio['estimacion'].sort_values(ascending=False)
+
+    # --- GRÁFICO 3: Déficit de Energía por Gasto ---
+    sin_energia = {'Siente_Energia': 'No'}
+    energia_por_gasto = conteo(cubo, 'Gasto_Principal', sin_energia).sort_values(kind='stable')
+
+    # --- GRÁFICO 4: Desglose de Ansiedad Exacerbada ---
+    ansiedad_financiera = {'Sentimiento_Financiero': 'Ansiedad/Preocupación'}
+    ansiedad_counts = conteo(cubo, 'Nivel_Ansiedad', ansiedad_financiera)
+    ansiedad_counts = ansiedad_counts.reindex(orden_completo(ansiedad_orden, ansiedad_counts.index), fill_value=0)
+
+    return [
+        ('mapa_calor', contingency_table,
+         os.path.join(dir_graficos, 'combinado_heatmap_economia_vs_ansiedad.png'),
+         {'titulo': 'Relación entre Situación Económica y Nivel de Ansiedad',
+          'etiqueta_x': 'Nivel de Ansiedad', 'etiqueta_y': 'Situación Económica', 'dpi': 150,
+          'intervalos': intervalos_tabla}),
+        ('barras_promedio', promedio_por_estres,
+         os.path.join(dir_graficos, 'combinado_promedio_vs_estres.png'),
+         {'titulo': 'El Estrés Financiero se Correlaciona con un Menor Promedio',
+          'subtitulo': 'Promedio escolar según el sentimiento generado por las finanzas personales',
+          'etiqueta_y': 'Promedio Escolar (GPA)', 'n': total(cubo), 'dpi': 150,
+          'intervalos': intervalos_promedio}),
+        ('barras_horizontales', energia_por_gasto,
+         os.path.join(dir_graficos, 'combinado_energia_vs_gasto.png'),
+         {'titulo': 'El Transporte es el Gasto que Más Drena la Energía',
+          'subtitulo': 'Principal gasto de los estudiantes que reportan sentirse sin energía',
+          'etiqueta_x': 'Cantidad de Estudiantes sin Energía', 'n': total(cubo, sin_energia),
+          'paleta': 'viridis', 'dpi': 150, 'intervalos': intervalo_conteo(cubo, 'Gasto_Principal', sin_energia)}),
+        ('barras_horizontales', ansiedad_counts,
+         os.path.join(dir_graficos, 'combinado_ansiedad_exacerbada.png'),
+         {'titulo': 'Ansiedad Moderada a Grave Domina en Estudiantes con Estrés Financiero',
+          'subtitulo': 'Desglose del nivel de ansiedad para el grupo con preocupación financiera',
+          'etiqueta_x': 'Cantidad de Estudiantes', 'n': total(cubo, ansiedad_financiera),
+          'paleta': 'viridis_r', 'dpi': 150,
+          'intervalos': intervalo_conteo(cubo, 'Nivel_Ansiedad', ansiedad_financiera)}),
+    ]
+
+
+def repite_cuentas(df, nuevas):
+    # ¿Alguna respuesta nueva es de una cuenta que ya había contestado?
+    claves = df['Numero_Cuenta']
+    return claves[nuevas].dropna().isin(claves[~nuevas].dropna()).any()
+
+
+def ejecutar(exportar_csv=False, incremental=False, duplicados=POLITICA_PREDETERMINADA, particiones=None):
+    """Etapa final: une las dos encuestas limpias, guarda el combinado y prepara sus gráficos.
+
+    La unión es por Numero_Cuenta; `duplicados` decide qué respuesta queda cuando
+    un estudiante contestó más de una vez (ver union.py). Si los datos no caben en
+    memoria (o se piden `particiones`), se unen por particiones en disco.
+
+    Con `incremental`, solo se unen las respuestas posteriores a las marcas de agua
+    de la última corrida (ver incremental.py) y se anexan al combinado existente.
+
+    Devuelve {'salidas': rutas de los datos combinados, del cubo, del informe de la
+    unión y de los intervalos de confianza de los KPIs, 'graficos': trabajos de renderizado}.
+    """
+    os.makedirs(output_dir_graficos, exist_ok=True)
+    os.makedirs(output_dir_datos, exist_ok=True)
+    print(f"Los gráficos se guardarán en: '{output_dir_graficos}'")
+
+    formatos = list(dict.fromkeys([FORMATO_PREDETERMINADO] + (['csv'] if exportar_csv else [])))
+    # Si alguna encuesta se volvió a limpiar completa, su 'base' cambia y el combinado también se rehace
+    firma_actual = firma(cubo=DIMENSIONES_CUBO, formatos=formatos, duplicados=duplicados,
+                         bases={fuente: base_de(fuente) for fuente in FUENTES})
+    particiones = particiones or particiones_necesarias(FUENTES)
+    registro = None
+    if incremental and particiones > 1:
+        print("Los datos no caben en memoria; se rehace la unión completa por particiones.")
+    elif incremental:
+        salidas = [ruta_limpio('combinado', formato) for formato in formatos] + [ruta_cubo('combinado')]
+        registro = marcas_vigentes('combinado', firma_actual, salidas)
+        if registro is None:
+            print("No hay una corrida anterior compatible; se une todo de nuevo.")
+
+    # --- UNIÓN POR PARTICIONES (DATOS QUE NO CABEN EN MEMORIA) ---
+    if particiones > 1:
+        print(f"Unión por particiones en disco ({particiones} particiones).")
+        rutas_limpias, cubos, informe = unir_particionado(*FUENTES, duplicados, particiones,
+                                                          agregar_para_graficos, formatos, 'combinado')
+        cubo = sumar_cubos(*cubos)
+        marcas = {fuente: marca_limpio(fuente) for fuente in FUENTES}
+        return _finalizar(rutas_limpias, cubo, informe, firma_actual, marcas, None)
+
+    # ---  CARGA DE DATOS LIMPIOS ---
+    # Se leen en formato columnar, con sus categorías y tipos ya definidos (sin re-parsear)
+    try:
+        with medir('lectura') as paso:
+            df_bienestar = leer_limpio('estilo_vida')
+            df_economia = leer_limpio('economia')
+            paso['filas_salida'] = len(df_bienestar) + len(df_economia)
+        print("Archivos limpios cargados exitosamente.")
+    except FileNotFoundError:
+        print(f"Error: No se encontraron los archivos limpios en '{output_dir_datos}'.")
+        print("Asegúrate de ejecutar primero los scripts de análisis individuales.")
+        raise
+    marcas = {'estilo_vida': marca_agua(df_bienestar['Timestamp']), 'economia': marca_agua(df_economia['Timestamp'])}
+
+    if registro is not None:
+        bienestar_nuevo = posteriores(df_bienestar['Timestamp'], marca_de(registro, 'estilo_vida'))
+        economia_nueva = posteriores(df_economia['Timestamp'], marca_de(registro, 'economia'))
+        # Una respuesta repetida puede reemplazar a otra ya unida: ahí no alcanza con anexar
+        if duplicados != 'todas' and (repite_cuentas(df_bienestar, bienestar_nuevo)
+                                      or repite_cuentas(df_economia, economia_nueva)):
+            print("Llegaron respuestas repetidas de cuentas ya unidas; se une todo de nuevo.")
+            registro = None
+
+    # --- UNIÓN Y CÁLCULO DE KPIS ---
+    with medir('union', filas_entrada=len(df_bienestar) + len(df_economia)) as paso:
+        df_bienestar, informe_bienestar = depurar(df_bienestar, duplicados)
+        df_economia, informe_economia = depurar(df_economia, duplicados)
+        # Cada lado se indexa una vez: para emparejar y para el informe de claves
+        indice_bienestar = IndiceClaves(claves_de(df_bienestar))
+        indice_economia = IndiceClaves(claves_de(df_economia))
+        posiciones_bienestar, posiciones_economia = indice_economia.emparejar(claves_de(df_bienestar))
+        informe = {'estilo_vida': informe_bienestar, 'economia': informe_economia,
+                   **informe_claves(indice_bienestar, indice_economia, FUENTES),
+                   'filas_unidas': len(posiciones_bienestar)}
+        if registro is not None:
+            # Solo se arman los pares con al menos una respuesta nueva; los demás ya estaban unidos
+            nuevos = (bienestar_nuevo[df_bienestar.index].to_numpy()[posiciones_bienestar]
+                      | economia_nueva[df_economia.index].to_numpy()[posiciones_economia])
+            posiciones_bienestar, posiciones_economia = posiciones_bienestar[nuevos], posiciones_economia[nuevos]
+        df_unido = armar(df_bienestar, df_economia, posiciones_bienestar, posiciones_economia)
+        paso['filas_salida'] = len(df_unido)
+
+    if registro is not None:
+        print(f"Modo incremental: {len(df_unido)} estudiantes nuevos en ambas encuestas.")
+        with medir('escritura', filas_entrada=len(df_unido)):
+            rutas_limpias = guardar_limpio(df_unido, 'combinado', formatos, anexar=True)
+        with medir('cubo', filas_entrada=len(df_unido)):
+            cubo = sumar_cubos(leer_cubo('combinado'), agregar_para_graficos(df_unido))
+    else:
+        print(f"Unión exitosa. Se encontraron {len(df_unido)} estudiantes en ambas encuestas.")
+        # Guardamos los datos combinados en la carpeta data/02_limpios/
+        with medir('escritura', filas_entrada=len(df_unido)):
+            rutas_limpias = guardar_limpio(df_unido, 'combinado', formatos)
+        # Los KPIs se agregan una sola vez
+        with medir('cubo', filas_entrada=len(df_unido)):
+            cubo = agregar_para_graficos(df_unido)
+    print(f"\nDataFrame limpio guardado en '{output_dir_datos}' ({', '.join(formatos)})")
+    return _finalizar(rutas_limpias, cubo, informe, firma_actual, marcas, registro)
+
+
+def _finalizar(rutas_limpias, cubo, informe, firma_actual, marcas, registro):
+    print(f"Cuentas: {informe['coincidencias']} en ambas encuestas, {informe['solo_estilo_vida']} solo en "
+          f"estilo de vida, {informe['solo_economia']} solo en economía; respuestas repetidas descartadas: "
+          f"{informe['estilo_vida']['duplicados']} y {informe['economia']['duplicados']}.")
+    ruta_informe = guardar_informe(informe, ruta_informe_union)
+    ruta_kpis = guardar_cubo(cubo, 'combinado')
+    registrar_marcas('combinado', firma_actual, marcas, registro and registro['base'])
+
+    # Los gráficos se devuelven como trabajos para el pool de renderizado
+    with medir('intervalos'):
+        trabajos = trabajos_graficos(cubo)
+        ruta_intervalos = guardar_intervalos(trabajos, 'combinado')
+    print(f"\nUnión finalizada; {len(trabajos)} gráficos listos para renderizar.")
+    return {'salidas': rutas_limpias + [ruta_kpis, ruta_informe, ruta_intervalos], 'graficos': trabajos}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Une las dos encuestas limpias y genera los gráficos combinados.')
+    parser.add_argument('--exportar-csv', action='store_true',
+                        help='Además del formato columnar, guarda una copia CSV del combinado.')
+    parser.add_argument('--duplicados', choices=POLITICAS_DUPLICADOS, default=POLITICA_PREDETERMINADA,
+                        help='Qué respuesta queda si un estudiante contestó más de una vez (por defecto, la última).')
+    parser.add_argument('--particiones', type=int,
+                        help='Une por particiones en disco (por defecto, solo si los datos no caben en memoria).')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Une solo las respuestas posteriores al último Timestamp procesado.')
+    parser.add_argument('--solo-datos', action='store_true',
+                        help='Guarda los datos limpios y los KPIs sin dibujar gráficos (no carga matplotlib).')
+    parser.add_argument('--solo-graficos', action='store_true',
+                        help='Vuelve a dibujar los gráficos desde el cubo guardado, sin volver a unir los datos.')
+    args = parser.parse_args()
+    if args.solo_graficos:
+        renderizar(trabajos_graficos(leer_cubo('combinado')))
+    else:
+        resultado = ejecutar(args.exportar_csv, args.incremental, args.duplicados, args.particiones)
+        if not args.solo_datos:
+            renderizar(resultado['graficos'])
+    print("\nAnálisis completo y generación de imágenes finalizados.")
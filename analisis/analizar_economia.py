@@ -1,230 +1,187 @@
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import re
 import os
-
-print("\nIniciando el script de Análisis de Economía Estudiantil")
+import argparse
+from reglas_limpieza import COLUMNAS_ECONOMIA
+from ingesta import convertir_timestamp, leer_encuesta, ruta_encuesta
+from normalizacion import guardar_cache, normalizar_columna, version_tabla
+from bloques import TAMANO_BLOQUE, limpiar_en_bloques
+from almacen import FORMATO_PREDETERMINADO, TIPOS_LIMPIOS, EscritorLimpio, guardar_limpio, ruta_limpio
+from cubo import calcular_cubo, conteo, guardar_cubo, leer_cubo, ruta_cubo
+from remuestreo import guardar_intervalos, intervalo_conteo, intervalo_proporcion
+from incremental import firma, limpiar_incremental, marca_de, marcas_vigentes, marca_limpio, registrar_marcas
+from instrumentacion import medir
+from renderizado import renderizar
 
 # Directorio para guardar los gráficos
 output_dir_graficos = '../resultados/'
-# Directorio para guardar el CSV limpio
+# Directorio para guardar los datos limpios
 output_dir_datos = '../data/02_limpios/'
 
-os.makedirs(output_dir_graficos, exist_ok=True)
-os.makedirs(output_dir_datos, exist_ok=True)
-print(f"Los gráficos se guardarán en: '{output_dir_graficos}'")
-print(f"Los datos limpios se guardarán en: '{output_dir_datos}'")
-
-# --- LIMPIEZA Y PREPARACIÓN DE DATOS ---
-
-file_path = '../data/01_crudos/encuesta_economia.csv'
-try:
-    df_raw = pd.read_csv(file_path, encoding='utf-8-sig')
-    print("Archivo CSV original cargado exitosamente.")
-except FileNotFoundError:
-    print(f"Error: No se encontró el archivo '{file_path}'.")
-    print("Asegúrate de tener la estructura de carpetas: data/01_crudos/encuesta_economia.csv")
-    exit()
-
-# Renombramos las columnas para que sean más fáciles de manejar
-column_names = [
-    'Timestamp', 'Numero_Cuenta', 'Semestre', 'Carrera',
-    'Situacion_Economica', 'Fuente_Ingresos', 'Gasto_Dificil',
-    'Impacto_Economico', 'Equilibrio_Trabajo_Estudio', 'Renuncia_Oportunidad',
-    'Sentimiento_Finanzas', 'Estrategias_Dinero', 'Apoyo_Economico_Deseado',
-    'Otro_Tipo_Ayuda', 'Utilidad_Educacion_Financiera',
-    'Situacion_Economica_Ideal_5_Anios', 'Momento_Mayor_Presion',
-    'Accion_Gasto_Inesperado', 'Recibio_Orientacion_Financiera', 'Consejo_Estudiantes'
-]
-df_raw.columns = column_names
-
 # --- Funciones de Limpieza de Datos ---
 
-def limpiar_situacion_economica(texto):
-    if not isinstance(texto, str): return "No especificado"
-    texto = texto.lower()
-    if 'buena' in texto: return 'Buena'
-    if 'estable' in texto: return 'Estable'
-    if 'regular' in texto: return 'Regular'
-    if 'complicada' in texto: return 'Complicada'
-    if 'mala' in texto: return 'Mala'
-    return 'Otra'
-
-def limpiar_sentimientos(texto):
-    if not isinstance(texto, str): return "No especificado"
-    texto = texto.lower()
-    if any(palabra in texto for palabra in ['ansiedad', 'preocupación', 'preocupacion']):
-        return 'Ansiedad/Preocupación'
-    if 'tranquilidad' in texto: return 'Tranquilidad'
-    if 'indiferencia' in texto or 'indiferente' in texto: 
-        return 'Indiferencia'
-    if 'un poco de todo' in texto:
-        return 'Mixto'
-    if 'yo no tengo finanzas' in texto:
-        return 'Indiferencia'
-    return 'Otro'
-
-def limpiar_gasto_dificil(texto):
-    if not isinstance(texto, str): return "No especificado"
-    texto = texto.lower()
-    if 'transporte' in texto or 'pasajes' in texto: return 'Transporte'
-    if 'comida' in texto or 'lunch' in texto or 'despensa' in texto: return 'Comida/Alimentos'
-    if 'renta' in texto: return 'Renta'
-    if 'ninguno' in texto: return 'Ninguno'
-    return 'Otros'
-
-def limpiar_renuncia_oportunidad(texto):
-    if not isinstance(texto, str): return "No especificado"
-    texto = texto.lower().strip()
-    if texto.startswith('si') or texto.startswith('sí'): return 'Sí'
-    if texto.startswith('no') or texto.startswith('ninguna') or texto.startswith('ninguno') or 'creo que no' in texto:
-        return 'No'
-    # Si no es 'Sí' o 'No', lo dejamos como No especificado para revisión
-    return 'No especificado'
-
-def limpiar_impacto_academico(texto):
-    if not isinstance(texto, str): return "No especificado"
-    texto = texto.lower()
-    palabras_alto = [
-        'alto', 'mucho', 'bastante', 'muy', 'buen', 
-        'afecta', 'importante', 'todos los aspectos', 
-        'hambre', 'desconcentro', 'cansado'
-    ]
-    if any(palabra in texto for palabra in palabras_alto): 
-        return 'Alto'
-    if 'medio' in texto or 'media' in texto: 
-        return 'Medio'
-    if 'poco' in texto:
-        return 'Bajo'
-    palabras_ninguno = ['ninguno', 'no tiene', 'ninguna', 'bien,', 'no tendria que ver']
-    if any(palabra in texto for palabra in palabras_ninguno):
-        return 'Ninguno'
-    return 'No especificado'
-
-# --- Aplicamos Limpieza y Guardar CSV ---
-
-datos_limpios = {
-    'Numero_Cuenta': pd.to_numeric(df_raw['Numero_Cuenta'], errors='coerce'),
-    'Situacion_Economica': df_raw['Situacion_Economica'].apply(limpiar_situacion_economica),
-    'Sentimiento_Financiero': df_raw['Sentimiento_Finanzas'].apply(limpiar_sentimientos),
-    'Gasto_Principal': df_raw['Gasto_Dificil'].apply(limpiar_gasto_dificil),
-    'Renuncia_Oportunidad': df_raw['Renuncia_Oportunidad'].apply(limpiar_renuncia_oportunidad),
-    'Impacto_Academico': df_raw['Impacto_Economico'].apply(limpiar_impacto_academico)
-}
-df = pd.DataFrame(datos_limpios)
-print("Datos limpiados y estandarizados.")
-
-print("\n--- Visualización del DataFrame Limpio (primeras filas) ---")
-print(df.head())
-
-# Guardamos el CSV limpio en la carpeta data/02_limpios/
-ruta_limpia = os.path.join(output_dir_datos, 'economia_limpio.csv')
-df.to_csv(ruta_limpia, index=False)
-print(f"\nDataFrame limpio guardado en: '{ruta_limpia}'")
+def limpiar(df_raw, cache_normalizacion):
+    # Tipos fijos: así todos los bloques del modo streaming escriben lo mismo
+    datos_limpios = {
+        'Timestamp': convertir_timestamp(df_raw['Timestamp']),
+        'Numero_Cuenta': pd.to_numeric(df_raw['Numero_Cuenta'], errors='coerce').astype('Int64'),
+    }
+    # Las reglas de palabras clave viven en reglas_limpieza.py; cada valor distinto
+    # se clasifica una sola vez y se reutiliza la caché de corridas anteriores
+    for columna_limpia, (columna_cruda, tabla) in COLUMNAS_ECONOMIA.items():
+        with medir(columna_limpia, filas_entrada=len(df_raw)):
+            datos_limpios[columna_limpia] = normalizar_columna(df_raw[columna_cruda], tabla, cache_normalizacion)
+    return pd.DataFrame(datos_limpios)
+
+def agregar_para_graficos(df):
+    # Cubo de KPIs con todas las columnas limpias; se puede sumar entre bloques
+    return calcular_cubo(df, COLUMNAS_ECONOMIA)
+
+def ordenar_conteos(conteos_columna):
+    return conteos_columna.sort_values(ascending=False, kind='stable')
 
 # --- Generación de Gráficos ---
 
-sns.set_style("whitegrid")
-plt.rcParams['font.family'] = 'sans-serif'
-
-# --- Gráfico Situación Económica ---
-plt.figure(figsize=(10, 7))
-ax1 = sns.countplot(y=df['Situacion_Economica'], 
-                    order=df['Situacion_Economica'].value_counts().index, 
-                    palette='coolwarm', 
-                    hue=df['Situacion_Economica'], 
-                    legend=False)
-plt.title('Distribución de la Situación Económica', fontsize=16, fontweight='bold')
-plt.xlabel('Cantidad de Estudiantes', fontsize=12)
-plt.ylabel('Situación Percibida', fontsize=12)
-for p in ax1.patches:
-    if p.get_width() > 0:
-        ax1.annotate(f'{int(p.get_width())}', 
-                     (p.get_width(), p.get_y() + p.get_height() / 2.), 
-                     ha='left', va='center', 
-                     xytext=(5, 0), textcoords='offset points')
-plt.tight_layout()
-plt.savefig(os.path.join(output_dir_graficos, 'economia_situacion.png'))
-plt.close()
-
-# --- Gráfico Sentimiento Financiero ---
-plt.figure(figsize=(10, 10))
-sentimiento_counts = df['Sentimiento_Financiero'].value_counts()
-total_counts = sentimiento_counts.sum()
-
-def mostrar_porcentaje_y_valor(pct):
-    valor = int(round(pct/100 * total_counts))
-    return f'{pct:.1f}%\n({valor:d})'
-
-plt.pie(sentimiento_counts, 
-        labels=sentimiento_counts.index, 
-        autopct=mostrar_porcentaje_y_valor,
-        startangle=140, 
-        colors=sns.color_palette('coolwarm'))
-plt.title('Sentimientos Generados por las Finanzas', fontsize=16, fontweight='bold')
-plt.ylabel('')
-plt.savefig(os.path.join(output_dir_graficos, 'economia_sentimiento.png'))
-plt.close()
-
-# --- Gráfico Gasto Principal ---
-plt.figure(figsize=(10, 7))
-ax3 = sns.countplot(x=df['Gasto_Principal'], 
-                    order=df['Gasto_Principal'].value_counts().index, 
-                    palette='coolwarm', 
-                    hue=df['Gasto_Principal'], 
-                    legend=False)
-plt.title('Gastos Mensuales Más Difíciles de Cubrir', fontsize=16, fontweight='bold')
-plt.xlabel('Tipo de Gasto', fontsize=12)
-plt.ylabel('Cantidad de Estudiantes', fontsize=12)
-for p in ax3.patches:
-    if p.get_height() > 0:
-        ax3.annotate(f'{int(p.get_height())}', 
-                     (p.get_x() + p.get_width() / 2., p.get_height()), 
-                     ha='center', va='center', 
-                     xytext=(0, 10), textcoords='offset points')
-plt.tight_layout()
-plt.savefig(os.path.join(output_dir_graficos, 'economia_gasto.png'))
-plt.close()
-
-# --- Gráfico Renuncia a Oportunidades ---
-plt.figure(figsize=(10, 10))
-renuncia_counts = df['Renuncia_Oportunidad'].value_counts()
-total_renuncia = renuncia_counts.sum()
-
-def mostrar_porcentaje_y_valor_renuncia(pct):
-    valor = int(round(pct/100 * total_renuncia))
-    return f'{pct:.1f}%\n({valor:d})'
-
-plt.pie(renuncia_counts, 
-    labels=renuncia_counts.index, 
-    autopct=mostrar_porcentaje_y_valor_renuncia, 
-    startangle=90, 
-    colors=['#ff9999','#66b3ff']) # Colores personalizados
-plt.title('Renuncia a Oportunidades por Motivos Económicos', fontsize=16, fontweight='bold')
-plt.ylabel('')
-plt.savefig(os.path.join(output_dir_graficos, 'economia_renuncia.png'))
-plt.close()
-
-# --- Gráfico Impacto Académico ---
-plt.figure(figsize=(10, 7))
-ax5 = sns.countplot(x=df['Impacto_Academico'], 
-                    order=df['Impacto_Academico'].value_counts().index, 
-                    palette='coolwarm', 
-                    hue=df['Impacto_Academico'], 
-                    legend=False)
-plt.title('Impacto Económico en el Desempeño Académico', fontsize=16, fontweight='bold')
-plt.xlabel('Nivel de Impacto Percibido', fontsize=12)
-plt.ylabel('Cantidad de Estudiantes', fontsize=12)
-for p in ax5.patches:
-    if p.get_height() > 0:
-        ax5.annotate(f'{int(p.get_height())}', 
-                     (p.get_x() + p.get_width() / 2., p.get_height()), 
-                     ha='center', va='center', 
-                     xytext=(0, 10), textcoords='offset points')
-plt.tight_layout()
-plt.savefig(os.path.join(output_dir_graficos, 'economia_impacto.png'))
-plt.close()
-
-print("\nAnálisis finalizado con éxito.")
-print(f"Revisa la carpeta '{output_dir_graficos}' para ver gráficos generados.")
\ No newline at end of file
+def trabajos_graficos(cubo, dir_graficos=output_dir_graficos):
+    # Cada gráfico es un trabajo (tipo, datos, ruta, estilo) de graficos.py; se
+    # dibujan en paralelo en el pool de renderizado.py. Los datos salen del cubo, con
+    # su intervalo de confianza bootstrap (remuestreo.py): de conteos en las barras y
+    # de proporciones en los pasteles.
+    conteos = {columna: conteo(cubo, columna) for columna in COLUMNAS_ECONOMIA}
+    return [
+        ('barras_conteo', ordenar_conteos(conteos['Situacion_Economica']),
+         os.path.join(dir_graficos, 'economia_situacion.png'),
+         {'titulo': 'Distribución de la Situación Económica', 'horizontal': True,
+          'etiqueta_x': 'Cantidad de Estudiantes', 'etiqueta_y': 'Situación Percibida',
+          'intervalos': intervalo_conteo(cubo, 'Situacion_Economica')}),
+        ('pastel', ordenar_conteos(conteos['Sentimiento_Financiero']),
+         os.path.join(dir_graficos, 'economia_sentimiento.png'),
+         {'titulo': 'Sentimientos Generados por las Finanzas', 'colores': 'coolwarm', 'angulo_inicio': 140,
+          'intervalos': intervalo_proporcion(cubo, 'Sentimiento_Financiero')}),
+        ('barras_conteo', ordenar_conteos(conteos['Gasto_Principal']),
+         os.path.join(dir_graficos, 'economia_gasto.png'),
+         {'titulo': 'Gastos Mensuales Más Difíciles de Cubrir',
+          'etiqueta_x': 'Tipo de Gasto', 'etiqueta_y': 'Cantidad de Estudiantes',
+          'intervalos': intervalo_conteo(cubo, 'Gasto_Principal')}),
+        ('pastel', ordenar_conteos(conteos['Renuncia_Oportunidad']),
+         os.path.join(dir_graficos, 'economia_renuncia.png'),
+         {'titulo': 'Renuncia a Oportunidades por Motivos Económicos',
+          'colores': ['#ff9999', '#66b3ff'], 'angulo_inicio': 90,
+          'intervalos': intervalo_proporcion(cubo, 'Renuncia_Oportunidad')}),
+        ('barras_conteo', ordenar_conteos(conteos['Impacto_Academico']),
+         os.path.join(dir_graficos, 'economia_impacto.png'),
+         {'titulo': 'Impacto Económico en el Desempeño Académico',
+          'etiqueta_x': 'Nivel de Impacto Percibido', 'etiqueta_y': 'Cantidad de Estudiantes',
+          'intervalos': intervalo_conteo(cubo, 'Impacto_Academico')}),
+    ]
+
+
+def ejecutar(streaming=False, tamano_bloque=TAMANO_BLOQUE, exportar_csv=False, incremental=False):
+    """Etapa completa: limpia la encuesta de economía, guarda los datos limpios y prepara sus gráficos.
+
+    Con `incremental`, solo se limpian las respuestas posteriores a la última marca
+    de agua (ver incremental.py) y se anexan a lo que ya estaba limpio.
+
+    Devuelve {'salidas': rutas de los datos limpios, del cubo y de los intervalos de
+    confianza de los KPIs, 'graficos': trabajos de renderizado}.
+    """
+    print("\nIniciando el script de Análisis de Economía Estudiantil")
+
+    os.makedirs(output_dir_graficos, exist_ok=True)
+    os.makedirs(output_dir_datos, exist_ok=True)
+    print(f"Los gráficos se guardarán en: '{output_dir_graficos}'")
+    print(f"Los datos limpios se guardarán en: '{output_dir_datos}'")
+
+    # --- LIMPIEZA Y PREPARACIÓN DE DATOS ---
+
+    file_path = ruta_encuesta('economia')
+    # Formato columnar (Feather) por defecto; CSV opcional para quien lo quiera abrir a mano
+    formatos = list(dict.fromkeys([FORMATO_PREDETERMINADO] + (['csv'] if exportar_csv else [])))
+    rutas_limpias = [ruta_limpio('economia', formato) for formato in formatos]
+    cache_normalizacion = {}
+    # Si cambia una regla, el cubo, los formatos o los tipos, lo ya limpio no sirve de base
+    firma_actual = firma(reglas={tabla: version_tabla(tabla) for _, tabla in COLUMNAS_ECONOMIA.values()},
+                         cubo=list(COLUMNAS_ECONOMIA), formatos=formatos,
+                         tipos=TIPOS_LIMPIOS)
+    registro = None
+    if incremental:
+        registro = marcas_vigentes('economia', firma_actual, rutas_limpias + [ruta_cubo('economia')])
+        if registro is None:
+            print("No hay una corrida anterior compatible; se limpia la encuesta completa.")
+    try:
+        if registro is not None:
+            marca = marca_de(registro, 'economia')
+            print(f"Modo incremental: solo respuestas posteriores a {marca[0]}.")
+            cubo, filas, primeras_filas = limpiar_incremental(
+                'economia', lambda bloque: limpiar(bloque, cache_normalizacion),
+                agregar_para_graficos, formatos, marca, tamano_bloque)
+            print(f"{filas} respuestas nuevas limpiadas y anexadas.")
+        elif streaming:
+            print(f"Modo streaming: bloques de {tamano_bloque} filas.")
+            cubo, filas, primeras_filas = limpiar_en_bloques(
+                'economia', lambda bloque: limpiar(bloque, cache_normalizacion),
+                agregar_para_graficos, EscritorLimpio('economia', formatos), tamano_bloque)
+            print(f"Datos limpiados y estandarizados ({filas} filas).")
+        else:
+            # Solo se leen las columnas que usa la limpieza, ya con sus nombres canónicos
+            # (el esquema de cada encuesta vive en ingesta.py)
+            with medir('lectura') as paso:
+                df_raw = leer_encuesta('economia', ruta=file_path)
+                paso['filas_salida'] = len(df_raw)
+            print("Archivo CSV original cargado exitosamente.")
+            with medir('limpieza', filas_entrada=len(df_raw)) as paso:
+                df = limpiar(df_raw, cache_normalizacion)
+                paso['filas_salida'] = len(df)
+            print("Datos limpiados y estandarizados.")
+            primeras_filas = df.head()
+            with medir('cubo', filas_entrada=len(df)) as paso:
+                cubo = agregar_para_graficos(df)
+                paso['filas_salida'] = len(cubo)
+            # Guardamos los datos limpios en la carpeta data/02_limpios/
+            with medir('escritura', filas_entrada=len(df)):
+                guardar_limpio(df, 'economia', formatos)
+    except FileNotFoundError:
+        print(f"Error: No se encontró el archivo '{file_path}'.")
+        print("Asegúrate de tener la estructura de carpetas: data/01_crudos/encuesta_economia.csv")
+        raise
+    guardar_cache(cache_normalizacion)
+    ruta_kpis = guardar_cubo(cubo, 'economia')
+    registrar_marcas('economia', firma_actual, {'economia': marca_limpio('economia')},
+                     registro and registro['base'])
+
+    print("\n--- Visualización del DataFrame Limpio (primeras filas) ---")
+    print(primeras_filas)
+    print(f"\nDataFrame limpio guardado en '{output_dir_datos}' ({', '.join(formatos)})")
+
+    # --- Generación de Gráficos ---
+    # Los gráficos no se dibujan aquí: se devuelven como trabajos para que quien
+    # corre la etapa los mande al pool de renderizado sin esperar a que terminen
+    with medir('intervalos'):
+        trabajos = trabajos_graficos(cubo)
+        ruta_intervalos = guardar_intervalos(trabajos, 'economia')
+    print(f"\nLimpieza finalizada; {len(trabajos)} gráficos listos para renderizar.")
+    return {'salidas': rutas_limpias + [ruta_kpis, ruta_intervalos], 'graficos': trabajos}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Limpieza y gráficos de la encuesta de economía.')
+    parser.add_argument('--streaming', action='store_true',
+                        help='Limpia el CSV crudo por bloques para que la memoria no dependa del tamaño del archivo.')
+    parser.add_argument('--tamano-bloque', type=int, default=TAMANO_BLOQUE,
+                        help=f'Filas por bloque en modo streaming (por defecto {TAMANO_BLOQUE}).')
+    parser.add_argument('--exportar-csv', action='store_true',
+                        help='Además del formato columnar, guarda una copia CSV de los datos limpios.')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Limpia solo las respuestas posteriores al último Timestamp procesado.')
+    parser.add_argument('--solo-datos', action='store_true',
+                        help='Guarda los datos limpios y los KPIs sin dibujar gráficos (no carga matplotlib).')
+    parser.add_argument('--solo-graficos', action='store_true',
+                        help='Vuelve a dibujar los gráficos desde el cubo guardado, sin limpiar de nuevo.')
+    args = parser.parse_args()
+    if args.solo_graficos:
+        renderizar(trabajos_graficos(leer_cubo('economia')))
+    else:
+        resultado = ejecutar(args.streaming, args.tamano_bloque, args.exportar_csv, args.incremental)
+        if not args.solo_datos:
+            renderizar(resultado['graficos'])
+    print("\nAnálisis finalizado con éxito.")
+    print(f"Revisa la carpeta '{output_dir_graficos}' para ver gráficos generados.")
@@ -1,208 +1,196 @@
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import re
 import os
-
-print("\nIniciando el script de Análisis de Estilo de Vida...")
+import argparse
+from reglas_limpieza import COLUMNAS_ESTILO_VIDA
+from ingesta import convertir_timestamp, leer_encuesta, ruta_encuesta
+from normalizacion import guardar_cache, normalizar_columna, version_tabla
+from bloques import TAMANO_BLOQUE, limpiar_en_bloques
+from almacen import FORMATO_PREDETERMINADO, TIPOS_LIMPIOS, EscritorLimpio, guardar_limpio, ruta_limpio
+from cubo import calcular_cubo, conteo, guardar_cubo, leer_cubo, orden_completo, ruta_cubo
+from incremental import firma, limpiar_incremental, marca_de, marcas_vigentes, marca_limpio, registrar_marcas
+from instrumentacion import medir
+from remuestreo import guardar_intervalos, intervalo_conteo, intervalo_mediana, intervalo_proporcion
+from renderizado import renderizar
 
 # Directorio para guardar los gráficos
 output_dir_graficos = '../resultados/'
-# Directorio para guardar el CSV limpio
+# Directorio para guardar los datos limpios
 output_dir_datos = '../data/02_limpios/'
 
-os.makedirs(output_dir_graficos, exist_ok=True)
-os.makedirs(output_dir_datos, exist_ok=True)
-print(f"Los gráficos se guardarán en: '{output_dir_graficos}'")
-print(f"Los datos limpios se guardarán en: '{output_dir_datos}'")
-
-# --- LIMPIEZA Y PREPARACIÓN DE DATOS ---
-
-file_path = '../data/01_crudos/encuesta_estilo_vida.csv'
-try:
-    df_raw = pd.read_csv(file_path, encoding='utf-8-sig') 
-    print("Archivo CSV original cargado exitosamente.")
-except FileNotFoundError:
-    print(f"Error: No se encontró el archivo '{file_path}'.")
-    print("Asegúrate de tener la estructura de carpetas: data/01_crudos/encuesta_estilo_vida.csv")
-    exit()
-
-# Renombramos las columnas
-column_names = [
-    'Timestamp', 'Numero_Cuenta', 'Dias_Ejercicio', 'Actividad_Recreativa',
-    'Comidas_Dia', 'Toma_Alcohol', 'Horas_Sueño', 'Area_Trabajo', 'Edad',
-    'Sexo', 'Nivel_Ansiedad', 'Vivienda', 'Tiene_Beca', 'Horas_Pantalla',
-    'Ingresos_Mensuales', 'Siente_Energia', 'Promedio_Escolar', 'Es_Regular',
-    'Ayuda_Psicologica', 'Tiene_Pareja', 'Alguien_Depende_Economicamente'
-]
-df_raw.columns = column_names
-
 # --- Funciones de Limpieza de Datos ---
 
-def limpiar_texto_general(texto):
-    if isinstance(texto, str):
-        texto = texto.replace('\xa0', ' ')  
-        texto = texto.replace('\t', ' ') 
-        return texto.strip().lower()
-    if pd.isna(texto): 
-        return None
-    return texto
-
-def limpiar_ansiedad(texto):
-    texto = limpiar_texto_general(texto)
-    if not texto or pd.isna(texto):
-        return "No especificado"
-    kw_grave = ['grave']
-    if any(palabra in texto for palabra in kw_grave):
-        return 'Grave'
-    kw_moderada = ['moderada', 'social', 'moderado']
-    if any(palabra in texto for palabra in kw_moderada):
-        return 'Moderada'
-    kw_leve = ['leve']
-    if any(palabra in texto for palabra in kw_leve):
-        return 'Leve'
-    kw_ninguno = ['ninguno', 'ninguna']
-    if any(palabra in texto for palabra in kw_ninguno):
-        return 'Ninguno'
-    return 'No especificado'
-
-def limpiar_sexo(texto):
-    texto = limpiar_texto_general(texto)
-    if not texto: return "No especificado"
-    if texto.startswith('f'): return 'Femenino'
-    if texto.startswith('m') or texto.startswith('h'): return 'Masculino'
-    return 'No especificado'
-
-def limpiar_si_no_robusto(texto):
-    texto = limpiar_texto_general(texto)
-    if not texto or pd.isna(texto):
-        return "No especificado"
-    kw_si = ['si', 'sí', 'sip']
-    if any(palabra in texto for palabra in kw_si):
-        return 'Sí'
-    kw_no = ['no', 'nop', 'ninguna']
-    if any(palabra in texto for palabra in kw_no):
-        return 'No'
-    if 'mas o menos' in texto:
-        return 'A veces' 
-    return 'No especificado'
-
-# --- Aplicamos Limpieza y Guardar CSV ---
-
-datos_limpios = {
-    'Numero_Cuenta': pd.to_numeric(df_raw['Numero_Cuenta'], errors='coerce'),
-    'Sexo': df_raw['Sexo'].apply(limpiar_sexo),
-    'Nivel_Ansiedad': df_raw['Nivel_Ansiedad'].apply(limpiar_ansiedad),
-    'Tiene_Beca': df_raw['Tiene_Beca'].apply(limpiar_si_no_robusto),
-    'Siente_Energia': df_raw['Siente_Energia'].apply(limpiar_si_no_robusto),
-    'Horas_Sueño': pd.to_numeric(df_raw['Horas_Sueño'], errors='coerce'),
-    'Promedio_Escolar': pd.to_numeric(df_raw['Promedio_Escolar'], errors='coerce').round(1)
-}
-df = pd.DataFrame(datos_limpios)
-print("Datos limpiados y estandarizados.")
-
-print("\n--- Visualización del DataFrame Limpio (primeras filas) ---")
-print(df.head())
-
-ruta_limpia = os.path.join(output_dir_datos, 'estilo_vida_limpio.csv')
-df.to_csv(ruta_limpia, index=False)
-print(f"\nDataFrame limpio guardado en: '{ruta_limpia}'")
+def limpiar(df_raw, cache_normalizacion):
+    # Tipos fijos: así todos los bloques del modo streaming escriben lo mismo
+    datos_limpios = {
+        'Timestamp': convertir_timestamp(df_raw['Timestamp']),
+        'Numero_Cuenta': pd.to_numeric(df_raw['Numero_Cuenta'], errors='coerce').astype('Int64'),
+    }
+    # Las reglas de palabras clave viven en reglas_limpieza.py; cada valor distinto
+    # se clasifica una sola vez y se reutiliza la caché de corridas anteriores
+    for columna_limpia, (columna_cruda, tabla) in COLUMNAS_ESTILO_VIDA.items():
+        with medir(columna_limpia, filas_entrada=len(df_raw)):
+            datos_limpios[columna_limpia] = normalizar_columna(df_raw[columna_cruda], tabla, cache_normalizacion)
+    datos_limpios['Horas_Sueño'] = pd.to_numeric(df_raw['Horas_Sueño'], errors='coerce').astype('float32')
+    datos_limpios['Promedio_Escolar'] = pd.to_numeric(df_raw['Promedio_Escolar'], errors='coerce').round(1).astype('float32')
+    return pd.DataFrame(datos_limpios)
+
+DIMENSIONES_CUBO = ['Nivel_Ansiedad', 'Sexo', 'Tiene_Beca', 'Horas_Sueño', 'Promedio_Escolar']
+
+def agregar_para_graficos(df):
+    # Cubo de KPIs; se puede sumar entre bloques. Las horas de sueño entran
+    # redondeadas a la hora y Promedio_Escolar ya viene con un decimal, así que su
+    # distribución por nivel de ansiedad también cabe en el cubo (de ahí sale el boxplot).
+    return calcular_cubo(df.assign(**{'Horas_Sueño': df['Horas_Sueño'].round()}), DIMENSIONES_CUBO)
+
+def ordenar_conteos(conteos_columna):
+    return conteos_columna.sort_values(ascending=False, kind='stable')
 
 # --- Generación de Gráficos ---
 
-sns.set_style("whitegrid")
-plt.rcParams['font.family'] = 'sans-serif'
-
-# --- Gráfico Nivel de Ansiedad ---
-plt.figure(figsize=(10, 7))
-ansiedad_orden = ['Ninguno', 'Leve', 'Moderada', 'Grave']
-ax1 = sns.countplot(y=df['Nivel_Ansiedad'], 
-                    order=ansiedad_orden, 
-                    palette='coolwarm',
-                    hue=df['Nivel_Ansiedad'], 
-                    legend=False)             
-plt.title('Distribución del Nivel de Ansiedad en Estudiantes', fontsize=12, fontweight='bold')
-plt.xlabel('Cantidad de Estudiantes', fontsize=12)
-plt.ylabel('Nivel de Ansiedad Reportado', fontsize=12)
-for p in ax1.patches:
-    if p.get_width() > 0:
-        ax1.annotate(f'{int(p.get_width())}', (p.get_width(), p.get_y() + p.get_height() / 2.),
-                     ha='left', va='center', xytext=(5, 0), textcoords='offset points')
-plt.tight_layout()
-plt.savefig(os.path.join(output_dir_graficos, 'estilo_vida_ansiedad.png')) # <-- CORREGIDO
-plt.close()
-
-# --- Gráfico Distribución por Sexo ---
-plt.figure(figsize=(10, 10))
-sexo_counts = df['Sexo'].value_counts()
-def mostrar_porcentaje(pct):
-    total = sexo_counts.sum()
-    valor = int(round(pct/100 * total))
-    return f'{pct:.1f}%\n({valor:d})'
-plt.pie(sexo_counts, 
-    labels=sexo_counts.index, 
-    autopct=mostrar_porcentaje, 
-    startangle=140, 
-    colors=['#66b3ff', '#ff9999'])
-plt.title('Distribución de Estudiantes por Sexo', fontsize=12, fontweight='bold')
-plt.ylabel('')
-plt.savefig(os.path.join(output_dir_graficos, 'estilo_vida_sexo.png')) 
-plt.close()
-
-# --- Gráfico Horas de Sueño ---
-plt.figure(figsize=(10, 7))
-ax3 = sns.countplot(x=df['Horas_Sueño'].round(), 
-                    palette='coolwarm',
-                    hue=df['Horas_Sueño'].round(), 
-                    legend=False)                 
-plt.title('Horas de Sueño Promedio por Noche', fontsize=12, fontweight='bold')
-plt.xlabel('Horas de Sueño', fontsize=12)
-plt.ylabel('Cantidad de Estudiantes', fontsize=12)
-for p in ax3.patches:
-    if p.get_height() > 0:
-        ax3.annotate(f'{int(p.get_height())}', (p.get_x() + p.get_width() / 2., p.get_height()),
-                     ha='center', va='center', xytext=(0, 10), textcoords='offset points')
-plt.tight_layout()
-plt.savefig(os.path.join(output_dir_graficos, 'estilo_vida_sueno.png')) # <-- CORREGIDO
-plt.close()
-
-# --- Gráfico Estudiantes con Beca ---
-plt.figure(figsize=(10, 10))
-beca_counts = df['Tiene_Beca'].value_counts()
-total_beca = beca_counts.sum() 
-
-def mostrar_porcentaje_y_valor(pct):
-    valor = int(round(pct/100 * total_beca))
-    return f'{pct:.1f}%\n({valor:d})'
-
-plt.pie(beca_counts, 
-        labels=beca_counts.index, 
-        autopct=mostrar_porcentaje_y_valor, 
-        startangle=90, 
-        colors=['#c2c2f0','#ffb3e6'])
-
-plt.title('Proporción de Estudiantes con Beca', fontsize=12, fontweight='bold')
-plt.ylabel('')
-plt.savefig(os.path.join(output_dir_graficos, 'estilo_vida_beca.png'))
-plt.close()
-
-# --- Gráfico Relación entre Ansiedad y Promedio Escolar ---
-plt.figure(figsize=(12, 8))
-sns.boxplot(x='Nivel_Ansiedad', 
-            y='Promedio_Escolar', 
-            data=df, 
-            order=ansiedad_orden, 
-            palette='coolwarm',
-            hue='Nivel_Ansiedad', 
-            dodge=False,        
-            legend=False)    
-plt.title('Promedio Escolar vs. Nivel de Ansiedad', fontsize=12, fontweight='bold')
-plt.xlabel('Nivel de Ansiedad Reportado', fontsize=12)
-plt.ylabel('Promedio Escolar', fontsize=12)
-plt.ylim(5, 10)
-plt.tight_layout()
-plt.savefig(os.path.join(output_dir_graficos, 'estilo_vida_ansiedad_vs_promedio.png')) 
-plt.close()
-
-print("\nAnálisis finalizado con éxito.")
-print(f"Revisa la carpeta '{output_dir_graficos}' para ver gráficos generados.")
+def trabajos_graficos(cubo, dir_graficos=output_dir_graficos):
+    # Cada gráfico es un trabajo (tipo, datos, ruta, estilo) de graficos.py; se
+    # dibujan en paralelo en el pool de renderizado.py. Los datos salen del cubo, con
+    # su intervalo de confianza bootstrap (remuestreo.py).
+    ansiedad = conteo(cubo, 'Nivel_Ansiedad')
+    # Los niveles fuera del orden (p. ej. 'No especificado') van al final, no se descartan
+    ansiedad_orden = orden_completo(['Ninguno', 'Leve', 'Moderada', 'Grave'], ansiedad.index)
+    return [
+        ('barras_conteo', ansiedad.reindex(ansiedad_orden, fill_value=0),
+         os.path.join(dir_graficos, 'estilo_vida_ansiedad.png'),
+         {'titulo': 'Distribución del Nivel de Ansiedad en Estudiantes', 'tamano_titulo': 12, 'horizontal': True,
+          'etiqueta_x': 'Cantidad de Estudiantes', 'etiqueta_y': 'Nivel de Ansiedad Reportado',
+          'intervalos': intervalo_conteo(cubo, 'Nivel_Ansiedad')}),
+        ('pastel', ordenar_conteos(conteo(cubo, 'Sexo')),
+         os.path.join(dir_graficos, 'estilo_vida_sexo.png'),
+         {'titulo': 'Distribución de Estudiantes por Sexo', 'tamano_titulo': 12,
+          'colores': ['#66b3ff', '#ff9999'], 'angulo_inicio': 140,
+          'intervalos': intervalo_proporcion(cubo, 'Sexo')}),
+        ('barras_conteo', conteo(cubo, 'Horas_Sueño').sort_index(),
+         os.path.join(dir_graficos, 'estilo_vida_sueno.png'),
+         {'titulo': 'Horas de Sueño Promedio por Noche', 'tamano_titulo': 12,
+          'etiqueta_x': 'Horas de Sueño', 'etiqueta_y': 'Cantidad de Estudiantes',
+          'intervalos': intervalo_conteo(cubo, 'Horas_Sueño')}),
+        ('pastel', ordenar_conteos(conteo(cubo, 'Tiene_Beca')),
+         os.path.join(dir_graficos, 'estilo_vida_beca.png'),
+         {'titulo': 'Proporción de Estudiantes con Beca', 'tamano_titulo': 12,
+          'colores': ['#c2c2f0', '#ffb3e6'], 'angulo_inicio': 90,
+          'intervalos': intervalo_proporcion(cubo, 'Tiene_Beca')}),
+        # El boxplot se arma con ax.bxp a partir de los conteos, sin volver a las filas;
+        # las muescas son el intervalo de la mediana
+        ('cajas_por_nivel', conteo(cubo, ['Nivel_Ansiedad', 'Promedio_Escolar']),
+         os.path.join(dir_graficos, 'estilo_vida_ansiedad_vs_promedio.png'),
+         {'titulo': 'Promedio Escolar vs. Nivel de Ansiedad', 'tamano_titulo': 12, 'orden': ansiedad_orden,
+          'etiqueta_x': 'Nivel de Ansiedad Reportado', 'etiqueta_y': 'Promedio Escolar', 'limites_y': (5, 10),
+          'intervalos': intervalo_mediana(cubo, 'Nivel_Ansiedad', 'Promedio_Escolar')}),
+    ]
+
+
+def ejecutar(streaming=False, tamano_bloque=TAMANO_BLOQUE, exportar_csv=False, incremental=False):
+    """Etapa completa: limpia la encuesta de estilo de vida, guarda los datos limpios y prepara sus gráficos.
+
+    Con `incremental`, solo se limpian las respuestas posteriores a la última marca
+    de agua (ver incremental.py) y se anexan a lo que ya estaba limpio.
+
+    Devuelve {'salidas': rutas de los datos limpios, del cubo y de los intervalos de
+    confianza de los KPIs, 'graficos': trabajos de renderizado}.
+    """
+    print("\nIniciando el script de Análisis de Estilo de Vida...")
+
+    os.makedirs(output_dir_graficos, exist_ok=True)
+    os.makedirs(output_dir_datos, exist_ok=True)
+    print(f"Los gráficos se guardarán en: '{output_dir_graficos}'")
+    print(f"Los datos limpios se guardarán en: '{output_dir_datos}'")
+
+    # --- LIMPIEZA Y PREPARACIÓN DE DATOS ---
+
+    file_path = ruta_encuesta('estilo_vida')
+    # Formato columnar (Feather) por defecto; CSV opcional para quien lo quiera abrir a mano
+    formatos = list(dict.fromkeys([FORMATO_PREDETERMINADO] + (['csv'] if exportar_csv else [])))
+    rutas_limpias = [ruta_limpio('estilo_vida', formato) for formato in formatos]
+    cache_normalizacion = {}
+    # Si cambia una regla, el cubo, los formatos o los tipos, lo ya limpio no sirve de base
+    firma_actual = firma(reglas={tabla: version_tabla(tabla) for _, tabla in COLUMNAS_ESTILO_VIDA.values()},
+                         cubo=DIMENSIONES_CUBO, formatos=formatos,
+                         tipos=TIPOS_LIMPIOS)
+    registro = None
+    if incremental:
+        registro = marcas_vigentes('estilo_vida', firma_actual, rutas_limpias + [ruta_cubo('estilo_vida')])
+        if registro is None:
+            print("No hay una corrida anterior compatible; se limpia la encuesta completa.")
+    try:
+        if registro is not None:
+            marca = marca_de(registro, 'estilo_vida')
+            print(f"Modo incremental: solo respuestas posteriores a {marca[0]}.")
+            cubo, filas, primeras_filas = limpiar_incremental(
+                'estilo_vida', lambda bloque: limpiar(bloque, cache_normalizacion),
+                agregar_para_graficos, formatos, marca, tamano_bloque)
+            print(f"{filas} respuestas nuevas limpiadas y anexadas.")
+        elif streaming:
+            print(f"Modo streaming: bloques de {tamano_bloque} filas.")
+            cubo, filas, primeras_filas = limpiar_en_bloques(
+                'estilo_vida', lambda bloque: limpiar(bloque, cache_normalizacion),
+                agregar_para_graficos, EscritorLimpio('estilo_vida', formatos), tamano_bloque)
+            print(f"Datos limpiados y estandarizados ({filas} filas).")
+        else:
+            # Solo se leen las columnas que usa la limpieza, ya con sus nombres canónicos
+            # (el esquema de cada encuesta vive en ingesta.py)
+            with medir('lectura') as paso:
+                df_raw = leer_encuesta('estilo_vida', ruta=file_path)
+                paso['filas_salida'] = len(df_raw)
+            print("Archivo CSV original cargado exitosamente.")
+            with medir('limpieza', filas_entrada=len(df_raw)) as paso:
+                df = limpiar(df_raw, cache_normalizacion)
+                paso['filas_salida'] = len(df)
+            print("Datos limpiados y estandarizados.")
+            primeras_filas = df.head()
+            with medir('cubo', filas_entrada=len(df)) as paso:
+                cubo = agregar_para_graficos(df)
+                paso['filas_salida'] = len(cubo)
+            with medir('escritura', filas_entrada=len(df)):
+                guardar_limpio(df, 'estilo_vida', formatos)
+    except FileNotFoundError:
+        print(f"Error: No se encontró el archivo '{file_path}'.")
+        print("Asegúrate de tener la estructura de carpetas: data/01_crudos/encuesta_estilo_vida.csv")
+        raise
+    guardar_cache(cache_normalizacion)
+    ruta_kpis = guardar_cubo(cubo, 'estilo_vida')
+    registrar_marcas('estilo_vida', firma_actual, {'estilo_vida': marca_limpio('estilo_vida')},
+                     registro and registro['base'])
+
+    print("\n--- Visualización del DataFrame Limpio (primeras filas) ---")
+    print(primeras_filas)
+    print(f"\nDataFrame limpio guardado en '{output_dir_datos}' ({', '.join(formatos)})")
+
+    # --- Generación de Gráficos ---
+    # Los gráficos no se dibujan aquí: se devuelven como trabajos para que quien
+    # corre la etapa los mande al pool de renderizado sin esperar a que terminen
+    with medir('intervalos'):
+        trabajos = trabajos_graficos(cubo)
+        ruta_intervalos = guardar_intervalos(trabajos, 'estilo_vida')
+    print(f"\nLimpieza finalizada; {len(trabajos)} gráficos listos para renderizar.")
+    return {'salidas': rutas_limpias + [ruta_kpis, ruta_intervalos], 'graficos': trabajos}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Limpieza y gráficos de la encuesta de estilo de vida.')
+    parser.add_argument('--streaming', action='store_true',
+                        help='Limpia el CSV crudo por bloques para que la memoria no dependa del tamaño del archivo.')
+    parser.add_argument('--tamano-bloque', type=int, default=TAMANO_BLOQUE,
+                        help=f'Filas por bloque en modo streaming (por defecto {TAMANO_BLOQUE}).')
+    parser.add_argument('--exportar-csv', action='store_true',
+                        help='Además del formato columnar, guarda una copia CSV de los datos limpios.')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Limpia solo las respuestas posteriores al último Timestamp procesado.')
+    parser.add_argument('--solo-datos', action='store_true',
+                        help='Guarda los datos limpios y los KPIs sin dibujar gráficos (no carga matplotlib).')
+    parser.add_argument('--solo-graficos', action='store_true',
+                        help='Vuelve a dibujar los gráficos desde el cubo guardado, sin limpiar de nuevo.')
+    args = parser.parse_args()
+    if args.solo_graficos:
+        renderizar(trabajos_graficos(leer_cubo('estilo_vida')))
+    else:
+        resultado = ejecutar(args.streaming, args.tamano_bloque, args.exportar_csv, args.incremental)
+        if not args.solo_datos:
+            renderizar(resultado['graficos'])
+    print("\nAnálisis finalizado con éxito.")
+    print(f"Revisa la carpeta '{output_dir_graficos}' para ver gráficos generados.")
@@ -0,0 +1,207 @@
+import re
+import unicodedata
+
+import pandas as pd
+
+from reglas_limpieza import TABLAS, preparar_texto
+
+# --- CLASIFICACIÓN APROXIMADA (ERRORES DE DEDO) ---
+# Una respuesta que no contiene ninguna palabra clave cae en la etiqueta 'otro'
+# de su tabla ('Otros', 'No especificado'...), aunque solo le falte una letra:
+# "trasporte", "preocupasion". Para esas respuestas, y solo para ellas, se busca
+# la palabra clave más parecida a alguna de sus palabras, sin acentos y con
+# distancia de edición (Damerau-Levenshtein: una letra de más, de menos,
+# cambiada o dos letras invertidas).
+#
+# Un error de dedo no debe cambiar lo que la respuesta dice, y una etiqueta
+# equivocada es peor que 'No especificado'. Por eso:
+#   - Solo se indexan palabras clave de una palabra. En las de varias ('creo que
+#     no', 'no tiene') las letras que se pueden corregir son justo las que dan el
+#     sentido: "creo que si" quedaría a una letra de 'creo que no'.
+#   - Las palabras de afirmación o negación (POLARIDAD) solo coinciden sin acentos,
+#     nunca con letras cambiadas.
+#   - La tolerancia depende del largo de la palabra clave (TOLERANCIAS): exacta
+#     hasta 6 letras ('hambre' con una letra distinta es 'hombre'), 1 error de 7 a
+#     8 letras y 2 desde 9. Además la palabra de la respuesta necesita
+#     LETRAS_MINIMAS letras para admitir algún error, así que las de 3 letras o
+#     menos ('si', 'lo') nunca se corrigen.
+#
+# Las palabras clave de cada tabla se indexan una vez por proceso en un árbol BK,
+# que descarta ramas enteras por la desigualdad triangular en lugar de comparar
+# cada texto con todo el vocabulario. El árbol usa Levenshtein (sin
+# inversiones), que sí cumple esa desigualdad; como una inversión son dos
+# ediciones de Levenshtein, se busca con el doble de radio y después se filtra
+# con la distancia con inversiones. Las claves de 'empieza' solo se comparan con
+# la primera palabra de la respuesta. Las claves con puntuación ('bien,') no se
+# indexan: la puntuación es parte de lo que piden y sin ella dirían otra cosa.
+# Si varias reglas coinciden gana la de menor distancia y, a igual distancia,
+# la de mayor prioridad.
+#
+# normalizacion.py solo manda aquí los textos distintos que las reglas no
+# clasificaron y que su caché no conoce; lo que se resuelve queda en la caché
+# de la tabla, así que las corridas siguientes ni siquiera lo buscan. Por eso
+# la versión de cada tabla en la caché incluye version_busqueda(): cambiar las
+# tolerancias o la forma de comparar invalida lo que se resolvió con las viejas.
+
+TOLERANCIAS = [(9, 2), (7, 1), (0, 0)]  # (letras mínimas de la palabra clave, errores)
+TOLERANCIA_MAXIMA = max(errores for _, errores in TOLERANCIAS)
+LETRAS_MINIMAS = 6  # letras de la palabra de la respuesta para admitir algún error
+POLARIDAD = {'si', 'sip', 'no', 'nop', 'nada', 'ninguno', 'ninguna', 'nunca', 'tampoco'}
+
+# Versión de la forma de comparar (distancia, ventanas, desempates); subirla al cambiarla
+VERSION_BUSQUEDA = 2
+
+# Respuestas que se deben resolver así (o quedarse sin resolver) con las tablas
+# actuales: python aproximado.py las revisa
+EJEMPLOS = [
+    ('sentimiento_financiero', 'preocupasion', 'Ansiedad/Preocupación'),
+    ('gasto_principal', 'Trasporte', 'Transporte'),
+    ('renuncia_oportunidad', 'Sï', 'Sí'),
+    ('renuncia_oportunidad', 'creo que si', 'No especificado'),
+    ('renuncia_oportunidad', 'creo que sí', 'No especificado'),
+    ('impacto_academico', 'si tendria que ver', 'No especificado'),
+    ('impacto_academico', 'lo tiene', 'No especificado'),
+    ('impacto_academico', 'hombre', 'No especificado'),
+    ('gasto_principal', 'venta de cosas', 'Otros'),
+]
+
+
+def version_busqueda():
+    """Lo que decide qué etiqueta aproximada recibe un texto, además de las tablas de reglas."""
+    return [VERSION_BUSQUEDA, TOLERANCIAS, LETRAS_MINIMAS, sorted(POLARIDAD)]
+
+
+def plegar(texto):
+    """Minúsculas sin acentos ('Preocupación' -> 'preocupacion')."""
+    descompuesto = unicodedata.normalize('NFKD', texto.lower())
+    return ''.join(letra for letra in descompuesto if not unicodedata.combining(letra))
+
+
+def palabras(texto):
+    return re.findall(r'\w+', plegar(texto))
+
+
+def tolerancia(clave, palabra):
+    """Errores que se admiten entre una palabra clave y una palabra de la respuesta."""
+    if clave in POLARIDAD or len(palabra) < LETRAS_MINIMAS:
+        return 0
+    return next(errores for letras, errores in TOLERANCIAS if len(clave) >= letras)
+
+
+def distancia(a, b, maximo, inversiones=True):
+    """Distancia de edición (con `inversiones`, Damerau-Levenshtein de alineamiento óptimo).
+
+    Si pasa de `maximo` devuelve algún valor mayor que `maximo`.
+    """
+    if abs(len(a) - len(b)) > maximo:
+        return maximo + 1
+    anterior, actual = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        antepenultima, anterior, actual = anterior, actual, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            costo = a[i - 1] != b[j - 1]
+            actual[j] = min(anterior[j] + 1, actual[j - 1] + 1, anterior[j - 1] + costo)
+            if inversiones and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                actual[j] = min(actual[j], antepenultima[j - 2] + 1)
+        if min(actual) > maximo:
+            return maximo + 1
+    return actual[-1]
+
+
+class ArbolBK:
+    """Árbol BK de palabras: busca todas las que están a distancia Levenshtein <= radio de una dada."""
+
+    def __init__(self):
+        self._raiz = None
+
+    def agregar(self, palabra, dato):
+        if self._raiz is None:
+            self._raiz = (palabra, [dato], {})
+            return
+        nodo = self._raiz
+        while True:
+            d = distancia(palabra, nodo[0], float('inf'), inversiones=False)
+            if d == 0:
+                nodo[1].append(dato)
+                return
+            if d not in nodo[2]:
+                nodo[2][d] = (palabra, [dato], {})
+                return
+            nodo = nodo[2][d]
+
+    def buscar(self, palabra, radio):
+        """[(distancia, palabra del árbol, datos)] a distancia <= radio."""
+        encontradas, pendientes = [], [self._raiz] if self._raiz else []
+        while pendientes:
+            clave, datos, hijos = pendientes.pop()
+            # La poda necesita la distancia exacta, no solo saber si pasa del radio
+            d = distancia(palabra, clave, float('inf'), inversiones=False)
+            if d <= radio:
+                encontradas.append((d, clave, datos))
+            # Desigualdad triangular: solo los hijos a distancia d ± radio pueden servir
+            pendientes += [hijo for arista, hijo in hijos.items() if d - radio <= arista <= d + radio]
+        return encontradas
+
+
+_indices = {}
+
+
+def indice_tabla(nombre_tabla):
+    """Árbol BK de las palabras clave de una sola palabra de la tabla."""
+    if nombre_tabla not in _indices:
+        arbol = ArbolBK()
+        for prioridad, (_, condiciones) in enumerate(TABLAS[nombre_tabla]['reglas']):
+            for modo in ('contiene', 'palabra', 'empieza'):
+                for clave in condiciones.get(modo, []):
+                    partes = palabras(clave)
+                    if len(partes) == 1 and partes[0] == plegar(clave).strip():
+                        arbol.agregar(partes[0], (prioridad, modo))
+        _indices[nombre_tabla] = arbol
+    return _indices[nombre_tabla]
+
+
+def etiqueta_aproximada(texto, nombre_tabla):
+    """Etiqueta de la regla con la palabra clave más parecida a alguna palabra de `texto`, o None."""
+    arbol = indice_tabla(nombre_tabla)
+    mejor = None
+    for posicion, palabra in enumerate(palabras(texto)):
+        for _, clave, datos in arbol.buscar(palabra, 2 * TOLERANCIA_MAXIMA):
+            maximo = tolerancia(clave, palabra)
+            d = distancia(palabra, clave, maximo)
+            if d > maximo:
+                continue
+            for prioridad, modo in datos:
+                if modo == 'empieza' and posicion > 0:
+                    continue
+                if mejor is None or (d, prioridad) < mejor:
+                    mejor = (d, prioridad)
+    return None if mejor is None else TABLAS[nombre_tabla]['reglas'][mejor[1]][0]
+
+
+def clasificar_aproximado(serie, nombre_tabla):
+    """Etiquetas de los textos de `serie` que ninguna regla reconoció; 'otro' si nada se parece."""
+    tabla = TABLAS[nombre_tabla]
+    texto = preparar_texto(serie, tabla['preparacion'])
+    etiquetas = [tabla['nulo'] if pd.isna(valor) else etiqueta_aproximada(valor, nombre_tabla) or tabla['otro']
+                 for valor in texto]
+    return pd.Series(etiquetas, index=serie.index, dtype=object)
+
+
+def verificar(ejemplos=EJEMPLOS):
+    """Clasifica cada ejemplo como en una corrida sin caché; devuelve los que no dan lo esperado."""
+    from normalizacion import normalizar_columna
+    fallas = []
+    for nombre_tabla, texto, esperada in ejemplos:
+        cache = {nombre_tabla: {'valores': {}, 'nuevos': 0}}
+        obtenida = normalizar_columna(pd.Series([texto]), nombre_tabla, cache).iloc[0]
+        if obtenida != esperada:
+            fallas.append((nombre_tabla, texto, esperada, obtenida))
+    return fallas
+
+
+if __name__ == '__main__':
+    fallas = verificar()
+    for nombre_tabla, texto, esperada, obtenida in fallas:
+        print(f"{nombre_tabla}: '{texto}' -> '{obtenida}' (se esperaba '{esperada}')")
+    print(f"{len(EJEMPLOS) - len(fallas)} de {len(EJEMPLOS)} ejemplos correctos.")
+    raise SystemExit(1 if fallas else 0)
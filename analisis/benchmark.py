@@ -0,0 +1,272 @@
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import analizar_asociaciones
+import analizar_combinado
+import analizar_economia
+import analizar_estilo_vida
+from almacen import aplicar_tipos
+from generador import dir_sinteticos, generar
+from ingesta import ESQUEMAS, leer_encuesta
+from instrumentacion import estado_memoria, reiniciar_pico
+from reglas_limpieza import TABLAS
+from remuestreo import tabla_intervalos
+from renderizado import renderizar
+from union import IndiceClaves, armar, claves_de, depurar, informe_claves
+
+# --- BENCHMARK DE ESCALABILIDAD ---
+# Mide, para encuestas sintéticas de cada tamaño (generador.py), cada paso del
+# análisis por separado: ingesta, limpieza, unión, agregación del cubo, intervalos
+# de confianza de los KPIs, asociaciones y renderizado. Las entradas de cada paso se calculan antes (preparar) y cada
+# medición corre en un proceso nuevo, que primero carga sus entradas y después
+# mide el paso: tiempo de reloj, tiempo de CPU y cuánto subió el pico de memoria
+# (RSS) del proceso durante el paso por encima de lo que ya ocupaban sus entradas. El renderizado usa su propio pool, así que
+# ahí la memoria es solo la del proceso que lo coordina.
+#
+# Los resultados se guardan en data/benchmark/ y se pueden comparar con una base
+# guardada antes (--guardar-base / --comparar).
+
+dir_benchmark = '../data/benchmark/'
+ruta_ultimo = os.path.join(dir_benchmark, 'ultimo.json')
+ruta_base = os.path.join(dir_benchmark, 'base.json')
+
+TAMANOS_PREDETERMINADOS = [1_000, 10_000, 100_000]
+MODULOS = {
+    'economia': analizar_economia,
+    'estilo_vida': analizar_estilo_vida,
+    'combinado': analizar_combinado,
+}
+
+# Una medición es más lenta que la base si tarda más de (1 + tolerancia) veces
+# y además la diferencia supera este mínimo (por debajo es ruido)
+TOLERANCIA = 0.2
+DIFERENCIA_MINIMA = 0.05
+
+
+def _ruta_trabajo(dir_trabajo, nombre):
+    return os.path.join(dir_trabajo, f'{nombre}.pkl')
+
+
+def _cache_fria():
+    # Caché de normalización vacía: la limpieza clasifica todos los textos, como en la primera corrida
+    return {tabla: {'valores': {}, 'nuevos': 0} for tabla in TABLAS}
+
+
+def _unir(limpios):
+    # Lo mismo que hace analizar_combinado en memoria: depurar, indexar, informar y armar
+    df_bienestar, _ = depurar(limpios['estilo_vida'])
+    df_economia, _ = depurar(limpios['economia'])
+    indice_bienestar = IndiceClaves(claves_de(df_bienestar))
+    indice_economia = IndiceClaves(claves_de(df_economia))
+    informe_claves(indice_bienestar, indice_economia, ('estilo_vida', 'economia'))
+    return armar(df_bienestar, df_economia, *indice_economia.emparejar(claves_de(df_bienestar)))
+
+
+def _trabajos_renderizado(cubos, dir_trabajo):
+    trabajos = []
+    for etapa, cubo in cubos.items():
+        for tipo, datos, ruta, estilo in MODULOS[etapa].trabajos_graficos(cubo):
+            trabajos.append((tipo, datos, os.path.join(dir_trabajo, 'graficos', os.path.basename(ruta)), estilo))
+    return trabajos
+
+
+# Por paso: (cargar entradas, correr el paso). Ambas reciben (objetivo, rutas, dir_trabajo);
+# correr devuelve (filas de entrada, filas de salida).
+def _leer(dir_trabajo, nombre):
+    return pd.read_pickle(_ruta_trabajo(dir_trabajo, nombre))
+
+
+PASOS = {
+    'ingesta': (
+        lambda encuesta, rutas, dir_trabajo: rutas[encuesta],
+        lambda encuesta, ruta: (None, len(leer_encuesta(encuesta, ruta=ruta))),
+    ),
+    'limpieza': (
+        lambda encuesta, rutas, dir_trabajo: leer_encuesta(encuesta, ruta=rutas[encuesta]),
+        lambda encuesta, df_raw: (len(df_raw), len(MODULOS[encuesta].limpiar(df_raw, _cache_fria()))),
+    ),
+    'union': (
+        lambda _, rutas, dir_trabajo: {encuesta: aplicar_tipos(_leer(dir_trabajo, encuesta)) for encuesta in ESQUEMAS},
+        lambda _, limpios: (sum(map(len, limpios.values())), len(_unir(limpios))),
+    ),
+    'agregacion': (
+        lambda etapa, rutas, dir_trabajo: _leer(dir_trabajo, etapa),
+        lambda etapa, df: (len(df), len(MODULOS[etapa].agregar_para_graficos(df))),
+    ),
+    'intervalos': (
+        lambda etapa, rutas, dir_trabajo: _leer(dir_trabajo, f'{etapa}_cubo'),
+        lambda etapa, cubo: (len(cubo), len(tabla_intervalos(MODULOS[etapa].trabajos_graficos(cubo)))),
+    ),
+    'asociaciones': (
+        lambda _, rutas, dir_trabajo: _leer(dir_trabajo, 'combinado'),
+        lambda _, df: (len(df), len(analizar_asociaciones.asociaciones(df)[0])),
+    ),
+    'renderizado': (
+        lambda _, rutas, dir_trabajo: _trabajos_renderizado(
+            {etapa: _leer(dir_trabajo, f'{etapa}_cubo') for etapa in MODULOS}, dir_trabajo),
+        # Sin la caché de gráficos: cada repetición dibuja todo y no toca data/cache/graficos/
+        lambda _, trabajos: (len(trabajos), len(renderizar(trabajos, usar_cache=False))),
+    ),
+}
+
+# Pasos que se miden: (paso, objetivo)
+MEDICIONES = [
+    ('ingesta', 'economia'), ('ingesta', 'estilo_vida'),
+    ('limpieza', 'economia'), ('limpieza', 'estilo_vida'),
+    ('union', 'combinado'),
+    ('agregacion', 'economia'), ('agregacion', 'estilo_vida'), ('agregacion', 'combinado'),
+    ('intervalos', 'economia'), ('intervalos', 'estilo_vida'), ('intervalos', 'combinado'),
+    ('asociaciones', 'combinado'),
+    ('renderizado', 'todos'),
+]
+
+
+def preparar(rutas, dir_trabajo):
+    """Calcula y guarda las entradas de cada paso (datos limpios, combinado y cubos)."""
+    limpios = {}
+    for encuesta in ESQUEMAS:
+        limpios[encuesta] = MODULOS[encuesta].limpiar(leer_encuesta(encuesta, ruta=rutas[encuesta]), _cache_fria())
+    limpios['combinado'] = _unir({encuesta: aplicar_tipos(df) for encuesta, df in limpios.items()})
+    for etapa, df in limpios.items():
+        df.to_pickle(_ruta_trabajo(dir_trabajo, etapa))
+        MODULOS[etapa].agregar_para_graficos(df).to_pickle(_ruta_trabajo(dir_trabajo, f'{etapa}_cubo'))
+
+
+def medir(paso, objetivo, rutas, dir_trabajo):
+    """Carga las entradas de un paso y lo corre una vez; corre en un proceso nuevo."""
+    cargar, correr = PASOS[paso]
+    entradas = cargar(objetivo, rutas, dir_trabajo)
+    gc.collect()
+    reiniciar_pico()
+    rss_antes, pico_antes = estado_memoria()
+    reloj, cpu = time.perf_counter(), time.process_time()
+    filas_entrada, filas_salida = correr(objetivo, entradas)
+    segundos, cpu_segundos = time.perf_counter() - reloj, time.process_time() - cpu
+    _, pico = estado_memoria()
+    base = rss_antes if rss_antes is not None else pico_antes
+    return {
+        'segundos': segundos,
+        'cpu_segundos': cpu_segundos,
+        # Cuánto por encima de lo que ya ocupaban las entradas llegó la memoria durante el paso
+        'memoria_mb': None if pico is None else (pico - base) / 2**20,
+        'filas_entrada': filas_entrada,
+        'filas_salida': filas_salida,
+    }
+
+
+def medir_tamano(filas, repeticiones=3, regenerar=False):
+    """Mide todos los pasos para encuestas de `filas` filas; devuelve {'paso.objetivo': medición}."""
+    destino = os.path.join(dir_sinteticos, str(filas))
+    rutas = {encuesta: os.path.join(destino, esquema['archivo']) for encuesta, esquema in ESQUEMAS.items()}
+    if regenerar or not all(os.path.exists(ruta) for ruta in rutas.values()):
+        print(f"Generando encuestas sintéticas de {filas} filas...")
+        rutas = generar(filas, destino)
+
+    dir_trabajo = tempfile.mkdtemp(prefix='benchmark_')
+    try:
+        preparar(rutas, dir_trabajo)
+        resultados = {}
+        # Un proceso nuevo por medición (spawn): el pico de memoria no arrastra pasos anteriores
+        contexto = multiprocessing.get_context('spawn')
+        for paso, objetivo in MEDICIONES:
+            corridas = []
+            for _ in range(repeticiones):
+                with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as pool:
+                    corridas.append(pool.submit(medir, paso, objetivo, rutas, dir_trabajo).result())
+            memorias = [corrida['memoria_mb'] for corrida in corridas if corrida['memoria_mb'] is not None]
+            resultados[f'{paso}.{objetivo}'] = {
+                **corridas[0],
+                'segundos': min(corrida['segundos'] for corrida in corridas),
+                'cpu_segundos': min(corrida['cpu_segundos'] for corrida in corridas),
+                'memoria_mb': max(memorias) if memorias else None,
+            }
+            print(f"  {paso + '.' + objetivo:<24} {resultados[f'{paso}.{objetivo}']['segundos']:9.3f} s")
+    finally:
+        shutil.rmtree(dir_trabajo, ignore_errors=True)
+    return resultados
+
+
+def comparar(actual, base, tolerancia=TOLERANCIA):
+    """Lista de (tamaño, paso, segundos base, segundos actuales) más lentos que la base."""
+    regresiones = []
+    for filas, pasos in actual.items():
+        for paso, medicion in pasos.items():
+            anterior = base.get(filas, {}).get(paso)
+            if anterior is None:
+                continue
+            if (medicion['segundos'] > anterior['segundos'] * (1 + tolerancia)
+                    and medicion['segundos'] - anterior['segundos'] > DIFERENCIA_MINIMA):
+                regresiones.append((filas, paso, anterior['segundos'], medicion['segundos']))
+    return regresiones
+
+
+def _mostrar(resultados, base=None):
+    for filas, pasos in resultados.items():
+        print(f"\n--- {filas} filas ---")
+        print(f"{'paso':<26}{'segundos':>10}{'cpu':>10}{'memoria MB':>12}{'base':>10}")
+        for paso, medicion in pasos.items():
+            anterior = (base or {}).get(filas, {}).get(paso)
+            memoria = '-' if medicion['memoria_mb'] is None else f"{medicion['memoria_mb']:.1f}"
+            columna_base = '-' if anterior is None else f"{anterior['segundos']:.3f}"
+            print(f"{paso:<26}{medicion['segundos']:>10.3f}{medicion['cpu_segundos']:>10.3f}"
+                  f"{memoria:>12}{columna_base:>10}")
+
+
+def _guardar(resultados, ruta):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        json.dump(resultados, archivo, indent=2)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Mide cada paso del análisis con encuestas sintéticas de varios tamaños.')
+    parser.add_argument('filas', type=int, nargs='*', default=TAMANOS_PREDETERMINADOS,
+                        help=f"Tamaños a medir (por defecto {' '.join(map(str, TAMANOS_PREDETERMINADOS))}).")
+    parser.add_argument('--repeticiones', type=int, default=3,
+                        help='Veces que se mide cada paso; se informa el menor tiempo (por defecto 3).')
+    parser.add_argument('--regenerar', action='store_true',
+                        help='Vuelve a generar las encuestas sintéticas aunque ya existan.')
+    parser.add_argument('--guardar-base', action='store_true',
+                        help=f"Guarda estos resultados como base para comparar ('{ruta_base}').")
+    parser.add_argument('--comparar', action='store_true',
+                        help='Compara con la base guardada; termina con error si algún paso es más lento.')
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA,
+                        help=f'Cuánto más lento que la base se acepta (por defecto {TOLERANCIA:.0%}).')
+    args = parser.parse_args()
+
+    resultados = {}
+    for filas in args.filas:
+        print(f"\nMidiendo {filas} filas...")
+        resultados[str(filas)] = medir_tamano(filas, args.repeticiones, args.regenerar)
+    _guardar(resultados, ruta_ultimo)
+
+    base = None
+    if args.comparar:
+        try:
+            with open(ruta_base, encoding='utf-8') as archivo:
+                base = json.load(archivo)
+        except FileNotFoundError:
+            print(f"\nNo hay base guardada en '{ruta_base}'; usa --guardar-base primero.")
+    _mostrar(resultados, base)
+    print(f"\nResultados guardados en '{ruta_ultimo}'.")
+
+    if args.guardar_base:
+        _guardar(resultados, ruta_base)
+        print(f"Base guardada en '{ruta_base}'.")
+    if base is not None:
+        regresiones = comparar(resultados, base, args.tolerancia)
+        for filas, paso, antes, ahora in regresiones:
+            print(f"*** {filas} filas, {paso}: {antes:.3f} s -> {ahora:.3f} s ***")
+        if regresiones:
+            sys.exit(1)
+        print("Ningún paso es más lento que la base.")
@@ -0,0 +1,41 @@
+from cubo import sumar_cubos
+from ingesta import leer_encuesta_por_bloques
+from instrumentacion import medir
+
+# --- LIMPIEZA EN BLOQUES (MODO STREAMING) ---
+# Lee la encuesta cruda por bloques de tamaño fijo, limpia cada bloque, lo agrega
+# al archivo limpio y va sumando su cubo de KPIs (ver cubo.py) al de los bloques
+# anteriores. La memoria máxima depende del tamaño del bloque, no del archivo.
+# Cada paso (lectura, limpieza, escritura, cubo) se mide sumando todos los bloques.
+
+TAMANO_BLOQUE = 100_000
+
+
+def limpiar_en_bloques(encuesta, limpiar, agregar, escritor, tamano_bloque=TAMANO_BLOQUE):
+    """Limpia `encuesta` bloque por bloque y va escribiendo con `escritor` (un EscritorLimpio).
+
+    `limpiar(df_raw)` devuelve el bloque limpio y `agregar(df)` su cubo.
+    Devuelve (cubo acumulado, filas escritas, primeras filas limpias).
+    """
+    cubo = None
+    filas = 0
+    primeras_filas = None
+    bloques = leer_encuesta_por_bloques(encuesta, tamano_bloque)
+    while True:
+        with medir('lectura') as paso:
+            bloque = next(bloques, None)
+            paso['filas_salida'] = 0 if bloque is None else len(bloque)
+        if bloque is None:
+            break
+        with medir('limpieza', filas_entrada=len(bloque)) as paso:
+            limpio = limpiar(bloque)
+            paso['filas_salida'] = len(limpio)
+        with medir('escritura', filas_entrada=len(limpio)):
+            escritor.escribir(limpio)
+        with medir('cubo', filas_entrada=len(limpio)):
+            cubo = sumar_cubos(cubo, agregar(limpio))
+        if primeras_filas is None or primeras_filas.empty:
+            primeras_filas = limpio.head()
+        filas += len(limpio)
+    escritor.cerrar()
+    return cubo, filas, primeras_filas
@@ -0,0 +1,143 @@
+import os
+
+import pandas as pd
+
+from almacen import DECIMALES_MEDIDAS, FORMATO_PREDETERMINADO, EXTENSIONES, TIPOS_ETIQUETAS, aplicar_tipos
+
+if FORMATO_PREDETERMINADO == 'feather':
+    import pyarrow.feather as feather
+
+# --- CUBO DE KPIs (03_kpis) ---
+# Cada etapa agrega sus datos limpios en un cubo: una fila por combinación
+# observada de sus dimensiones (columnas categóricas o valores ya redondeados)
+# con la cantidad de estudiantes 'n' y, por cada medida numérica, su suma y
+# cuántos valores no nulos tiene. Se calcula en una sola pasada agrupada sobre
+# los códigos de las categorías y todos los conteos, tablas cruzadas y promedios
+# de los gráficos salen de él. Como todo es suma, dos cubos se combinan sumando
+# (bloques del modo streaming) y un gráfico puede volver a dibujarse leyendo solo
+# el cubo guardado, sin abrir los datos fila por fila.
+#
+# Las medidas llegan en float32 (formato compacto de la capa limpia), pero el cubo
+# es pequeño y las sumas se hacen en float64, con los decimales de la captura
+# restaurados (DECIMALES_MEDIDAS); así los promedios no arrastran error de redondeo.
+
+dir_kpis = '../data/03_kpis/'
+
+
+def ruta_cubo(nombre, formato=FORMATO_PREDETERMINADO):
+    return os.path.join(dir_kpis, f'{nombre}_cubo.{EXTENSIONES[formato]}')
+
+
+def _suma(medida):
+    return f'{medida}_suma'
+
+
+def _no_nulos(medida):
+    return f'{medida}_n'
+
+
+def _a_float64(df):
+    flotantes = [columna for columna in df.columns if df[columna].dtype == 'float32']
+    if not flotantes:
+        return df
+    df = df.astype({columna: 'float64' for columna in flotantes})
+    return df.round({columna: decimales for columna, decimales in DECIMALES_MEDIDAS.items() if columna in flotantes})
+
+
+def calcular_cubo(df, dimensiones, medidas=()):
+    """Cubo de `df`: filas por combinación de `dimensiones` y suma/no nulos de cada medida."""
+    dimensiones, medidas = list(dimensiones), list(medidas)
+    df = _a_float64(aplicar_tipos(df[dimensiones + medidas], TIPOS_ETIQUETAS))
+    grupos = df.groupby(dimensiones, observed=True, dropna=False, sort=True)
+    cubo = grupos.size().to_frame('n')
+    if medidas:
+        agregados = grupos[medidas].agg(['sum', 'count'])
+        for medida in medidas:
+            cubo[_suma(medida)] = agregados[(medida, 'sum')]
+            cubo[_no_nulos(medida)] = agregados[(medida, 'count')]
+    return cubo.reset_index()
+
+
+def sumar_cubos(*cubos):
+    """Combina cubos con las mismas dimensiones sumando sus filas."""
+    cubos = [cubo for cubo in cubos if cubo is not None]
+    if len(cubos) == 1:
+        return cubos[0]
+    dimensiones = [columna for columna in cubos[0].columns
+                   if columna != 'n' and not columna.endswith(('_suma', '_n'))]
+    combinado = aplicar_tipos(pd.concat(cubos, ignore_index=True), TIPOS_ETIQUETAS)
+    return (combinado.groupby(dimensiones, observed=True, dropna=False, sort=True)
+                     .sum().reset_index())
+
+
+def guardar_cubo(cubo, nombre):
+    os.makedirs(dir_kpis, exist_ok=True)
+    ruta = ruta_cubo(nombre)
+    temporal = f'{ruta}.parcial'
+    if FORMATO_PREDETERMINADO == 'feather':
+        feather.write_feather(cubo, temporal, compression='uncompressed')
+    else:
+        cubo.to_csv(temporal, index=False)
+    os.replace(temporal, ruta)
+    return ruta
+
+
+def leer_cubo(nombre):
+    ruta = ruta_cubo(nombre)
+    if FORMATO_PREDETERMINADO == 'feather':
+        return feather.read_table(ruta).to_pandas()
+    return aplicar_tipos(pd.read_csv(ruta), TIPOS_ETIQUETAS)
+
+
+# --- Lecturas del cubo ---
+# Un filtro es un dict {dimensión: valor}. Las combinaciones sin estudiantes no
+# están en el cubo, así que los resultados solo traen categorías observadas.
+
+def _filtrar(cubo, filtro):
+    for dimension, valor in (filtro or {}).items():
+        cubo = cubo[cubo[dimension] == valor]
+    return cubo
+
+
+def _etiquetas(serie_o_tabla):
+    # Índices como texto: con un índice categórico seaborn reparte la paleta entre
+    # todas las categorías, incluso las que no aparecen
+    for eje in ('index', 'columns'):
+        indice = getattr(serie_o_tabla, eje, None)
+        if isinstance(indice, pd.CategoricalIndex):
+            setattr(serie_o_tabla, eje, indice.astype(object))
+    return serie_o_tabla
+
+
+def total(cubo, filtro=None):
+    return int(_filtrar(cubo, filtro)['n'].sum())
+
+
+def conteo(cubo, dimensiones, filtro=None):
+    """Estudiantes por valor de `dimensiones` (una columna o una lista), como value_counts/size."""
+    conteos = _filtrar(cubo, filtro).groupby(dimensiones, observed=True, sort=True)['n'].sum()
+    return _etiquetas(conteos)
+
+
+def tabla_cruzada(cubo, filas, columnas, filtro=None):
+    """Equivalente a pd.crosstab(filas, columnas) a partir del cubo."""
+    return _etiquetas(conteo(cubo, [filas, columnas], filtro).unstack(fill_value=0))
+
+
+def promedio(cubo, por, medida, filtro=None):
+    """Promedio de `medida` por valor de `por` (NaN donde no hay valores).
+
+    `medida` puede ser una medida del cubo (con su suma) o una dimensión numérica,
+    cuyos valores se ponderan por 'n'.
+    """
+    cubo = _filtrar(cubo, filtro)
+    if _suma(medida) not in cubo.columns:
+        cubo = cubo.assign(**{_suma(medida): cubo[medida] * cubo['n'],
+                              _no_nulos(medida): cubo['n'].where(cubo[medida].notna(), 0)})
+    sumas = cubo.groupby(por, observed=True, sort=True)[[_suma(medida), _no_nulos(medida)]].sum()
+    return _etiquetas(sumas[_suma(medida)] / sumas[_no_nulos(medida)].where(sumas[_no_nulos(medida)] > 0))
+
+
+def orden_completo(orden, observadas):
+    """`orden` seguido de las demás categorías observadas: ninguna se descarta en silencio."""
+    return list(orden) + [categoria for categoria in observadas if categoria not in orden]
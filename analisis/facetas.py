@@ -0,0 +1,145 @@
+import argparse
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import analizar_asociaciones
+import analizar_combinado
+import analizar_economia
+import analizar_estilo_vida
+from almacen import leer_limpio
+from reglas_limpieza import COLUMNAS_ECONOMIA
+from remuestreo import tabla_intervalos
+from renderizado import crear_pool, renderizar_trabajo
+
+# --- REPORTES POR GRUPO (FACETAS) ---
+# Arma el reporte completo (gráficos y KPIs de las cuatro etapas) para cada grupo
+# de estudiantes: por carrera, por semestre o por cualquier cruce de columnas de
+# la encuesta de economía. Parte de lo que ya limpiaron las etapas normales
+# (02_limpios), así que no se vuelve a leer el CSV crudo ni a limpiar nada.
+#
+# Cada grupo se procesa en un proceso del pool de renderizado. A cada proceso
+# solo le llega el filtro de su grupo: abre los Feather limpios con memory-map
+# (almacen.leer_limpio) y pasa a pandas únicamente las filas del grupo, así que
+# todos comparten las mismas páginas del archivo sin copias ni pickle.
+#
+# La encuesta de estilo de vida no trae carrera ni semestre: sus gráficos por
+# grupo, y los del combinado y las asociaciones, salen del combinado, es decir,
+# de los estudiantes del grupo que contestaron las dos encuestas.
+#
+# Cada grupo queda en resultados/<columnas>/<valores>/: sus PNG y, en CSV, el
+# cubo y los intervalos de cada etapa y los pares de asociaciones. Sin gráficos
+# (modo solo datos) quedan solo los CSV y el pool no carga matplotlib.
+
+output_dir_graficos = '../resultados/'
+
+# Se puede agrupar por cualquier columna limpia de economía (también están en el combinado)
+COLUMNAS_GRUPO = list(COLUMNAS_ECONOMIA)
+
+MODULOS = {
+    'economia': analizar_economia,
+    'estilo_vida': analizar_estilo_vida,
+    'combinado': analizar_combinado,
+}
+
+
+def _nombre(texto):
+    # Nombre de carpeta válido en cualquier sistema ('No especificado' -> 'No_especificado')
+    return re.sub(r'[^\w-]+', '_', str(texto)).strip('_')
+
+
+def dir_grupo(columnas, valores):
+    return os.path.join(output_dir_graficos, '_'.join(map(_nombre, columnas)), '_'.join(map(_nombre, valores)))
+
+
+def grupos(columnas):
+    """Cuántos estudiantes de economía hay en cada combinación observada de `columnas`."""
+    return leer_limpio('economia', columnas).groupby(columnas, observed=True, sort=True).size()
+
+
+def _guardar_csv(df, dir_salida, archivo):
+    ruta = os.path.join(dir_salida, archivo)
+    df.to_csv(ruta, index=False)
+    return ruta
+
+
+def reporte_grupo(filtro, dir_salida, graficos=True):
+    """Gráficos y KPIs de las cuatro etapas con solo las filas de `filtro`; devuelve las rutas escritas."""
+    os.makedirs(dir_salida, exist_ok=True)
+    economia = leer_limpio('economia', filtro=filtro)
+    combinado = leer_limpio('combinado', filtro=filtro)
+    cubos = {'economia': analizar_economia.agregar_para_graficos(economia)}
+    # Sin estudiantes del grupo en ambas encuestas solo queda el reporte de economía
+    if len(combinado):
+        cubos['estilo_vida'] = analizar_estilo_vida.agregar_para_graficos(combinado)
+        cubos['combinado'] = analizar_combinado.agregar_para_graficos(combinado)
+
+    rutas, trabajos = [], []
+    for etapa, cubo in cubos.items():
+        trabajos_etapa = MODULOS[etapa].trabajos_graficos(cubo, dir_salida)
+        rutas += [_guardar_csv(cubo, dir_salida, f'{etapa}_cubo.csv'),
+                  _guardar_csv(tabla_intervalos(trabajos_etapa), dir_salida, f'{etapa}_intervalos.csv')]
+        trabajos += trabajos_etapa
+    if len(combinado):
+        pares, _, _ = analizar_asociaciones.asociaciones(combinado)
+        rutas.append(_guardar_csv(pares, dir_salida, 'asociaciones_pares.csv'))
+        # Con muy pocos estudiantes ningún par tiene V de Cramér y no hay nada que dibujar
+        if pares['v_cramer'].notna().any():
+            trabajos += analizar_asociaciones.trabajos_graficos(pares, dir_salida)
+    if not graficos:
+        return rutas
+    # El proceso ya es uno del pool: dibuja sus gráficos en serie
+    return rutas + [renderizar_trabajo(trabajo) for trabajo in trabajos]
+
+
+def ejecutar(facetas, max_procesos=None, graficos=True):
+    """Reporte de cada grupo de cada faceta (una lista de columnas), en paralelo.
+
+    Devuelve {carpeta del grupo: rutas escritas}.
+    """
+    tareas = []
+    for columnas in facetas:
+        for valores, estudiantes in grupos(columnas).items():
+            valores = valores if isinstance(valores, tuple) else (valores,)
+            tareas.append((dict(zip(columnas, valores)), dir_grupo(columnas, valores), estudiantes))
+    if not tareas:
+        return {}
+
+    print(f"\nReportes por grupo: {len(tareas)} grupos.")
+    resultados = {}
+    procesos = min(len(tareas), max_procesos or os.cpu_count())
+    with (crear_pool(procesos) if graficos else ProcessPoolExecutor(procesos)) as pool:
+        futuros = {pool.submit(reporte_grupo, filtro, dir_salida, graficos): (dir_salida, estudiantes)
+                   for filtro, dir_salida, estudiantes in tareas}
+        for futuro in as_completed(futuros):
+            dir_salida, estudiantes = futuros[futuro]
+            resultados[dir_salida] = futuro.result()
+            print(f"  {dir_salida}: {estudiantes} estudiantes, {len(resultados[dir_salida])} archivos.")
+    return resultados
+
+
+def leer_facetas(parser, textos):
+    """'Carrera' agrupa por carrera; 'Carrera,Semestre' cruza ambas columnas."""
+    facetas = [texto.split(',') for texto in textos]
+    desconocidas = sorted({columna for columnas in facetas for columna in columnas} - set(COLUMNAS_GRUPO))
+    if desconocidas:
+        parser.error(f"No se puede agrupar por {', '.join(desconocidas)}; opciones: {', '.join(COLUMNAS_GRUPO)}.")
+    return facetas
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Genera el reporte completo para cada grupo de estudiantes.')
+    parser.add_argument('facetas', nargs='+', metavar='COLUMNAS',
+                        help='Columna por la que se agrupa (p. ej. Carrera); "Carrera,Semestre" cruza ambas.')
+    parser.add_argument('--solo-datos', action='store_true',
+                        help='Solo los KPIs de cada grupo (CSV), sin dibujar gráficos.')
+    parser.add_argument('--procesos', type=int,
+                        help='Máximo de grupos procesándose en paralelo (por defecto, uno por núcleo).')
+    args = parser.parse_args()
+    facetas = leer_facetas(parser, args.facetas)
+    try:
+        ejecutar(facetas, args.procesos, graficos=not args.solo_datos)
+    except FileNotFoundError:
+        print("Error: No se encontraron los datos limpios; ejecuta primero remoto.py.")
+        raise
+    print(f"\nRevisa las carpetas por grupo dentro de '{output_dir_graficos}'.")
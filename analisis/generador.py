@@ -0,0 +1,168 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from ingesta import ESQUEMAS, leer_encabezado, ruta_encuesta
+from reglas_limpieza import COLUMNAS_ECONOMIA, COLUMNAS_ESTILO_VIDA, TABLAS
+
+# --- GENERADOR DE ENCUESTAS SINTÉTICAS ---
+# Escribe encuesta_economia.csv y encuesta_estilo_vida.csv del tamaño pedido, con
+# los mismos encabezados que las encuestas reales, para medir cómo escala el
+# análisis (ver benchmark.py). Por columna:
+#   - Timestamp: creciente, con el formato de Google Forms.
+#   - Numero_Cuenta: números de 9 dígitos; una fracción `solapamiento` de las
+#     cuentas contesta las dos encuestas y una fracción `duplicados` de las filas
+#     son respuestas repetidas de una cuenta que ya contestó.
+#   - Columnas que limpian las reglas: respuestas reales de la muestra y, con
+#     probabilidad `variedad`, frases armadas con las palabras clave de las tablas
+#     de reglas (así aparecen textos que la caché de normalización no conoce).
+#   - Horas_Sueño y Promedio_Escolar: números como los escribe la gente ("7",
+#     "6-8", "8.25") mezclados con respuestas reales.
+#   - El resto: respuestas reales de la muestra, con su misma distribución.
+# Se genera por bloques, así que la memoria no depende de la cantidad de filas.
+
+dir_sinteticos = '../data/sinteticos/'
+
+FILAS_POR_BLOQUE = 250_000
+INICIO_TIMESTAMP = pd.Timestamp('2025-10-07 08:00:00')
+
+PLANTILLAS_CONTIENE = ['{}', '{}, la verdad', 'creo que {}', 'Pues {} jaja', 'diría que {} por ahora']
+PLANTILLAS_EMPIEZA = ['{}', '{}, la verdad', '{} por el momento']
+RELLENOS = ['', '', ' ', '. ', ' :(', ' (depende del mes)']
+
+
+def frases_reglas(nombre_tabla):
+    """Frases que contienen (o empiezan con) las palabras clave de una tabla de reglas."""
+    frases = []
+    for _, condiciones in TABLAS[nombre_tabla]['reglas']:
+        for palabra in condiciones.get('contiene', []) + condiciones.get('palabra', []):
+            frases += [plantilla.format(palabra) for plantilla in PLANTILLAS_CONTIENE]
+        for prefijo in condiciones.get('empieza', []):
+            frases += [plantilla.format(prefijo) for plantilla in PLANTILLAS_EMPIEZA]
+    # Variantes con mayúsculas, como se escriben en el formulario
+    return np.array(frases + [frase.capitalize() for frase in frases], dtype=object)
+
+
+def respuestas_muestra(encuesta):
+    """Respuestas reales de la muestra por nombre canónico de columna (vacío = sin respuesta)."""
+    muestra = pd.read_csv(ruta_encuesta(encuesta), encoding='utf-8-sig', dtype=str, keep_default_na=False)
+    return {nombre: muestra.iloc[:, posicion].to_numpy(dtype=object)
+            for nombre, posicion, _, _ in ESQUEMAS[encuesta]['columnas']}
+
+
+def _elegir(rng, valores, n):
+    return valores[rng.integers(len(valores), size=n)]
+
+
+def _mezclar(rng, reales, sinteticos, variedad):
+    sinteticos = np.asarray(sinteticos, dtype=object)
+    usar_sintetico = rng.random(len(reales)) < variedad
+    reales[usar_sintetico] = sinteticos[usar_sintetico]
+    return reales
+
+
+def _horas_sueno(rng, n):
+    horas = rng.normal(6.5, 1.3, size=n).clip(2, 12)
+    rangos = pd.Series(np.floor(horas).astype(int)).astype(str) + '-' + pd.Series(np.floor(horas).astype(int) + 2).astype(str)
+    enteros = pd.Series(np.round(horas).astype(int)).astype(str)
+    return np.where(rng.random(n) < 0.15, rangos, enteros).astype(object)
+
+
+def _promedios(rng, n):
+    promedios = pd.Series(rng.normal(8.3, 0.7, size=n).clip(5, 10))
+    return np.where(rng.random(n) < 0.5, promedios.map('{:.1f}'.format), promedios.map('{:.2f}'.format)).astype(object)
+
+
+def _timestamps(inicio, segundos):
+    instantes = pd.Series(inicio + pd.to_timedelta(segundos, unit='s'))
+    # Formato de Google Forms: sin ceros a la izquierda en mes, día y hora
+    return (instantes.dt.month.astype(str) + '/' + instantes.dt.day.astype(str) + '/'
+            + instantes.dt.year.astype(str) + ' ' + instantes.dt.hour.astype(str) + ':'
+            + instantes.dt.strftime('%M:%S')).to_numpy(dtype=object)
+
+
+def cuentas_encuestas(rng, filas, solapamiento, duplicados):
+    """Números de cuenta (en orden de respuesta) para cada encuesta."""
+    distintas = max(1, round(filas * (1 - duplicados)))
+    compartidas = round(distintas * solapamiento)
+    # Cuentas de 9 dígitos distintas, sin armar el rango completo en memoria
+    universo = rng.choice(900_000_000, size=2 * distintas - compartidas, replace=False) + 100_000_000
+    cuentas = {
+        'economia': universo[:distintas],
+        'estilo_vida': np.concatenate([universo[:compartidas], universo[distintas:]]),
+    }
+    for encuesta, distintas_encuesta in cuentas.items():
+        rng.shuffle(distintas_encuesta)
+        # Las respuestas repetidas son de cuentas que ya contestaron antes
+        repetidas = filas - len(distintas_encuesta)
+        posiciones = rng.integers(1, len(distintas_encuesta) + 1, size=repetidas)
+        orden = np.insert(distintas_encuesta, posiciones, -1)
+        for i in np.flatnonzero(orden == -1):
+            orden[i] = orden[rng.integers(i)]
+        cuentas[encuesta] = orden
+    return cuentas
+
+
+def generar_encuesta(encuesta, filas, cuentas, ruta, variedad, rng):
+    reglas = {**COLUMNAS_ECONOMIA, **COLUMNAS_ESTILO_VIDA}
+    crudas_con_reglas = {columna_cruda: tabla for columna_cruda, tabla in reglas.values()}
+    muestra = respuestas_muestra(encuesta)
+    frases = {columna: frases_reglas(tabla) for columna, tabla in crudas_con_reglas.items() if columna in muestra}
+    encabezado = leer_encabezado(ruta_encuesta(encuesta))
+
+    segundos = 0.0
+    for inicio in range(0, filas, FILAS_POR_BLOQUE):
+        n = min(FILAS_POR_BLOQUE, filas - inicio)
+        pasos = np.cumsum(rng.exponential(45.0, size=n)).round()
+        bloque = {}
+        for nombre, _, _, _ in ESQUEMAS[encuesta]['columnas']:
+            if nombre == 'Timestamp':
+                bloque[nombre] = _timestamps(INICIO_TIMESTAMP, segundos + pasos)
+            elif nombre == 'Numero_Cuenta':
+                bloque[nombre] = cuentas[inicio:inicio + n].astype(str).astype(object)
+            elif nombre == 'Horas_Sueño':
+                bloque[nombre] = _mezclar(rng, _elegir(rng, muestra[nombre], n), _horas_sueno(rng, n), 0.8)
+            elif nombre == 'Promedio_Escolar':
+                bloque[nombre] = _mezclar(rng, _elegir(rng, muestra[nombre], n), _promedios(rng, n), 0.8)
+            elif nombre in frases:
+                sinteticas = _elegir(rng, frases[nombre], n) + _elegir(rng, np.array(RELLENOS, dtype=object), n)
+                bloque[nombre] = _mezclar(rng, _elegir(rng, muestra[nombre], n), sinteticas, variedad)
+            else:
+                bloque[nombre] = _elegir(rng, muestra[nombre], n)
+        segundos += pasos[-1]
+        df = pd.DataFrame(bloque)
+        df.columns = encabezado
+        df.to_csv(ruta, mode='w' if inicio == 0 else 'a', header=inicio == 0, index=False, encoding='utf-8')
+
+
+def generar(filas, destino=None, solapamiento=0.9, duplicados=0.01, variedad=0.3, semilla=0):
+    """Escribe las dos encuestas sintéticas de `filas` filas en `destino`; devuelve sus rutas."""
+    destino = destino or os.path.join(dir_sinteticos, str(filas))
+    os.makedirs(destino, exist_ok=True)
+    rng = np.random.default_rng(semilla)
+    cuentas = cuentas_encuestas(rng, filas, solapamiento, duplicados)
+    rutas = {}
+    for encuesta, esquema in ESQUEMAS.items():
+        rutas[encuesta] = os.path.join(destino, esquema['archivo'])
+        generar_encuesta(encuesta, filas, cuentas[encuesta], rutas[encuesta], variedad, rng)
+    return rutas
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Genera encuestas sintéticas para medir cómo escala el análisis.')
+    parser.add_argument('filas', type=int, nargs='+', help='Filas de cada encuesta (se genera un par por tamaño).')
+    parser.add_argument('--solapamiento', type=float, default=0.9,
+                        help='Fracción de cuentas que contestan las dos encuestas (por defecto 0.9).')
+    parser.add_argument('--duplicados', type=float, default=0.01,
+                        help='Fracción de filas que son respuestas repetidas (por defecto 0.01).')
+    parser.add_argument('--variedad', type=float, default=0.3,
+                        help='Probabilidad de una frase armada con las reglas en vez de una respuesta real.')
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--destino', help=f"Carpeta de salida (por defecto '{dir_sinteticos}<filas>/').")
+    args = parser.parse_args()
+    for filas in args.filas:
+        destino = args.destino and os.path.join(args.destino, str(filas))
+        rutas = generar(filas, destino, args.solapamiento, args.duplicados, args.variedad, args.semilla)
+        print(f"{filas} filas: {', '.join(rutas.values())}")
@@ -0,0 +1,272 @@
+import matplotlib
+# Backend sin ventana: los gráficos solo se escriben a PNG (y así funciona en procesos sin pantalla)
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+import seaborn as sns
+
+# --- TIPOS DE GRÁFICO ---
+# Cada función dibuja un gráfico completo a partir de datos ya calculados (conteos,
+# tablas, promedios) y lo guarda en `ruta`. No dependen de los DataFrames de las
+# etapas, así que cada gráfico es un trabajo independiente que puede correr en
+# cualquier proceso (ver renderizado.py). Un trabajo es la tupla
+#   (tipo, datos, ruta, estilo)
+# donde `tipo` es una llave de GRAFICOS y `estilo` sus argumentos (títulos, colores...).
+# Con `intervalos` (ver remuestreo.py: columnas 'inferior' y 'superior' por
+# categoría) cada valor se dibuja con su intervalo de confianza.
+
+sns.set_style("whitegrid")
+plt.rcParams['font.family'] = 'sans-serif'
+
+
+def _limites(datos, intervalos):
+    """(inferior, superior) alineados con `datos`."""
+    alineados = intervalos.reindex(datos.index)
+    return alineados['inferior'].to_numpy(dtype=float), alineados['superior'].to_numpy(dtype=float)
+
+
+def _barras_error(ax, datos, intervalos, horizontal):
+    inferior, superior = _limites(datos, intervalos)
+    valores = datos.to_numpy(dtype=float)
+    errores = np.vstack([valores - inferior, superior - valores]).clip(min=0)
+    posiciones = np.arange(len(datos))
+    if horizontal:
+        ax.errorbar(valores, posiciones, xerr=errores, fmt='none', ecolor='0.3', capsize=4, lw=1)
+    else:
+        ax.errorbar(posiciones, valores, yerr=errores, fmt='none', ecolor='0.3', capsize=4, lw=1)
+    return inferior, superior
+
+
+def barras_conteo(datos, ruta, titulo, etiqueta_x, etiqueta_y, horizontal=False, tamano_titulo=16, dpi=None,
+                  intervalos=None):
+    """Barras de un conteo por categoría, en el orden del índice y con el valor anotado."""
+    plt.figure(figsize=(10, 7))
+    if horizontal:
+        ax = sns.barplot(x=datos.values, y=datos.index, order=datos.index,
+                         palette='coolwarm', hue=datos.index, legend=False)
+    else:
+        ax = sns.barplot(x=datos.index, y=datos.values, order=datos.index,
+                         palette='coolwarm', hue=datos.index, legend=False)
+    plt.title(titulo, fontsize=tamano_titulo, fontweight='bold')
+    plt.xlabel(etiqueta_x, fontsize=12)
+    plt.ylabel(etiqueta_y, fontsize=12)
+    valores = datos.to_numpy()
+    etiquetas = [f'{int(valor)}' for valor in valores]
+    extremos = valores
+    if intervalos is not None:
+        # El valor y su intervalo se anotan al final de la barra de error
+        inferior, extremos = _barras_error(ax, datos, intervalos, horizontal)
+        etiquetas = [f'{etiqueta} [{bajo:.0f}–{alto:.0f}]' for etiqueta, bajo, alto in zip(etiquetas, inferior, extremos)]
+        ax.margins(**{'x' if horizontal else 'y': 0.15})
+    for posicion, (valor, extremo, etiqueta) in enumerate(zip(valores, extremos, etiquetas)):
+        if valor <= 0:
+            continue
+        if horizontal:
+            ax.annotate(etiqueta, (extremo, posicion), ha='left', va='center',
+                        xytext=(5, 0), textcoords='offset points')
+        else:
+            ax.annotate(etiqueta, (posicion, extremo), ha='center', va='center',
+                        xytext=(0, 10), textcoords='offset points')
+    plt.tight_layout()
+    plt.savefig(ruta, dpi=dpi)
+    plt.close()
+
+
+def pastel(datos, ruta, titulo, colores, angulo_inicio, tamano_titulo=16, dpi=None, intervalos=None):
+    """Pastel de un conteo con porcentaje y cantidad; `colores` puede ser el nombre de una paleta.
+
+    Aquí los `intervalos` son de la proporción de cada categoría (0 a 1).
+    """
+    plt.figure(figsize=(10, 10))
+    total = datos.sum()
+    # autopct se llama una vez por porción, en el orden de `datos`
+    rangos = iter(zip(*_limites(datos, intervalos))) if intervalos is not None else None
+
+    def mostrar_porcentaje_y_valor(pct):
+        valor = int(round(pct/100 * total))
+        if rangos is not None:
+            bajo, alto = next(rangos)
+            return f'{pct:.1f}%\n({valor:d})\n[{bajo * 100:.1f}–{alto * 100:.1f}%]'
+        return f'{pct:.1f}%\n({valor:d})'
+
+    if isinstance(colores, str):
+        colores = sns.color_palette(colores)
+    plt.pie(datos,
+            labels=datos.index,
+            autopct=mostrar_porcentaje_y_valor,
+            startangle=angulo_inicio,
+            colors=colores)
+    plt.title(titulo, fontsize=tamano_titulo, fontweight='bold')
+    plt.ylabel('')
+    plt.savefig(ruta, dpi=dpi)
+    plt.close()
+
+
+def estadisticas_caja(distribucion, etiqueta):
+    # Mismas estadísticas que matplotlib.cbook.boxplot_stats, pero a partir de un
+    # conteo valor -> frecuencia en lugar de la lista completa de valores
+    distribucion = distribucion.sort_index()
+    valores = distribucion.index.to_numpy(dtype=float)
+    acumuladas = np.cumsum(distribucion.to_numpy())
+    n = acumuladas[-1]
+
+    def valor_en(posicion):
+        return valores[np.searchsorted(acumuladas, posicion, side='right')]
+
+    def percentil(q):
+        h = q / 100 * (n - 1)
+        bajo = int(np.floor(h))
+        return valor_en(bajo) + (h - bajo) * (valor_en(min(bajo + 1, n - 1)) - valor_en(bajo))
+
+    q1, mediana, q3 = percentil(25), percentil(50), percentil(75)
+    rango = q3 - q1
+    arriba = valores[valores <= q3 + 1.5 * rango]
+    abajo = valores[valores >= q1 - 1.5 * rango]
+    bigote_alto = q3 if len(arriba) == 0 or arriba.max() < q3 else arriba.max()
+    bigote_bajo = q1 if len(abajo) == 0 or abajo.min() > q1 else abajo.min()
+    return {
+        'label': etiqueta, 'q1': q1, 'med': mediana, 'q3': q3,
+        'whislo': bigote_bajo, 'whishi': bigote_alto,
+        'fliers': valores[(valores < bigote_bajo) | (valores > bigote_alto)],
+    }
+
+
+def cajas_por_nivel(datos, ruta, orden, titulo, etiqueta_x, etiqueta_y, limites_y, tamano_titulo=16, dpi=None,
+                    intervalos=None):
+    """Boxplot por nivel a partir de un conteo (nivel, valor) -> frecuencia, con ax.bxp.
+
+    Los `intervalos` son de la mediana de cada nivel y se dibujan como muescas.
+    """
+    niveles_presentes = set(datos.index.get_level_values(0))
+    cajas = [(posicion, estadisticas_caja(datos.xs(nivel), nivel))
+             for posicion, nivel in enumerate(orden) if nivel in niveles_presentes]
+    if intervalos is not None:
+        for _, estadisticas in cajas:
+            estadisticas['cilo'] = intervalos.loc[estadisticas['label'], 'inferior']
+            estadisticas['cihi'] = intervalos.loc[estadisticas['label'], 'superior']
+    colores = sns.color_palette('coolwarm', len(orden), desat=0.75)
+    fig, ax = plt.subplots(figsize=(12, 8))
+    artistas = ax.bxp([estadisticas for _, estadisticas in cajas],
+                      positions=[posicion for posicion, _ in cajas],
+                      widths=0.8, patch_artist=True, manage_ticks=False, shownotches=intervalos is not None,
+                      medianprops={'color': '0.4'}, whiskerprops={'color': '0.4'},
+                      capprops={'color': '0.4'}, boxprops={'edgecolor': '0.4'})
+    for caja, (posicion, _) in zip(artistas['boxes'], cajas):
+        caja.set_facecolor(colores[posicion])
+    ax.set_xticks(range(len(orden)), orden)
+    ax.set_xlim(-0.5, len(orden) - 0.5)
+    plt.title(titulo, fontsize=tamano_titulo, fontweight='bold')
+    plt.xlabel(etiqueta_x, fontsize=12)
+    plt.ylabel(etiqueta_y, fontsize=12)
+    plt.ylim(*limites_y)
+    plt.tight_layout()
+    plt.savefig(ruta, dpi=dpi)
+    plt.close()
+
+
+def mapa_calor(datos, ruta, titulo, etiqueta_x, etiqueta_y, dpi=None, intervalos=None):
+    """Heatmap de una tabla de contingencia ya ordenada.
+
+    Los `intervalos` vienen por celda, con índice (fila, columna).
+    """
+    plt.figure(figsize=(12, 8))
+    anotaciones, formato = True, 'd'
+    if intervalos is not None:
+        limites = {limite: intervalos[limite].unstack().reindex(index=datos.index, columns=datos.columns).fillna(0)
+                   for limite in ('inferior', 'superior')}
+        anotaciones = datos.astype(int).astype(str) + '\n[' + limites['inferior'].round().astype(int).astype(str) \
+            + '–' + limites['superior'].round().astype(int).astype(str) + ']'
+        formato = ''
+    sns.heatmap(datos, annot=anotaciones, fmt=formato, cmap='YlGnBu')
+    plt.title(titulo, fontsize=16, fontweight='bold')
+    plt.ylabel(etiqueta_y, fontsize=12)
+    plt.xlabel(etiqueta_x, fontsize=12)
+    plt.tight_layout()
+    plt.savefig(ruta, dpi=dpi)
+    plt.close()
+
+
+def mapa_asociaciones(datos, ruta, titulo, dpi=None):
+    """Heatmap de una matriz simétrica de asociaciones (0 a 1), ya ordenada de mayor a menor."""
+    # Solo el triángulo inferior, sin la diagonal (la primera fila y la última columna quedarían vacías)
+    triangulo = datos.iloc[1:, :-1]
+    plt.figure(figsize=(12, 10))
+    sns.heatmap(triangulo, annot=True, fmt='.2f', cmap='rocket_r', vmin=0, vmax=1, square=True,
+                mask=np.triu(np.ones(triangulo.shape, dtype=bool), k=1), cbar_kws={'label': 'V de Cramér'})
+    plt.grid(False)
+    plt.title(titulo, fontsize=16, fontweight='bold')
+    plt.xticks(rotation=45, ha='right')
+    plt.tight_layout()
+    plt.savefig(ruta, dpi=dpi)
+    plt.close()
+
+
+def barras_promedio(datos, ruta, titulo, subtitulo, etiqueta_y, n, dpi=None, intervalos=None):
+    """Barras verticales de un promedio por categoría, con el valor a dos decimales."""
+    fig, ax = plt.subplots(figsize=(12, 7))
+    sns.barplot(x=datos.index,
+                y=datos.values,
+                palette='viridis',
+                ax=ax,
+                hue=datos.index,
+                legend=False)
+    ax.set_title(titulo, fontsize=16, fontweight='bold', pad=25)
+    fig.suptitle(subtitulo, fontsize=12, color='gray')
+    ax.set_ylabel(etiqueta_y, fontsize=12, fontweight='bold')
+    ax.set_xlabel('')
+    if intervalos is not None:
+        inferior, superior = _barras_error(ax, datos, intervalos, horizontal=False)
+        # Sin hue cada barra es un contenedor aparte
+        for contenedor, valor, bajo, alto in zip(ax.containers, datos.to_numpy(), inferior, superior):
+            ax.bar_label(contenedor, labels=[f'{valor:.2f}\n[{bajo:.2f}–{alto:.2f}]'], size=11,
+                         fontweight='bold', label_type='center')
+    else:
+        ax.bar_label(ax.containers[0], fmt='%.2f', size=12, fontweight='bold')
+    sns.despine(left=True, bottom=True)
+    if not datos.empty:
+        if intervalos is not None:
+            plt.ylim(np.nanmin(inferior) * 0.95, np.nanmax(superior) * 1.02)
+        else:
+            plt.ylim(datos.min() * 0.95, datos.max() * 1.02)
+    _pie_de_fuente(n)
+    plt.savefig(ruta, dpi=dpi)
+    plt.close()
+
+
+def barras_horizontales(datos, ruta, titulo, subtitulo, etiqueta_x, n, paleta, dpi=None, intervalos=None):
+    """Barras horizontales de un conteo, coloreadas con una paleta secuencial."""
+    fig, ax = plt.subplots(figsize=(12, 7))
+    barras = ax.barh(datos.index, datos.values, color=sns.color_palette(paleta, len(datos)))
+    ax.set_title(titulo, fontsize=16, fontweight='bold', pad=25)
+    fig.suptitle(subtitulo, fontsize=12, color='gray')
+    ax.set_xlabel(etiqueta_x, fontsize=12, fontweight='bold')
+    ax.set_ylabel('')
+    if intervalos is not None:
+        inferior, superior = _barras_error(ax, datos, intervalos, horizontal=True)
+        # Como en barras_conteo, la etiqueta va al final de la barra de error
+        for posicion, (valor, bajo, alto) in enumerate(zip(datos.to_numpy(), inferior, superior)):
+            ax.annotate(f'{valor} [{bajo:.0f}–{alto:.0f}]', (alto, posicion), ha='left', va='center',
+                        size=12, xytext=(5, 0), textcoords='offset points')
+        ax.margins(x=0.2)
+    else:
+        ax.bar_label(barras, size=12, padding=5)
+    sns.despine(left=True, bottom=True)
+    _pie_de_fuente(n)
+    plt.savefig(ruta, dpi=dpi)
+    plt.close()
+
+
+def _pie_de_fuente(n):
+    plt.tight_layout(rect=[0, 0.05, 1, 0.95])
+    plt.figtext(0.99, 0.01, f'Fuente: Encuesta Estudiantil (N={n})', horizontalalignment='right', size=8, color='grey')
+
+
+GRAFICOS = {
+    'barras_conteo': barras_conteo,
+    'pastel': pastel,
+    'cajas_por_nivel': cajas_por_nivel,
+    'mapa_calor': mapa_calor,
+    'mapa_asociaciones': mapa_asociaciones,
+    'barras_promedio': barras_promedio,
+    'barras_horizontales': barras_horizontales,
+}
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import uuid
+
+import pandas as pd
+
+from almacen import EscritorLimpio, leer_limpio
+from bloques import TAMANO_BLOQUE, limpiar_en_bloques
+from cubo import leer_cubo, sumar_cubos
+from ingesta import convertir_timestamp
+
+# --- MODO INCREMENTAL (MARCAS DE AGUA POR Timestamp) ---
+# Las respuestas nuevas solo llegan como filas agregadas al final de las
+# encuestas, así que cada etapa guarda el último Timestamp que procesó de cada
+# fuente (su marca de agua) y cuántas filas con ese mismo Timestamp ya procesó:
+# Google Forms registra segundos, así que una respuesta que llega después puede
+# tener el mismo Timestamp que la última procesada. En modo incremental solo se
+# limpian las filas posteriores a la marca (y, de las que están en la marca,
+# las que siguen a las ya procesadas), se anexan a los datos limpios y su cubo
+# se suma al guardado; el combinado solo une los números de cuenta nuevos.
+#
+# Cada registro lleva una firma de lo que haría incompatibles los datos viejos
+# con los nuevos (versiones de las reglas, dimensiones del cubo, formatos) y una
+# 'base' que cambia con cada corrida completa. Si la firma no coincide, falta una
+# salida o cambió la base de una etapa anterior, se hace una corrida completa.
+# Las filas sin un Timestamp válido solo entran en corridas completas.
+
+dir_marcas = '../data/marcas/'
+
+
+def _ruta_marcas(etapa):
+    # Un archivo por etapa: las etapas corren en procesos paralelos
+    return os.path.join(dir_marcas, f'{etapa}.json')
+
+
+def firma(**partes):
+    contenido = json.dumps(partes, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()[:16]
+
+
+def cargar_marcas(etapa):
+    try:
+        with open(_ruta_marcas(etapa), encoding='utf-8') as archivo:
+            return json.load(archivo)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def marcas_vigentes(etapa, firma_actual, salidas):
+    """Registro de la última corrida de `etapa` si se puede continuar desde él; si no, None."""
+    registro = cargar_marcas(etapa)
+    if not registro or registro.get('firma') != firma_actual or 'en_marca' not in registro:
+        return None
+    if any(marca is None for marca in registro['marcas'].values()):
+        return None
+    if not all(os.path.exists(ruta) for ruta in salidas):
+        return None
+    return registro
+
+
+def registrar_marcas(etapa, firma_actual, marcas, base=None):
+    """Guarda las marcas {fuente: (último Timestamp, filas con ese Timestamp)}.
+
+    Sin `base` se trata de una corrida completa.
+    """
+    os.makedirs(dir_marcas, exist_ok=True)
+    registro = {
+        'firma': firma_actual,
+        'base': base or uuid.uuid4().hex,
+        'marcas': {fuente: None if pd.isna(marca) else pd.Timestamp(marca).isoformat()
+                   for fuente, (marca, _) in marcas.items()},
+        'en_marca': {fuente: int(en_marca) for fuente, (_, en_marca) in marcas.items()},
+    }
+    ruta = _ruta_marcas(etapa)
+    temporal = f'{ruta}.tmp'
+    with open(temporal, 'w', encoding='utf-8') as archivo:
+        json.dump(registro, archivo, indent=2)
+    os.replace(temporal, ruta)
+    return registro
+
+
+def base_de(etapa):
+    registro = cargar_marcas(etapa)
+    return registro and registro['base']
+
+
+def marca_de(registro, fuente):
+    """(Timestamp de la marca, filas con ese Timestamp ya procesadas)."""
+    return pd.Timestamp(registro['marcas'][fuente]), registro['en_marca'][fuente]
+
+
+def posteriores(timestamps, marca):
+    """Máscara de las filas que no se procesaron antes de `marca` (ver marca_de).
+
+    Las filas llegan en orden: de las que tienen el Timestamp de la marca, las
+    primeras ya se procesaron y las siguientes son nuevas.
+    """
+    momento, vistas = marca
+    en_marca = timestamps == momento
+    return (timestamps > momento) | (en_marca & (en_marca.cumsum() > vistas))
+
+
+def marca_agua(timestamps):
+    """(Timestamp más reciente, cuántas filas lo tienen)."""
+    momento = timestamps.max()
+    return momento, 0 if pd.isna(momento) else int((timestamps == momento).sum())
+
+
+def marca_limpio(nombre):
+    """Marca de agua de un conjunto limpio (ver marca_agua)."""
+    return marca_agua(leer_limpio(nombre, ['Timestamp'])['Timestamp'])
+
+
+def limpiar_incremental(encuesta, limpiar, agregar, formatos, marca, tamano_bloque=TAMANO_BLOQUE):
+    """Limpia solo las filas de `encuesta` posteriores a `marca` y las anexa a sus datos limpios.
+
+    La encuesta cruda se recorre por bloques, así que la memoria no depende del
+    tamaño del archivo. Devuelve (cubo actualizado, filas nuevas, primeras filas nuevas).
+    """
+    momento, vistas = marca
+
+    def limpiar_nuevas(bloque):
+        # Las filas de la marca ya procesadas pueden repartirse entre varios bloques
+        nonlocal vistas
+        timestamps = convertir_timestamp(bloque['Timestamp'])
+        nuevas = posteriores(timestamps, (momento, vistas))
+        vistas = max(0, vistas - int((timestamps == momento).sum()))
+        return limpiar(bloque[nuevas])
+
+    cubo_nuevo, filas, primeras_filas = limpiar_en_bloques(
+        encuesta, limpiar_nuevas, agregar, EscritorLimpio(encuesta, formatos, anexar=True), tamano_bloque)
+    return sumar_cubos(leer_cubo(encuesta), cubo_nuevo), filas, primeras_filas
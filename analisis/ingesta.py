@@ -0,0 +1,138 @@
+import os
+
+import pandas as pd
+
+# --- ESQUEMAS DE LAS ENCUESTAS CRUDAS ---
+# Los encabezados originales son las preguntas completas del formulario, así que
+# cada columna se identifica por su posición. Por columna guardamos:
+#   (nombre canónico, posición en el archivo, tipo, ¿la necesita la limpieza?)
+# Todo se lee como texto: incluso los campos "numéricos" traen respuestas como
+# "6-8" o "yo creo que más de 10", y la conversión se hace al limpiar.
+
+dir_crudos = '../data/01_crudos/'
+
+ESQUEMAS = {
+    'economia': {
+        'archivo': 'encuesta_economia.csv',
+        'columnas': [
+            ('Timestamp', 0, 'str', True),
+            ('Numero_Cuenta', 1, 'str', True),
+            ('Semestre', 2, 'str', True),
+            ('Carrera', 3, 'str', True),
+            ('Situacion_Economica', 4, 'str', True),
+            ('Fuente_Ingresos', 5, 'str', False),
+            ('Gasto_Dificil', 6, 'str', True),
+            ('Impacto_Economico', 7, 'str', True),
+            ('Equilibrio_Trabajo_Estudio', 8, 'str', False),
+            ('Renuncia_Oportunidad', 9, 'str', True),
+            ('Sentimiento_Finanzas', 10, 'str', True),
+            ('Estrategias_Dinero', 11, 'str', False),
+            ('Apoyo_Economico_Deseado', 12, 'str', False),
+            ('Otro_Tipo_Ayuda', 13, 'str', False),
+            ('Utilidad_Educacion_Financiera', 14, 'str', False),
+            ('Situacion_Economica_Ideal_5_Anios', 15, 'str', False),
+            ('Momento_Mayor_Presion', 16, 'str', False),
+            ('Accion_Gasto_Inesperado', 17, 'str', False),
+            ('Recibio_Orientacion_Financiera', 18, 'str', False),
+            ('Consejo_Estudiantes', 19, 'str', False),
+        ],
+    },
+    'estilo_vida': {
+        'archivo': 'encuesta_estilo_vida.csv',
+        'columnas': [
+            ('Timestamp', 0, 'str', True),
+            ('Numero_Cuenta', 1, 'str', True),
+            ('Dias_Ejercicio', 2, 'str', False),
+            ('Actividad_Recreativa', 3, 'str', False),
+            ('Comidas_Dia', 4, 'str', False),
+            ('Toma_Alcohol', 5, 'str', False),
+            ('Horas_Sueño', 6, 'str', True),
+            ('Area_Trabajo', 7, 'str', False),
+            ('Edad', 8, 'str', False),
+            ('Sexo', 9, 'str', True),
+            ('Nivel_Ansiedad', 10, 'str', True),
+            ('Vivienda', 11, 'str', False),
+            ('Tiene_Beca', 12, 'str', True),
+            ('Horas_Pantalla', 13, 'str', False),
+            ('Ingresos_Mensuales', 14, 'str', False),
+            ('Siente_Energia', 15, 'str', True),
+            ('Promedio_Escolar', 16, 'str', True),
+            ('Es_Regular', 17, 'str', False),
+            ('Ayuda_Psicologica', 18, 'str', False),
+            ('Tiene_Pareja', 19, 'str', False),
+            ('Alguien_Depende_Economicamente', 20, 'str', False),
+        ],
+    },
+}
+
+# Marca temporal de Google Forms (mes/día/año); es la que usa el modo incremental
+FORMATO_TIMESTAMP = '%m/%d/%Y %H:%M:%S'
+
+try:
+    import pyarrow  # noqa: F401
+    MOTOR_CSV = 'pyarrow'
+except ImportError:
+    MOTOR_CSV = 'c'
+
+
+def ruta_encuesta(encuesta):
+    return os.path.join(dir_crudos, ESQUEMAS[encuesta]['archivo'])
+
+
+def columnas_requeridas(encuesta):
+    return [nombre for nombre, _, _, requerida in ESQUEMAS[encuesta]['columnas'] if requerida]
+
+
+def convertir_timestamp(serie):
+    """Convierte la columna Timestamp cruda a datetime; lo que no tenga el formato queda como NaT."""
+    return pd.to_datetime(serie, format=FORMATO_TIMESTAMP, errors='coerce').astype('datetime64[ns]')
+
+
+def leer_encabezado(ruta):
+    """Encabezado original del archivo (las preguntas del formulario)."""
+    return list(pd.read_csv(ruta, encoding='utf-8-sig', nrows=0).columns)
+
+
+def opciones_lectura(encuesta, ruta, columnas=None):
+    """Argumentos de pd.read_csv para leer solo `columnas` (por defecto, las
+    requeridas) y el mapeo encabezado original -> nombre canónico.
+
+    Las columnas se seleccionan por su encabezado original, que se busca por la
+    posición del esquema; así funciona igual con el motor 'c' que con 'pyarrow'.
+    """
+    esquema = ESQUEMAS[encuesta]['columnas']
+    columnas = columnas or columnas_requeridas(encuesta)
+    desconocidas = set(columnas) - {nombre for nombre, _, _, _ in esquema}
+    if desconocidas:
+        raise KeyError(f"Columnas que no existen en el esquema de '{encuesta}': {sorted(desconocidas)}")
+
+    encabezado = leer_encabezado(ruta)
+    if len(encabezado) != len(esquema):
+        raise ValueError(f"'{ruta}' tiene {len(encabezado)} columnas; el esquema de '{encuesta}' espera {len(esquema)}.")
+
+    seleccion = [(nombre, encabezado[posicion], tipo) for nombre, posicion, tipo, _ in esquema if nombre in columnas]
+    return {
+        'encoding': 'utf-8-sig',
+        'usecols': [original for _, original, _ in seleccion],
+        'dtype': {original: tipo for _, original, tipo in seleccion},
+    }, {original: nombre for nombre, original, _ in seleccion}
+
+
+def leer_encuesta(encuesta, columnas=None, ruta=None):
+    """Lee la encuesta cruda con nombres canónicos, solo las columnas necesarias y tipos explícitos."""
+    ruta = ruta or ruta_encuesta(encuesta)
+    opciones, nombres = opciones_lectura(encuesta, ruta, columnas)
+    df = pd.read_csv(ruta, engine=MOTOR_CSV, **opciones)
+    return df.rename(columns=nombres)
+
+
+def leer_encuesta_por_bloques(encuesta, tamano_bloque, columnas=None, ruta=None):
+    """Igual que leer_encuesta, pero entrega el archivo en bloques de `tamano_bloque` filas.
+
+    El motor pyarrow no admite lectura por bloques, así que aquí siempre se usa 'c'.
+    """
+    ruta = ruta or ruta_encuesta(encuesta)
+    opciones, nombres = opciones_lectura(encuesta, ruta, columnas)
+    with pd.read_csv(ruta, engine='c', chunksize=tamano_bloque, **opciones) as lector:
+        for bloque in lector:
+            yield bloque.rename(columns=nombres)
@@ -0,0 +1,156 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows: sin pico de memoria
+    resource = None
+
+# --- INSTRUMENTACIÓN DE LA CORRIDA ---
+# `medir(nombre)` envuelve un paso y registra su tiempo de reloj, tiempo de CPU,
+# pico de memoria (RSS) y filas de entrada y salida. Los pasos se anidan (etapa >
+# limpieza > columna) y, si el mismo paso se mide varias veces (un bloque tras
+# otro en modo streaming), se acumula: tiempos y filas se suman y el pico es el
+# mayor. Cada proceso lleva su propio registro; quien corre una etapa o un gráfico
+# en otro proceso lo devuelve con recoger() y el planificador arma el perfil.
+#
+# El perfil se guarda como JSON en perfiles/ (junto a resultados/), uno por corrida.
+
+dir_perfiles = '../perfiles/'
+
+PERFILADORES = ('cprofile', 'pyinstrument')
+
+_abiertas = []
+_registro = {}
+
+
+def estado_memoria():
+    """(RSS actual, pico de RSS) en bytes; lo que el sistema no informe queda en None."""
+    try:
+        with open('/proc/self/status', encoding='ascii') as archivo:
+            campos = dict(linea.split(':', 1) for linea in archivo)
+        return int(campos['VmRSS'].split()[0]) * 1024, int(campos['VmHWM'].split()[0]) * 1024
+    except (OSError, KeyError, ValueError):
+        pass
+    if resource is None:
+        return None, None
+    # macOS: solo el pico, en bytes
+    return None, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def reiniciar_pico():
+    # En Linux el pico (VmHWM) se reinicia escribiendo 5 en clear_refs; sin esto un
+    # proceso hijo arrastraría el pico del padre (ru_maxrss se conserva en execve)
+    try:
+        with open('/proc/self/clear_refs', 'w', encoding='ascii') as archivo:
+            archivo.write('5')
+    except OSError:
+        pass
+
+
+def _actualizar_picos():
+    # Antes de reiniciar el pico (o al cerrar un paso) se anota en todos los pasos abiertos
+    _, pico = estado_memoria()
+    if pico is not None:
+        for abierta in _abiertas:
+            abierta['pico'] = max(abierta['pico'] or 0, pico)
+
+
+@contextmanager
+def medir(nombre, filas_entrada=None):
+    """Mide el bloque `with`; el dict que entrega admite 'filas_salida' (y 'filas_entrada')."""
+    _actualizar_picos()
+    reiniciar_pico()
+    medicion = {'filas_entrada': filas_entrada, 'filas_salida': None, 'pico': None}
+    _abiertas.append(medicion)
+    ruta = tuple(abierta['nombre'] for abierta in _abiertas[:-1]) + (nombre,)
+    medicion['nombre'] = nombre
+    reloj, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield medicion
+    finally:
+        segundos, cpu_segundos = time.perf_counter() - reloj, time.process_time() - cpu
+        _actualizar_picos()
+        _abiertas.pop()
+        _acumular(ruta, segundos, cpu_segundos, medicion)
+
+
+def _acumular(ruta, segundos, cpu_segundos, medicion):
+    anterior = _registro.setdefault(ruta, {'segundos': 0.0, 'cpu_segundos': 0.0, 'pico_rss_mb': None,
+                                           'filas_entrada': None, 'filas_salida': None, 'veces': 0})
+    anterior['segundos'] += segundos
+    anterior['cpu_segundos'] += cpu_segundos
+    anterior['veces'] += 1
+    if medicion['pico'] is not None:
+        anterior['pico_rss_mb'] = max(anterior['pico_rss_mb'] or 0, medicion['pico'] / 2**20)
+    for filas in ('filas_entrada', 'filas_salida'):
+        if medicion[filas] is not None:
+            anterior[filas] = (anterior[filas] or 0) + int(medicion[filas])
+
+
+def recoger():
+    """Devuelve lo registrado en este proceso como [(ruta, medición)] y vacía el registro."""
+    registrado = list(_registro.items())
+    _registro.clear()
+    return registrado
+
+
+def arbol(registrado):
+    """Convierte [(ruta, medición)] en {nombre: {..., 'pasos': {...}}}."""
+    raiz = {}
+    # Primero los pasos externos, para que sus datos aparezcan antes que sus 'pasos'
+    for ruta, medicion in sorted(registrado, key=lambda par: len(par[0])):
+        nivel = raiz
+        for nombre in ruta[:-1]:
+            nivel = nivel.setdefault(nombre, {}).setdefault('pasos', {})
+        nivel.setdefault(ruta[-1], {}).update(medicion)
+    return raiz
+
+
+def completar_filas(nodo):
+    """Filas de una etapa: las que leyeron sus pasos 'lectura' y las que recibió 'escritura'."""
+    pasos = nodo.get('pasos', {})
+    nodo['filas_entrada'] = pasos.get('lectura', {}).get('filas_salida')
+    nodo['filas_salida'] = pasos.get('escritura', {}).get('filas_entrada')
+    return nodo
+
+
+def guardar_perfil(perfil):
+    """Escribe el perfil de una corrida en perfiles/<fecha>.json; devuelve su ruta."""
+    os.makedirs(dir_perfiles, exist_ok=True)
+    ruta = os.path.join(dir_perfiles, f"{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        json.dump(perfil, archivo, indent=2, ensure_ascii=False, default=str)
+    return ruta
+
+
+# --- Captura con un perfilador (una sola etapa) ---
+
+def ruta_captura(etapa, perfilador):
+    extension = 'prof' if perfilador == 'cprofile' else 'html'
+    return os.path.join(dir_perfiles, f"{etapa}_{datetime.now():%Y%m%d-%H%M%S}.{extension}")
+
+
+def con_perfilador(funcion, perfilador, ruta):
+    """Corre `funcion()` bajo cProfile o pyinstrument y guarda la captura en `ruta`."""
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    if perfilador == 'pyinstrument':
+        # Opcional: solo hace falta si se pide este perfilador
+        from pyinstrument import Profiler
+        perfilador_activo = Profiler()
+        perfilador_activo.start()
+        try:
+            return funcion()
+        finally:
+            perfilador_activo.stop()
+            with open(ruta, 'w', encoding='utf-8') as archivo:
+                archivo.write(perfilador_activo.output_html())
+    import cProfile
+    perfilador_activo = cProfile.Profile()
+    try:
+        return perfilador_activo.runcall(funcion)
+    finally:
+        perfilador_activo.dump_stats(ruta)
@@ -0,0 +1,67 @@
+import hashlib
+import json
+import os
+
+from normalizacion import version_tabla
+
+# --- MANIFIESTO DE CONSTRUCCIÓN INCREMENTAL ---
+# Para cada etapa se guarda una huella (sha256) de todo lo que determina su
+# resultado: los bytes de sus archivos de entrada (CSV crudos o datos limpios de
+# etapas anteriores), el código que la ejecuta, la versión de las tablas de
+# reglas que usa y sus opciones. Si la huella coincide con la de la última
+# corrida y sus salidas siguen en disco, la etapa se omite y se reutilizan.
+
+ruta_manifiesto = '../data/manifiesto.json'
+
+TAMANO_LECTURA = 1024 * 1024
+
+
+def _actualizar_con_archivo(hash_, ruta):
+    hash_.update(os.path.basename(ruta).encode('utf-8'))
+    try:
+        with open(ruta, 'rb') as archivo:
+            for bloque in iter(lambda: archivo.read(TAMANO_LECTURA), b''):
+                hash_.update(bloque)
+    except FileNotFoundError:
+        hash_.update(b'<no existe>')
+
+
+def huella_etapa(etapa, opciones):
+    """Huella de una etapa de planificador.ETAPAS con las opciones con que se va a correr."""
+    hash_ = hashlib.sha256()
+    hash_.update(json.dumps(opciones, sort_keys=True).encode('utf-8'))
+    for ruta in etapa.get('codigo', []) + etapa.get('entradas', []):
+        _actualizar_con_archivo(hash_, ruta)
+    # Solo las tablas de reglas que usa la etapa: cambiar una regla de economía
+    # no obliga a volver a limpiar estilo de vida
+    for columna, (columna_cruda, tabla) in sorted(etapa.get('reglas', {}).items()):
+        hash_.update(f'{columna}:{columna_cruda}:{tabla}:{version_tabla(tabla)}'.encode('utf-8'))
+    return hash_.hexdigest()
+
+
+def cargar_manifiesto():
+    try:
+        with open(ruta_manifiesto, encoding='utf-8') as archivo:
+            return json.load(archivo)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def guardar_manifiesto(manifiesto):
+    os.makedirs(os.path.dirname(ruta_manifiesto), exist_ok=True)
+    temporal = f'{ruta_manifiesto}.tmp'
+    with open(temporal, 'w', encoding='utf-8') as archivo:
+        json.dump(manifiesto, archivo, indent=2, ensure_ascii=False)
+    os.replace(temporal, ruta_manifiesto)
+
+
+def etapa_vigente(manifiesto, nombre, huella):
+    """True si la última corrida de `nombre` tuvo la misma huella y sus salidas siguen existiendo."""
+    registro = manifiesto.get(nombre)
+    if not registro or registro.get('huella') != huella:
+        return False
+    return all(os.path.exists(ruta) for ruta in registro.get('salidas', []))
+
+
+def registrar_etapa(manifiesto, nombre, huella, salidas):
+    manifiesto[nombre] = {'huella': huella, 'salidas': list(salidas or [])}
@@ -0,0 +1,121 @@
+import argparse
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from aproximado import clasificar_aproximado, version_busqueda
+from reglas_limpieza import TABLAS, VERSION_MOTOR, aplicar_reglas, tipo_tabla
+
+# --- CACHÉ DE NORMALIZACIÓN ---
+# La mayoría de las respuestas se repiten ("Sí", "No", "Transporte"...), así que
+# cada columna se factoriza, se clasifica una sola vez cada valor distinto y el
+# resultado se reparte de vuelta con los códigos: la columna limpia es una
+# categórica de la tabla, sin un texto por fila. El mapeo crudo -> canónico se
+# guarda en disco (un archivo por tabla de reglas) junto con la versión de la
+# tabla, para que las siguientes oleadas solo clasifiquen textos nunca vistos.
+# Los textos que ninguna regla reconoce pasan además por la clasificación
+# aproximada (aproximado.py, errores de dedo), y su resultado queda también en
+# la caché: la búsqueda se paga una vez por texto distinto, no por fila.
+
+dir_cache = '../data/cache/normalizacion/'
+
+
+def version_tabla(nombre_tabla):
+    """Huella de una tabla de reglas; cambia en cuanto se edita cualquier regla o la búsqueda aproximada."""
+    contenido = json.dumps([VERSION_MOTOR, version_busqueda(), TABLAS[nombre_tabla]],
+                           sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()[:16]
+
+
+def _ruta_tabla(nombre_tabla):
+    return os.path.join(dir_cache, f'{nombre_tabla}.json')
+
+
+def cargar_tabla_cache(nombre_tabla):
+    """Devuelve el mapeo guardado de una tabla, o uno vacío si no existe o es de otra versión."""
+    try:
+        with open(_ruta_tabla(nombre_tabla), encoding='utf-8') as archivo:
+            guardado = json.load(archivo)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    if guardado.get('version') != version_tabla(nombre_tabla):
+        return {}
+    return guardado.get('valores', {})
+
+
+def guardar_cache(cache):
+    """Escribe en disco las tablas de la caché que recibieron valores nuevos."""
+    os.makedirs(dir_cache, exist_ok=True)
+    for nombre_tabla, entrada in cache.items():
+        if not entrada['nuevos']:
+            continue
+        ruta = _ruta_tabla(nombre_tabla)
+        temporal = f'{ruta}.{os.getpid()}.tmp'
+        with open(temporal, 'w', encoding='utf-8') as archivo:
+            json.dump({'version': version_tabla(nombre_tabla), 'valores': entrada['valores']},
+                      archivo, ensure_ascii=False, indent=0, sort_keys=True)
+        os.replace(temporal, ruta)
+        entrada['nuevos'] = 0
+
+
+def invalidar_cache(tablas=None):
+    """Borra la caché de las tablas indicadas (o de todas si no se indica ninguna)."""
+    for nombre_tabla in tablas or TABLAS:
+        try:
+            os.remove(_ruta_tabla(nombre_tabla))
+            print(f"Caché de '{nombre_tabla}' invalidada.")
+        except FileNotFoundError:
+            pass
+
+
+def normalizar_columna(serie, nombre_tabla, cache):
+    """Clasifica una columna cruda usando solo sus valores distintos; devuelve una categórica.
+
+    `cache` es un dict {tabla: {'valores': {...}, 'nuevos': n}} que se va llenando
+    en memoria; se carga desde disco la primera vez que se usa cada tabla.
+    """
+    if nombre_tabla not in cache:
+        cache[nombre_tabla] = {'valores': cargar_tabla_cache(nombre_tabla), 'nuevos': 0}
+    entrada = cache[nombre_tabla]
+    valores = entrada['valores']
+
+    codigos, unicos = pd.factorize(serie.astype(object), use_na_sentinel=True)
+    unicos = pd.Series(unicos, dtype=object)
+
+    # Solo pasamos por las reglas los textos que la caché no conoce
+    pendientes = unicos[~unicos.isin(list(valores))]
+    if not pendientes.empty:
+        clasificados = aplicar_reglas(pendientes, nombre_tabla)
+        sin_regla = clasificados == TABLAS[nombre_tabla]['otro']
+        if sin_regla.any():
+            clasificados[sin_regla] = clasificar_aproximado(pendientes[sin_regla], nombre_tabla)
+        for crudo, etiqueta in zip(pendientes, clasificados):
+            # Solo se guardan textos; los demás tipos son nulos para las reglas
+            if isinstance(crudo, str):
+                valores[crudo] = etiqueta
+                entrada['nuevos'] += 1
+
+    nulo = TABLAS[nombre_tabla]['nulo']
+    etiquetas_unicos = unicos.map(valores).to_numpy(dtype=object)
+    etiquetas_unicos[pd.isna(etiquetas_unicos)] = nulo
+
+    # Cada valor distinto se traduce a su código en las categorías de la tabla.
+    # El código -1 (valor nulo) apunta al último elemento: la etiqueta para nulos
+    tipo = tipo_tabla(nombre_tabla)
+    codigos_etiquetas = tipo.categories.get_indexer(np.append(etiquetas_unicos, nulo)).astype('int8')
+    return pd.Series(pd.Categorical.from_codes(codigos_etiquetas[codigos], dtype=tipo), index=serie.index)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Administra la caché de normalización de respuestas.')
+    parser.add_argument('--invalidar', nargs='*', metavar='TABLA',
+                        help='Borra la caché de las tablas indicadas (todas si no se indica ninguna).')
+    args = parser.parse_args()
+    if args.invalidar is not None:
+        invalidar_cache(args.invalidar)
+    else:
+        for nombre in TABLAS:
+            print(f"{nombre}: {len(cargar_tabla_cache(nombre))} valores en caché (versión {version_tabla(nombre)})")
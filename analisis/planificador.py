@@ -0,0 +1,258 @@
+import importlib
+import os
+import shutil
+import time
+import traceback
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import datetime
+
+from almacen import VARIABLE_MEMORIA, crear_dir_memoria, persistir, ruta_limpio, ruta_vigente
+from ingesta import ruta_encuesta
+from instrumentacion import arbol, completar_filas, con_perfilador, guardar_perfil, medir, recoger, ruta_captura
+from manifiesto import cargar_manifiesto, etapa_vigente, guardar_manifiesto, huella_etapa, registrar_etapa
+from renderizado import crear_pool, ignorar_interrupciones, renderizar_con_perfil, rutas_trabajos
+from reglas_limpieza import COLUMNAS_ECONOMIA, COLUMNAS_ESTILO_VIDA
+
+# --- PLANIFICADOR DE ETAPAS ---
+# Cada etapa es la función ejecutar() de un script de análisis. Las etapas sin
+# dependencias pendientes se lanzan juntas en un pool de procesos, y cada una
+# arranca en cuanto terminan las etapas de las que depende. Si una etapa falla,
+# sus hermanas siguen; solo se omiten las que dependían de ella.
+#
+# Las etapas no dibujan: devuelven sus gráficos como trabajos (graficos.py) que
+# se mandan a un segundo pool, el de renderizado, sin bloquear al planificador.
+# Las dependientes arrancan en cuanto existen los datos limpios; la etapa queda
+# registrada en el manifiesto cuando además terminaron todos sus gráficos.
+#
+# 'codigo', 'entradas' y 'reglas' forman la huella de la etapa (ver
+# manifiesto.py): si no cambiaron desde la última corrida, la etapa se reutiliza.
+#
+# Con `graficos=False` (modo solo datos) el pool de renderizado ni se crea, así
+# que matplotlib y seaborn nunca se importan: solo se limpian, unen y agregan los
+# datos. Una etapa corrida así queda en el manifiesto con otra huella, para que
+# la siguiente corrida completa sí dibuje sus gráficos.
+#
+# Con `memoria=True` las etapas publican sus Feather limpios en memoria compartida
+# (ver almacen.py) y las dependientes los leen de ahí en cuanto existen; la copia
+# a 02_limpios se hace en hilos del planificador mientras siguen las demás etapas,
+# y la etapa queda registrada cuando además terminó esa copia.
+#
+# Los pools se pueden crear una vez (crear_pools) y pasar a varias corridas
+# seguidas, como hace el modo vigilancia: sus procesos quedan con las
+# bibliotecas ya cargadas y no se vuelven a lanzar en cada corrida.
+#
+# Cada etapa y cada gráfico devuelve lo que midió (ver instrumentacion.py); al
+# terminar, el planificador guarda el perfil de la corrida en perfiles/. Una
+# etapa se puede correr además bajo cProfile o pyinstrument (`perfilar`).
+
+CODIGO_LIMPIEZA = ['ingesta.py', 'normalizacion.py', 'aproximado.py', 'bloques.py', 'almacen.py', 'incremental.py']
+CODIGO_GRAFICOS = ['cubo.py', 'graficos.py', 'remuestreo.py']
+
+ETAPAS = {
+    'economia': {
+        'modulo': 'analizar_economia',
+        'depende_de': [],
+        'codigo': ['analizar_economia.py'] + CODIGO_LIMPIEZA + CODIGO_GRAFICOS,
+        'entradas': [ruta_encuesta('economia')],
+        'reglas': COLUMNAS_ECONOMIA,
+    },
+    'estilo_vida': {
+        'modulo': 'analizar_estilo_vida',
+        'depende_de': [],
+        'codigo': ['analizar_estilo_vida.py'] + CODIGO_LIMPIEZA + CODIGO_GRAFICOS,
+        'entradas': [ruta_encuesta('estilo_vida')],
+        'reglas': COLUMNAS_ESTILO_VIDA,
+    },
+    'combinado': {
+        'modulo': 'analizar_combinado',
+        'depende_de': ['economia', 'estilo_vida'],
+        'codigo': ['analizar_combinado.py', 'union.py', 'almacen.py', 'incremental.py'] + CODIGO_GRAFICOS,
+        'entradas': [ruta_limpio('economia'), ruta_limpio('estilo_vida')],
+    },
+    'asociaciones': {
+        'modulo': 'analizar_asociaciones',
+        'depende_de': ['combinado'],
+        'codigo': ['analizar_asociaciones.py', 'almacen.py', 'graficos.py'],
+        'entradas': [ruta_limpio('combinado')],
+    },
+}
+
+OK, REUTILIZADA, ERROR, OMITIDA = 'ok', 'reutilizada', 'error', 'omitida'
+TERMINADA = (OK, REUTILIZADA)
+
+
+def _ejecutar_etapa(nombre, modulo, opciones, captura=None, dir_memoria=None):
+    # Corre dentro del proceso del pool; devuelve (resultado, lo medido)
+    recoger()  # descarta lo que haya quedado de una etapa que falló en este proceso
+    # El proceso puede venir de otra corrida (modo vigilancia): se fija siempre
+    if dir_memoria:
+        os.environ[VARIABLE_MEMORIA] = dir_memoria
+    else:
+        os.environ.pop(VARIABLE_MEMORIA, None)
+    ejecutar = importlib.import_module(modulo).ejecutar
+    with medir(nombre):
+        if captura:
+            resultado = con_perfilador(lambda: ejecutar(**opciones), *captura)
+        else:
+            resultado = ejecutar(**opciones)
+    return resultado, recoger()
+
+
+def _registrar(manifiesto, nombre, registro):
+    registrar_etapa(manifiesto, nombre, registro['huella'], registro['salidas'])
+    guardar_manifiesto(manifiesto)
+    print(f"\n--- Etapa '{nombre}' finalizada ({len(registro['salidas'])} archivos). ---")
+
+
+@contextmanager
+def _memoria_compartida(activa):
+    # Directorio de publicación de la corrida; se borra al final, ya persistido
+    if not activa:
+        yield None
+        return
+    directorio = crear_dir_memoria()
+    try:
+        yield directorio
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+def crear_pools(etapas=ETAPAS, max_procesos=None, max_procesos_graficos=None, graficos=True, interrumpible=True):
+    """(pool de etapas, pool de renderizado o None sin gráficos) para ejecutar_etapas.
+
+    Con `interrumpible=False` los procesos ignoran Ctrl+C y solo los cierra quien creó los pools.
+    """
+    # Importamos los módulos aquí (pandas, pyarrow...) para que los
+    # procesos del pool los hereden ya cargados en lugar de importarlos otra vez
+    for etapa in etapas.values():
+        importlib.import_module(etapa['modulo'])
+    independientes = sum(1 for etapa in etapas.values() if not etapa['depende_de'])
+    return (ProcessPoolExecutor(max_workers=max_procesos or max(independientes, 1),
+                                initializer=None if interrumpible else ignorar_interrupciones),
+            crear_pool(max_procesos_graficos, interrumpible) if graficos else None)
+
+
+def ejecutar_etapas(opciones_por_etapa=None, etapas=ETAPAS, max_procesos=None, forzar=False,
+                    max_procesos_graficos=None, perfilar=None, perfilador='cprofile', graficos=True, pools=None,
+                    memoria=False):
+    """Ejecuta las etapas respetando sus dependencias; devuelve {etapa: estado}.
+
+    Con `forzar` se ignora el manifiesto y se vuelven a correr todas las etapas.
+    `max_procesos_graficos` limita el pool de renderizado (por defecto, un proceso por núcleo).
+    `perfilar` es el nombre de una etapa a correr bajo `perfilador` ('cprofile' o 'pyinstrument').
+    Con `graficos=False` no se dibuja nada (ni se importa matplotlib).
+    `pools` (de crear_pools) reutiliza procesos ya cargados entre corridas; quien los
+    crea los cierra. Sin `pools` se crean y se cierran aquí.
+    Con `memoria` los datos limpios pasan de una etapa a otra por memoria compartida.
+    """
+    opciones_por_etapa = opciones_por_etapa or {}
+    inicio, reloj = datetime.now(), time.perf_counter()
+    perfil = {'inicio': inicio.isoformat(timespec='seconds'), 'forzar': forzar, 'graficos': graficos,
+              'memoria': memoria, 'opciones': opciones_por_etapa, 'etapas': {}}
+    pendientes = list(etapas)
+    estados = {}
+    en_curso = {}
+    # futuro de un gráfico (o de una copia a 02_limpios) -> etapa; y por etapa, lo que falta para registrarla
+    graficos_en_curso = {}
+    copias_en_curso = {}
+    por_registrar = {}
+    manifiesto = cargar_manifiesto()
+
+    def lista(nombre):
+        return all(estados.get(dependencia) in TERMINADA for dependencia in etapas[nombre]['depende_de'])
+
+    pool, pool_graficos = pools or crear_pools(etapas, max_procesos, max_procesos_graficos, graficos)
+    with _memoria_compartida(memoria) as dir_memoria, \
+            (nullcontext() if pools else pool), (nullcontext() if pools or not graficos else pool_graficos), \
+            (ThreadPoolExecutor() if memoria else nullcontext()) as pool_copias:
+        while pendientes or en_curso or graficos_en_curso or copias_en_curso:
+            for nombre in list(pendientes):
+                dependencias = etapas[nombre]['depende_de']
+                if any(estados.get(dependencia) in (ERROR, OMITIDA) for dependencia in dependencias):
+                    pendientes.remove(nombre)
+                    estados[nombre] = OMITIDA
+                    print(f"\n*** Etapa '{nombre}' omitida: falló una de sus dependencias ({', '.join(dependencias)}). ***")
+                elif lista(nombre):
+                    pendientes.remove(nombre)
+                    # La huella se calcula recién ahora: incluye las salidas de las dependencias
+                    # (en el modo memoria, su copia publicada: los mismos bytes que irán a 02_limpios)
+                    opciones = opciones_por_etapa.get(nombre, {})
+                    etapa = {**etapas[nombre],
+                             'entradas': [ruta_vigente(ruta, dir_memoria) for ruta in etapas[nombre]['entradas']]}
+                    huella = huella_etapa(etapa, opciones if graficos else {**opciones, 'solo_datos': True})
+                    # Sin gráficos también sirve lo que dejó una corrida completa
+                    vigente = etapa_vigente(manifiesto, nombre, huella) or (
+                        not graficos and etapa_vigente(manifiesto, nombre, huella_etapa(etapa, opciones)))
+                    if not forzar and vigente:
+                        estados[nombre] = REUTILIZADA
+                        print(f"\nEtapa '{nombre}' sin cambios en sus entradas; se reutilizan sus salidas.")
+                        continue
+                    print(f"\nEjecutando etapa '{nombre}'...")
+                    captura = None
+                    if nombre == perfilar:
+                        captura = (perfilador, ruta_captura(nombre, perfilador))
+                        perfil['captura'] = captura[1]
+                    futuro = pool.submit(_ejecutar_etapa, nombre, etapas[nombre]['modulo'], opciones, captura,
+                                         dir_memoria)
+                    en_curso[futuro] = (nombre, huella)
+
+            if not en_curso and not graficos_en_curso and not copias_en_curso:
+                if any(lista(nombre) for nombre in pendientes):
+                    # Alguna etapa reutilizada liberó a otras; volvemos a revisar
+                    continue
+                # Lo que quede pendiente depende de etapas que nunca van a terminar
+                for nombre in pendientes:
+                    estados[nombre] = OMITIDA
+                    print(f"\n*** Etapa '{nombre}' omitida: sus dependencias no existen. ***")
+                break
+            terminados, _ = wait(list(en_curso) + list(graficos_en_curso) + list(copias_en_curso),
+                                 return_when=FIRST_COMPLETED)
+            for futuro in terminados:
+                if futuro in graficos_en_curso or futuro in copias_en_curso:
+                    es_grafico = futuro in graficos_en_curso
+                    nombre = (graficos_en_curso if es_grafico else copias_en_curso).pop(futuro)
+                    registro = por_registrar[nombre]
+                    registro['faltan'] -= 1
+                    try:
+                        resultado = futuro.result()
+                        if es_grafico:
+                            perfil['etapas'][nombre].setdefault('graficos', {}).update(arbol(resultado[1]))
+                    except Exception as error:
+                        estados[nombre] = ERROR
+                        accion = 'renderizar un gráfico' if es_grafico else 'copiar a 02_limpios los datos'
+                        print(f"*** ERROR al {accion} de la etapa '{nombre}': {error} ***")
+                        traceback.print_exception(error)
+                    if registro['faltan'] == 0 and estados[nombre] == OK:
+                        _registrar(manifiesto, nombre, por_registrar.pop(nombre))
+                    continue
+
+                nombre, huella = en_curso.pop(futuro)
+                try:
+                    resultado, medido = futuro.result()
+                except Exception as error:
+                    estados[nombre] = ERROR
+                    print(f"*** ERROR en la etapa '{nombre}': {error} ***")
+                    traceback.print_exception(error)
+                    continue
+                # Los datos ya están: las dependientes pueden arrancar mientras se dibuja
+                estados[nombre] = OK
+                perfil['etapas'][nombre] = completar_filas(arbol(medido)[nombre])
+                trabajos = resultado['graficos'] if graficos else []
+                # Lo que la etapa publicó en memoria se copia a 02_limpios sin esperar
+                publicadas = [ruta for ruta in resultado['salidas']
+                              if dir_memoria and ruta_vigente(ruta, dir_memoria) != ruta]
+                por_registrar[nombre] = {'huella': huella, 'faltan': len(trabajos) + len(publicadas),
+                                         'salidas': resultado['salidas'] + rutas_trabajos(trabajos)}
+                for ruta in publicadas:
+                    copias_en_curso[pool_copias.submit(persistir, ruta, dir_memoria)] = nombre
+                for trabajo in trabajos:
+                    graficos_en_curso[pool_graficos.submit(renderizar_con_perfil, trabajo)] = nombre
+                if not trabajos and not publicadas:
+                    _registrar(manifiesto, nombre, por_registrar.pop(nombre))
+
+    perfil['segundos'] = time.perf_counter() - reloj
+    for nombre, estado in estados.items():
+        perfil['etapas'].setdefault(nombre, {})['estado'] = estado
+    print(f"\nPerfil de la corrida guardado en '{guardar_perfil(perfil)}'.")
+    return estados
@@ -0,0 +1,275 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# --- TABLAS DE REGLAS DE LIMPIEZA ---
+# Cada tabla describe, en orden de prioridad, qué palabras clave llevan a cada
+# etiqueta canónica. La primera regla que coincide gana, igual que la cadena de
+# `if ... in texto` que usaban antes las funciones limpiar_*.
+#
+#   'preparacion': cómo se normaliza el texto antes de buscar palabras clave
+#       'minusculas' -> solo texto.lower()
+#       'recortar'   -> texto.lower().strip()
+#       'general'    -> quita \xa0 y tabuladores, strip y lower; vacío = nulo
+#   'reglas':      lista de (etiqueta, {'contiene': [...], 'palabra': [...], 'empieza': [...]})
+#       'palabra' pide la palabra completa: 'mac' no debe coincidir con 'farmacia'
+#   'otro':        etiqueta si ninguna regla coincide
+#   'nulo':        etiqueta para valores vacíos o que no son texto
+#   'categorias':  (opcional) orden de las etiquetas cuando no es el de las reglas
+
+NO_ESPECIFICADO = 'No especificado'
+
+# Versión del motor que interpreta las tablas; subirla invalida todas las cachés
+VERSION_MOTOR = 2
+
+TABLAS = {
+    # --- Encuesta de Economía ---
+    'situacion_economica': {
+        'preparacion': 'minusculas',
+        'reglas': [
+            ('Buena', {'contiene': ['buena']}),
+            ('Estable', {'contiene': ['estable']}),
+            ('Regular', {'contiene': ['regular']}),
+            ('Complicada', {'contiene': ['complicada']}),
+            ('Mala', {'contiene': ['mala']}),
+        ],
+        'otro': 'Otra',
+        'nulo': NO_ESPECIFICADO,
+    },
+    'sentimiento_financiero': {
+        'preparacion': 'minusculas',
+        'reglas': [
+            ('Ansiedad/Preocupación', {'contiene': ['ansiedad', 'preocupación', 'preocupacion']}),
+            ('Tranquilidad', {'contiene': ['tranquilidad']}),
+            ('Indiferencia', {'contiene': ['indiferencia', 'indiferente']}),
+            ('Mixto', {'contiene': ['un poco de todo']}),
+            ('Indiferencia', {'contiene': ['yo no tengo finanzas']}),
+        ],
+        'otro': 'Otro',
+        'nulo': NO_ESPECIFICADO,
+    },
+    'gasto_principal': {
+        'preparacion': 'minusculas',
+        'reglas': [
+            ('Transporte', {'contiene': ['transporte', 'pasajes']}),
+            ('Comida/Alimentos', {'contiene': ['comida', 'lunch', 'despensa']}),
+            ('Renta', {'contiene': ['renta']}),
+            ('Ninguno', {'contiene': ['ninguno']}),
+        ],
+        'otro': 'Otros',
+        'nulo': NO_ESPECIFICADO,
+    },
+    'renuncia_oportunidad': {
+        'preparacion': 'recortar',
+        'reglas': [
+            ('Sí', {'empieza': ['si', 'sí']}),
+            ('No', {'empieza': ['no', 'ninguna', 'ninguno'], 'contiene': ['creo que no']}),
+        ],
+        # Si no es 'Sí' o 'No', lo dejamos como No especificado para revisión
+        'otro': NO_ESPECIFICADO,
+        'nulo': NO_ESPECIFICADO,
+    },
+    'impacto_academico': {
+        'preparacion': 'minusculas',
+        'categorias': ['Ninguno', 'Bajo', 'Medio', 'Alto', NO_ESPECIFICADO],
+        'reglas': [
+            ('Alto', {'contiene': [
+                'alto', 'mucho', 'bastante', 'muy', 'buen',
+                'afecta', 'importante', 'todos los aspectos',
+                'hambre', 'desconcentro', 'cansado'
+            ]}),
+            ('Medio', {'contiene': ['medio', 'media']}),
+            ('Bajo', {'contiene': ['poco']}),
+            ('Ninguno', {'contiene': ['ninguno', 'no tiene', 'ninguna', 'bien,', 'no tendria que ver']}),
+        ],
+        'otro': NO_ESPECIFICADO,
+        'nulo': NO_ESPECIFICADO,
+    },
+    # Carrera y Semestre no tienen gráficos propios: agrupan los reportes por grupo (facetas.py).
+    # Cada carrera conserva su etiqueta para que cada una tenga su propio reporte
+    'carrera': {
+        'preparacion': 'general',
+        'reglas': [
+            ('MAC', {'palabra': ['mac'], 'contiene': ['matemáticas aplicadas', 'matematicas aplicadas']}),
+            ('Actuaría', {'contiene': ['actuaría', 'actuaria']}),
+            ('Arquitectura', {'contiene': ['arquitectura']}),
+            ('Biología', {'contiene': ['biología', 'biologia']}),
+            # 'administración pública' va antes que Administración
+            ('Ciencias Políticas', {'contiene': ['política', 'politica', 'administración pública',
+                                                 'administracion publica']}),
+            ('Administración', {'contiene': ['administración', 'administracion']}),
+            ('Comunicación', {'contiene': ['comunicación', 'comunicacion', 'periodismo']}),
+            ('Contaduría', {'contiene': ['contaduría', 'contaduria']}),
+            ('Derecho', {'contiene': ['derecho']}),
+            ('Diseño Gráfico', {'contiene': ['diseño', 'diseno']}),
+            ('Economía', {'contiene': ['economía', 'economia']}),
+            ('Enfermería', {'contiene': ['enfermería', 'enfermeria']}),
+            ('Enseñanza de Idiomas', {'contiene': ['enseñanza', 'ensenanza', 'idiomas']}),
+            # Químico Farmacéutico Biólogo va antes que Química
+            ('Farmacia', {'contiene': ['farmacia', 'farmacéutic', 'farmaceutic'], 'palabra': ['qfb']}),
+            ('Filosofía', {'contiene': ['filosofía', 'filosofia']}),
+            ('Física', {'contiene': ['física', 'fisica']}),
+            ('Historia', {'contiene': ['historia']}),
+            ('Ingeniería Civil', {'contiene': ['ingeniería civil', 'ingenieria civil']}),
+            ('Ingeniería en Computación', {'contiene': ['computación', 'computacion']}),
+            ('Lengua y Literatura', {'contiene': ['literatura']}),
+            # Medicina Veterinaria y Zootecnia va antes que Medicina
+            ('Veterinaria', {'contiene': ['veterinaria', 'zootecnia']}),
+            ('Medicina', {'contiene': ['medicina', 'médico cirujano', 'medico cirujano']}),
+            ('Odontología', {'contiene': ['odontología', 'odontologia']}),
+            ('Pedagogía', {'contiene': ['pedagogía', 'pedagogia']}),
+            ('Psicología', {'contiene': ['psicología', 'psicologia']}),
+            ('Química', {'contiene': ['química', 'quimica']}),
+            ('Relaciones Internacionales', {'contiene': ['relaciones internacionales']}),
+            ('Sociología', {'contiene': ['sociología', 'sociologia']}),
+        ],
+        'otro': 'Otra',
+        'nulo': NO_ESPECIFICADO,
+    },
+    'semestre': {
+        'preparacion': 'general',
+        # Con dos semestres ("5, 7") cuenta el primero; 10 a 12 van antes que 1
+        'categorias': [str(numero) for numero in range(1, 13)] + [NO_ESPECIFICADO],
+        'reglas': [(str(numero), {'empieza': [str(numero)] + ordinales})
+                   for numero, ordinales in [
+                       (10, ['décimo', 'decimo']), (11, ['onceavo', 'undécimo']), (12, ['doceavo', 'duodécimo']),
+                       (1, ['primer']), (2, ['segundo']), (3, ['tercer']), (4, ['cuarto']), (5, ['quinto']),
+                       (6, ['sexto']), (7, ['séptimo', 'septimo']), (8, ['octavo']), (9, ['noveno'])]],
+        'otro': NO_ESPECIFICADO,
+        'nulo': NO_ESPECIFICADO,
+    },
+
+    # --- Encuesta de Estilo de Vida ---
+    'ansiedad': {
+        'preparacion': 'general',
+        'categorias': ['Ninguno', 'Leve', 'Moderada', 'Grave', NO_ESPECIFICADO],
+        'reglas': [
+            ('Grave', {'contiene': ['grave']}),
+            ('Moderada', {'contiene': ['moderada', 'social', 'moderado']}),
+            ('Leve', {'contiene': ['leve']}),
+            ('Ninguno', {'contiene': ['ninguno', 'ninguna']}),
+        ],
+        'otro': NO_ESPECIFICADO,
+        'nulo': NO_ESPECIFICADO,
+    },
+    'sexo': {
+        'preparacion': 'general',
+        'reglas': [
+            ('Femenino', {'empieza': ['f']}),
+            ('Masculino', {'empieza': ['m', 'h']}),
+        ],
+        'otro': NO_ESPECIFICADO,
+        'nulo': NO_ESPECIFICADO,
+    },
+    'si_no': {
+        'preparacion': 'general',
+        'reglas': [
+            ('Sí', {'contiene': ['si', 'sí', 'sip']}),
+            ('No', {'contiene': ['no', 'nop', 'ninguna']}),
+            ('A veces', {'contiene': ['mas o menos']}),
+        ],
+        'otro': NO_ESPECIFICADO,
+        'nulo': NO_ESPECIFICADO,
+    },
+}
+
+# Columna limpia -> (columna cruda, tabla de reglas)
+COLUMNAS_ECONOMIA = {
+    'Situacion_Economica': ('Situacion_Economica', 'situacion_economica'),
+    'Sentimiento_Financiero': ('Sentimiento_Finanzas', 'sentimiento_financiero'),
+    'Gasto_Principal': ('Gasto_Dificil', 'gasto_principal'),
+    'Renuncia_Oportunidad': ('Renuncia_Oportunidad', 'renuncia_oportunidad'),
+    'Impacto_Academico': ('Impacto_Economico', 'impacto_academico'),
+    'Carrera': ('Carrera', 'carrera'),
+    'Semestre': ('Semestre', 'semestre'),
+}
+
+COLUMNAS_ESTILO_VIDA = {
+    'Sexo': ('Sexo', 'sexo'),
+    'Nivel_Ansiedad': ('Nivel_Ansiedad', 'ansiedad'),
+    'Tiene_Beca': ('Tiene_Beca', 'si_no'),
+    'Siente_Energia': ('Siente_Energia', 'si_no'),
+}
+
+
+
+def categorias_tabla(nombre):
+    """Etiquetas posibles de una tabla, en orden (sirven como categorías ordenadas)."""
+    tabla = TABLAS[nombre]
+    if 'categorias' in tabla:
+        return list(tabla['categorias'])
+    etiquetas = [etiqueta for etiqueta, _ in tabla['reglas']] + [tabla['otro'], tabla['nulo']]
+    return list(dict.fromkeys(etiquetas))
+
+
+def tipo_tabla(nombre):
+    """Categórica ordenada de las etiquetas de una tabla (códigos int8 por fila)."""
+    return pd.CategoricalDtype(categorias_tabla(nombre), ordered=True)
+
+
+# --- Compilación de las Tablas ---
+
+_compiladas = {}
+
+def compilar_tabla(nombre):
+    """Compila una tabla en una sola expresión regular con una rama por regla.
+
+    Cada rama es un lookahead anclado al inicio del texto seguido de un grupo
+    vacío; como la alternancia se prueba de izquierda a derecha, el grupo que
+    captura indica la primera regla (en prioridad) que coincide.
+    """
+    if nombre in _compiladas:
+        return _compiladas[nombre]
+
+    tabla = TABLAS[nombre]
+    ramas = []
+    for _, condiciones in tabla['reglas']:
+        alternativas = []
+        if condiciones.get('contiene'):
+            palabras = '|'.join(re.escape(p) for p in condiciones['contiene'])
+            alternativas.append(f'.*?(?:{palabras})')
+        if condiciones.get('palabra'):
+            palabras = '|'.join(re.escape(p) for p in condiciones['palabra'])
+            alternativas.append(fr'.*?\b(?:{palabras})\b')
+        if condiciones.get('empieza'):
+            prefijos = '|'.join(re.escape(p) for p in condiciones['empieza'])
+            alternativas.append(f'(?:{prefijos})')
+        ramas.append(f"(?={'|'.join(alternativas)})()")
+
+    patron = re.compile(f"^(?:{'|'.join(ramas)})", re.DOTALL)
+    etiquetas = np.array([etiqueta for etiqueta, _ in tabla['reglas']] + [tabla['otro']], dtype=object)
+    _compiladas[nombre] = (patron, etiquetas)
+    return _compiladas[nombre]
+
+
+def preparar_texto(serie, preparacion):
+    """Normaliza una columna de texto; lo que no sea texto queda como nulo."""
+    serie = serie.astype(object)
+    if preparacion == 'general':
+        texto = (serie.str.replace('\xa0', ' ', regex=False)
+                      .str.replace('\t', ' ', regex=False)
+                      .str.strip()
+                      .str.lower())
+        return texto.where(texto != '')
+    if preparacion == 'recortar':
+        return serie.str.lower().str.strip()
+    return serie.str.lower()
+
+
+def aplicar_reglas(serie, nombre_tabla):
+    """Clasifica toda una columna con la tabla indicada, sin recorrerla fila por fila."""
+    tabla = TABLAS[nombre_tabla]
+    patron, etiquetas = compilar_tabla(nombre_tabla)
+
+    if serie.empty or not (pd.api.types.is_object_dtype(serie) or pd.api.types.is_string_dtype(serie)):
+        return pd.Series(tabla['nulo'], index=serie.index, dtype=object)
+
+    texto = preparar_texto(serie, tabla['preparacion'])
+    coincidencias = texto.str.extract(patron, expand=True).notna().to_numpy()
+
+    # Índice de la primera regla que coincide; si ninguna, la etiqueta 'otro'
+    codigos = np.where(coincidencias.any(axis=1), coincidencias.argmax(axis=1), len(etiquetas) - 1)
+    resultado = etiquetas[codigos]
+    resultado[texto.isna().to_numpy()] = tabla['nulo']
+    return pd.Series(resultado, index=serie.index, dtype=object)
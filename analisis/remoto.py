@@ -1,38 +1,117 @@
-import subprocess
 import sys
-import os
-
-print("Iniciando la ejecución de todos los scripts de análisis...")
-scripts_a_ejecutar = [
-    'analizar_economia.py',     # 1. Primero este (genera economia_limpio.csv)
-    'analizar_estilo_vida.py',  # 2. Segundo este (genera estilo_vida_limpio.csv)
-    'analizar_combinado.py'     # 3. Al último (usa los dos CSV anteriores)
-]
-
-python_executable = sys.executable
-
-for script in scripts_a_ejecutar:
-    print(f"\nEjecutando {script}...")
-    try:
-        subprocess.run(
-            [python_executable, script], 
-            check=True, 
-            text=True, 
-            encoding='utf-8'
-        )
-        print(f"\n--- {script} finalizado. ---")
-    
-    except subprocess.CalledProcessError as e:
-        print(f"*** ERROR al ejecutar {script}: ***")
-        print(f"Salida: {e.stdout}")
-        print(f"Error: {e.stderr}")
-        print("Deteniendo la ejecución remota.")
-        break 
-    
-    except FileNotFoundError:
-        print(f"*** ERROR: No se encontró el script '{script}' ***")
-        print("Asegúrate de que todos los scripts estén en la misma carpeta.")
-        print("Deteniendo la ejecución remota.")
-        break
-
-print("\nTodos los scripts han sido ejecutados.")
\ No newline at end of file
+import argparse
+import importlib.util
+import facetas
+from instrumentacion import PERFILADORES
+from planificador import ETAPAS, TERMINADA, ejecutar_etapas
+from union import POLITICA_PREDETERMINADA, POLITICAS_DUPLICADOS
+from vigilancia import vigilar
+
+# --- ORQUESTADOR ---
+# Se puede usar desde la terminal (py remoto.py) o importar desde otro programa:
+#
+#     from remoto import ejecutar
+#     estados = ejecutar(solo_datos=True)   # 02_limpios y 03_kpis, sin gráficos
+#
+# Con `solo_datos` no se importa matplotlib ni seaborn en ningún proceso: los
+# gráficos se cargan solo cuando de verdad se dibujan (renderizado.py).
+#
+# Con --vigilar, remoto.py no termina: vuelve a correr lo necesario cada vez que
+# llega un archivo crudo nuevo (ver vigilancia.py).
+
+
+def ejecutar(solo_datos=False, forzar=False, streaming=False, tamano_bloque=None, exportar_csv=False,
+             incremental=False, duplicados=POLITICA_PREDETERMINADA, particiones=None, procesos=None,
+             procesos_graficos=None, perfilar=None, perfilador='cprofile', facetas_pedidas=(), pools=None,
+             memoria=False):
+    """Ejecuta todas las etapas (y los reportes por grupo pedidos); devuelve {etapa: estado}.
+
+    `pools` (de planificador.crear_pools) reutiliza procesos ya cargados entre corridas.
+    Con `memoria` las etapas se pasan los datos limpios por memoria compartida.
+    """
+    # economia y estilo_vida no dependen entre sí y corren en paralelo;
+    # combinado arranca en cuanto existen los dos archivos limpios
+    # Con --forzar todo se rehace desde cero, así que no tiene sentido el modo incremental
+    incremental = incremental and not forzar
+    opciones_limpieza = {'streaming': streaming, 'exportar_csv': exportar_csv, 'incremental': incremental}
+    if tamano_bloque:
+        opciones_limpieza['tamano_bloque'] = tamano_bloque
+    opciones_por_etapa = {
+        'economia': opciones_limpieza,
+        'estilo_vida': opciones_limpieza,
+        'combinado': {'exportar_csv': exportar_csv, 'incremental': incremental,
+                      'duplicados': duplicados, 'particiones': particiones},
+    }
+
+    estados = ejecutar_etapas(opciones_por_etapa, max_procesos=procesos, forzar=forzar,
+                              max_procesos_graficos=procesos_graficos,
+                              perfilar=perfilar, perfilador=perfilador, graficos=not solo_datos, pools=pools,
+                              memoria=memoria)
+    # Los reportes por grupo parten de los datos ya limpios: no se limpia de nuevo
+    if facetas_pedidas and all(estado in TERMINADA for estado in estados.values()):
+        facetas.ejecutar(facetas_pedidas, procesos_graficos, graficos=not solo_datos)
+    return estados
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Ejecuta todas las etapas de análisis.')
+    parser.add_argument('--solo-datos', action='store_true',
+                        help='Solo limpia, une y calcula los KPIs, sin dibujar gráficos (no carga matplotlib).')
+    parser.add_argument('--streaming', action='store_true',
+                        help='Limpia las encuestas crudas por bloques (memoria acotada).')
+    parser.add_argument('--tamano-bloque', type=int,
+                        help='Filas por bloque en modo streaming.')
+    parser.add_argument('--exportar-csv', action='store_true',
+                        help='Guarda también una copia CSV de los datos limpios.')
+    parser.add_argument('--procesos', type=int,
+                        help='Máximo de etapas en paralelo (por defecto, una por etapa independiente).')
+    parser.add_argument('--procesos-graficos', type=int,
+                        help='Máximo de gráficos renderizándose en paralelo (por defecto, uno por núcleo).')
+    parser.add_argument('--memoria', action='store_true',
+                        help='Pasa los datos limpios de una etapa a otra por memoria compartida; '
+                             '02_limpios se escribe en segundo plano.')
+    parser.add_argument('--forzar', action='store_true',
+                        help='Vuelve a correr todas las etapas aunque sus entradas no hayan cambiado.')
+    parser.add_argument('--duplicados', choices=POLITICAS_DUPLICADOS, default=POLITICA_PREDETERMINADA,
+                        help='Qué respuesta queda si un estudiante contestó más de una vez (por defecto, la última).')
+    parser.add_argument('--particiones', type=int,
+                        help='Une las encuestas por particiones en disco (por defecto, solo si no caben en memoria).')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Procesa solo las respuestas posteriores al último Timestamp de cada encuesta.')
+    parser.add_argument('--perfilar', choices=list(ETAPAS),
+                        help='Corre esta etapa bajo un perfilador y guarda la captura en perfiles/.')
+    parser.add_argument('--perfilador', choices=PERFILADORES, default='cprofile',
+                        help='Perfilador para --perfilar (pyinstrument es opcional; por defecto cProfile).')
+    parser.add_argument('--facetas', nargs='+', metavar='COLUMNAS',
+                        help='Al terminar, genera el reporte completo de cada grupo (p. ej. Carrera Semestre; '
+                             '"Carrera,Semestre" cruza ambas) en subcarpetas de resultados/ (ver facetas.py).')
+    parser.add_argument('--vigilar', action='store_true',
+                        help='No termina: vuelve a correr las etapas afectadas cada vez que cambia un CSV crudo.')
+    args = parser.parse_args()
+    facetas_pedidas = facetas.leer_facetas(parser, args.facetas) if args.facetas else []
+    if args.perfilar and args.perfilador == 'pyinstrument' and importlib.util.find_spec('pyinstrument') is None:
+        parser.error("pyinstrument no está instalado (pip install pyinstrument) o usa --perfilador cprofile.")
+
+    opciones = dict(solo_datos=args.solo_datos, forzar=args.forzar, streaming=args.streaming,
+                    tamano_bloque=args.tamano_bloque, exportar_csv=args.exportar_csv, incremental=args.incremental,
+                    duplicados=args.duplicados, particiones=args.particiones, procesos=args.procesos,
+                    procesos_graficos=args.procesos_graficos, perfilar=args.perfilar,
+                    perfilador=args.perfilador, facetas_pedidas=facetas_pedidas, memoria=args.memoria)
+    if args.vigilar:
+        # --forzar solo vale para la primera corrida; después se rehace solo lo que cambió
+        forzar = iter([args.forzar])
+        vigilar(lambda pools: ejecutar(**{**opciones, 'forzar': next(forzar, False)}, pools=pools),
+                args.procesos, args.procesos_graficos, graficos=not args.solo_datos)
+        sys.exit(0)
+
+    print("Iniciando la ejecución de todas las etapas de análisis...")
+    estados = ejecutar(**opciones)
+
+    print("\n--- Resumen de etapas ---")
+    for etapa in ETAPAS:
+        print(f"{etapa}: {estados.get(etapa)}")
+    if all(estado in TERMINADA for estado in estados.values()):
+        print("\nTodas las etapas han sido ejecutadas.")
+    else:
+        print("\nAlgunas etapas no terminaron; revisa los errores de arriba.")
+        sys.exit(1)
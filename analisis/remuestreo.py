@@ -0,0 +1,157 @@
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from cubo import conteo, dir_kpis, total
+
+# --- INTERVALOS DE CONFIANZA POR BOOTSTRAP ---
+# Cada KPI de los gráficos (conteo, proporción, celda de una tabla cruzada,
+# promedio o mediana por grupo) lleva su intervalo de confianza bootstrap.
+#
+# Remuestrear las N respuestas con reemplazo equivale a repartir N respuestas
+# entre las celdas del cubo con una multinomial de probabilidades n_celda / N,
+# así que no hace falta volver a las filas: cada KPI colapsa el cubo a sus propias
+# celdas (más una celda de "resto" con las respuestas que no entran en él, por
+# ejemplo por un filtro) y saca todas las remuestras de una vez, como una matriz
+# (remuestras x celdas). Los KPIs de todas las remuestras salen de operaciones
+# con esa matriz, sin un ciclo por remuestra, y el costo no depende de N.
+#
+# Los intervalos son percentiles de las remuestras; con la semilla fija, una
+# misma corrida da siempre los mismos intervalos (y los mismos PNG).
+
+REPETICIONES = 2000
+NIVEL = 0.95
+SEMILLA = 0
+
+
+def ruta_intervalos(nombre):
+    return os.path.join(dir_kpis, f'{nombre}_intervalos.csv')
+
+
+def remuestrear(conteos, n_total, repeticiones=REPETICIONES, semilla=SEMILLA):
+    """Matriz (repeticiones x celdas) con cuántas respuestas de cada celda entran en cada remuestra."""
+    conteos = np.asarray(conteos, dtype='int64')
+    if n_total == 0:
+        return np.zeros((repeticiones, len(conteos)), dtype='int64')
+    probabilidades = np.append(conteos, n_total - conteos.sum()) / n_total
+    rng = np.random.default_rng(semilla)
+    # La última columna es el resto: respuestas de otras celdas, que no cuentan para este KPI
+    return rng.multinomial(n_total, probabilidades, size=repeticiones)[:, :-1]
+
+
+def _percentiles(muestras, nivel):
+    alfa = (1 - nivel) / 2 * 100
+    if muestras.shape[1] == 0:
+        # KPI sin celdas (un filtro que nadie cumple): intervalos vacíos
+        return np.empty(0), np.empty(0)
+    with warnings.catch_warnings():
+        # Un grupo puede quedar vacío en todas las remuestras (intervalo NaN)
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return np.nanpercentile(muestras, [alfa, 100 - alfa], axis=0)
+
+
+def _intervalos(estimacion, muestras, medida, nivel):
+    inferior, superior = _percentiles(muestras, nivel)
+    return pd.DataFrame({'estimacion': np.asarray(estimacion, dtype=float), 'inferior': inferior,
+                         'superior': superior, 'medida': medida}, index=estimacion.index)
+
+
+def _dividir(numerador, denominador):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return numerador / denominador
+
+
+# --- KPIs ---
+
+def intervalo_conteo(cubo, dimensiones, filtro=None, nivel=NIVEL, repeticiones=REPETICIONES):
+    """Como conteo(), con columnas estimacion, inferior y superior."""
+    conteos = conteo(cubo, dimensiones, filtro)
+    muestras = remuestrear(conteos, total(cubo), repeticiones)
+    return _intervalos(conteos, muestras, 'conteo', nivel)
+
+
+def intervalo_proporcion(cubo, dimension, filtro=None, nivel=NIVEL, repeticiones=REPETICIONES):
+    """Proporción de cada valor de `dimension` dentro de las respuestas que entran en el gráfico."""
+    conteos = conteo(cubo, dimension, filtro)
+    muestras = remuestrear(conteos, total(cubo), repeticiones)
+    proporciones = _dividir(muestras, muestras.sum(axis=1, keepdims=True))
+    return _intervalos(conteos / conteos.sum(), proporciones, 'proporcion', nivel)
+
+
+def _celdas_por_grupo(cubo, por, medida, filtro):
+    # Celdas (grupo, valor) con valor no nulo, ordenadas por grupo y por valor; los
+    # grupos quedan como texto, igual que en conteo() (ver cubo._etiquetas)
+    celdas = conteo(cubo, [por, medida], filtro)
+    grupos, etiquetas = pd.factorize(celdas.index.get_level_values(0))
+    valores = celdas.index.get_level_values(1).to_numpy(dtype=float)
+    return celdas, grupos, pd.Index(np.asarray(etiquetas, dtype=object), name=por), valores
+
+
+def intervalo_promedio(cubo, por, medida, filtro=None, nivel=NIVEL, repeticiones=REPETICIONES):
+    """Promedio de `medida` (una dimensión numérica del cubo) por valor de `por`, con su intervalo."""
+    celdas, grupos, etiquetas, valores = _celdas_por_grupo(cubo, por, medida, filtro)
+    indicadora = np.zeros((len(celdas), len(etiquetas)))
+    indicadora[np.arange(len(celdas)), grupos] = 1
+    sumas = indicadora * valores[:, None]
+    muestras = remuestrear(celdas, total(cubo), repeticiones)
+    medias = _dividir(muestras @ sumas, muestras @ indicadora)
+    estimacion = pd.Series(_dividir(celdas.to_numpy() @ sumas, celdas.to_numpy() @ indicadora), index=etiquetas)
+    return _intervalos(estimacion, medias, 'promedio', nivel)
+
+
+def _medianas(frecuencias, valores):
+    # Mediana de cada fila de `frecuencias` (remuestras x valores ordenados), con la
+    # misma interpolación que graficos.estadisticas_caja
+    acumuladas = np.cumsum(frecuencias, axis=1)
+    n = acumuladas[:, -1]
+    h = 0.5 * (n - 1)
+    bajo = np.floor(h)
+
+    def valor_en(posicion):
+        indices = (acumuladas <= posicion[:, None]).sum(axis=1)
+        return valores[np.minimum(indices, len(valores) - 1)]
+
+    siguiente = np.minimum(bajo + 1, n - 1)
+    medianas = valor_en(bajo) + (h - bajo) * (valor_en(siguiente) - valor_en(bajo))
+    return np.where(n > 0, medianas, np.nan)
+
+
+def intervalo_mediana(cubo, por, medida, filtro=None, nivel=NIVEL, repeticiones=REPETICIONES):
+    """Mediana de `medida` por valor de `por`, con su intervalo (muescas de los boxplots)."""
+    celdas, grupos, etiquetas, valores = _celdas_por_grupo(cubo, por, medida, filtro)
+    muestras = remuestrear(celdas, total(cubo), repeticiones)
+    medianas = np.empty((repeticiones, len(etiquetas)))
+    estimacion = np.empty(len(etiquetas))
+    for grupo in range(len(etiquetas)):
+        columnas = grupos == grupo
+        medianas[:, grupo] = _medianas(muestras[:, columnas], valores[columnas])
+        estimacion[grupo] = _medianas(celdas.to_numpy()[None, columnas], valores[columnas])[0]
+    return _intervalos(pd.Series(estimacion, index=etiquetas), medianas, 'mediana', nivel)
+
+
+# --- Artefacto de KPIs ---
+
+def tabla_intervalos(trabajos, nivel=NIVEL, repeticiones=REPETICIONES):
+    """Los intervalos de todos los trabajos de gráficos, uno por fila (KPI, categoría)."""
+    partes = []
+    for _, _, ruta, estilo in trabajos:
+        intervalos = estilo.get('intervalos')
+        if intervalos is None:
+            continue
+        categorias = [' × '.join(map(str, clave)) if isinstance(clave, tuple) else str(clave)
+                      for clave in intervalos.index]
+        partes.append(intervalos.reset_index(drop=True).assign(
+            kpi=os.path.splitext(os.path.basename(ruta))[0], categoria=categorias))
+    columnas = ['kpi', 'categoria', 'medida', 'estimacion', 'inferior', 'superior']
+    if not partes:
+        return pd.DataFrame(columns=columnas)
+    return pd.concat(partes, ignore_index=True)[columnas].assign(nivel=nivel, repeticiones=repeticiones)
+
+
+def guardar_intervalos(trabajos, nombre):
+    os.makedirs(dir_kpis, exist_ok=True)
+    ruta = ruta_intervalos(nombre)
+    tabla_intervalos(trabajos).to_csv(ruta, index=False)
+    return ruta
@@ -0,0 +1,181 @@
+import hashlib
+import os
+import shutil
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from instrumentacion import medir, recoger
+
+# --- POOL DE RENDERIZADO ---
+# Los gráficos (trabajos de graficos.py) se dibujan en un pool de procesos propio:
+# cada proceso tiene su estado de pyplot y codifica sus PNG por separado, así que
+# el tiempo total depende de los núcleos disponibles y no de la cantidad de
+# gráficos. El backend Agg se fija al iniciar cada proceso, antes de cargar pyplot.
+#
+# --- CACHÉ DE GRÁFICOS ---
+# Cada trabajo tiene una huella: el tipo de gráfico, el agregado exacto que
+# dibuja (valores, índice y columnas), su estilo (título, paleta, dpi,
+# intervalos...) y la versión de graficos.py, matplotlib y seaborn. El PNG de
+# cada huella se guarda en data/cache/graficos/. Si el PNG de la ruta ya es el de
+# esa huella no se dibuja ni se codifica nada; si la huella ya está en la caché
+# (una variante anterior, otro grupo con los mismos números) se copia el PNG.
+# Cuando la caché pasa de LIMITE_CACHE_MB se borran las variantes usadas hace
+# más tiempo. Con usar_cache=False (benchmark.py) se dibuja todo y la caché ni
+# se lee ni se escribe.
+
+dir_cache = '../data/cache/graficos/'
+LIMITE_CACHE_MB = 200
+
+
+def ignorar_interrupciones():
+    # Ctrl+C lo atiende el proceso principal (modo vigilancia), que cierra los pools
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _inicializar_proceso(interrumpible=True):
+    if not interrumpible:
+        ignorar_interrupciones()
+    os.environ['MPLBACKEND'] = 'Agg'
+    import matplotlib
+    matplotlib.use('Agg')
+    # Carga matplotlib y seaborn una sola vez por proceso, no una por gráfico
+    import graficos  # noqa: F401
+
+
+def _actualizar(digest, valor):
+    # Agrega `valor` a la huella; los DataFrame y Series entran por sus valores
+    # exactos (hash de pandas) junto con su índice, columnas y tipos
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        digest.update(repr((type(valor).__name__, valor.shape, valor.index.names, valor.dtypes)).encode())
+        _actualizar(digest, list(valor.columns) if isinstance(valor, pd.DataFrame) else valor.name)
+        _actualizar(digest, list(valor.index))
+        digest.update(pd.util.hash_pandas_object(valor, index=False).to_numpy().tobytes())
+    elif isinstance(valor, dict):
+        digest.update(b'{')
+        for clave in sorted(valor, key=str):
+            _actualizar(digest, clave)
+            _actualizar(digest, valor[clave])
+        digest.update(b'}')
+    elif isinstance(valor, (list, tuple)):
+        digest.update(b'[')
+        for elemento in valor:
+            _actualizar(digest, elemento)
+        digest.update(b']')
+    elif isinstance(valor, np.ndarray):
+        digest.update(repr((valor.dtype, valor.shape)).encode())
+        digest.update(np.ascontiguousarray(valor).tobytes())
+    else:
+        digest.update(f'{type(valor).__name__}:{valor!r};'.encode())
+
+
+_version_graficos = None
+
+
+def version_graficos():
+    """Huella del código que dibuja: graficos.py y las versiones de matplotlib y seaborn."""
+    global _version_graficos
+    if _version_graficos is None:
+        import matplotlib
+        import seaborn
+        import graficos
+        with open(graficos.__file__, 'rb') as archivo:
+            codigo = archivo.read()
+        _version_graficos = hashlib.sha256(
+            codigo + f'{matplotlib.__version__}|{seaborn.__version__}'.encode()).hexdigest()
+    return _version_graficos
+
+
+def huella_trabajo(trabajo):
+    """Huella de lo que se ve en el PNG de un trabajo; no depende de su ruta."""
+    tipo, datos, _, estilo = trabajo
+    digest = hashlib.sha256(version_graficos().encode())
+    _actualizar(digest, [tipo, datos, estilo])
+    return digest.hexdigest()[:32]
+
+
+def _copiar(origen, destino):
+    # Copia atómica: nadie ve un PNG a medio escribir
+    temporal = f'{destino}.{os.getpid()}.tmp'
+    shutil.copyfile(origen, temporal)
+    os.replace(temporal, destino)
+
+
+def _mismo_contenido(ruta_a, ruta_b):
+    if os.path.getsize(ruta_a) != os.path.getsize(ruta_b):
+        return False
+    with open(ruta_a, 'rb') as a, open(ruta_b, 'rb') as b:
+        return a.read() == b.read()
+
+
+def podar_cache(limite_mb=LIMITE_CACHE_MB):
+    """Borra las variantes usadas hace más tiempo hasta que la caché quede bajo el límite."""
+    try:
+        entradas = [entrada for entrada in os.scandir(dir_cache) if entrada.name.endswith('.png')]
+    except FileNotFoundError:
+        return
+    entradas = sorted(((entrada.stat().st_mtime, entrada.stat().st_size, entrada.path) for entrada in entradas),
+                      reverse=True)
+    ocupado = 0
+    for _, tamano, ruta in entradas:
+        ocupado += tamano
+        if ocupado > limite_mb * 1024 * 1024:
+            try:
+                os.remove(ruta)
+            except FileNotFoundError:  # otro proceso del pool ya la borró
+                pass
+
+
+def renderizar_trabajo(trabajo, usar_cache=True):
+    """Dibuja un trabajo (tipo, datos, ruta, estilo); devuelve su ruta.
+
+    Si la huella del trabajo ya está en la caché no se dibuja: se reutiliza el PNG.
+    """
+    import graficos
+    tipo, datos, ruta, estilo = trabajo
+    os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+    if not usar_cache:
+        with medir(os.path.basename(ruta), filas_entrada=len(datos)):
+            graficos.GRAFICOS[tipo](datos, ruta, **estilo)
+        return ruta
+    with medir(os.path.basename(ruta), filas_entrada=len(datos)):
+        en_cache = os.path.join(dir_cache, f'{huella_trabajo(trabajo)}.png')
+        try:
+            # Marca la variante como usada ahora (la poda borra primero las viejas)
+            os.utime(en_cache)
+            if not (os.path.exists(ruta) and _mismo_contenido(en_cache, ruta)):
+                _copiar(en_cache, ruta)
+            return ruta
+        except FileNotFoundError:  # variante nueva (o recién podada por otro proceso): se dibuja
+            pass
+        graficos.GRAFICOS[tipo](datos, ruta, **estilo)
+        os.makedirs(dir_cache, exist_ok=True)
+        _copiar(ruta, en_cache)
+    podar_cache()
+    return ruta
+
+
+def renderizar_con_perfil(trabajo):
+    """Como renderizar_trabajo, pero devuelve (ruta, lo medido) para el perfil de la corrida."""
+    ruta = renderizar_trabajo(trabajo)
+    return ruta, recoger()
+
+
+def crear_pool(max_procesos=None, interrumpible=True):
+    return ProcessPoolExecutor(max_workers=max_procesos or os.cpu_count(),
+                               initializer=_inicializar_proceso, initargs=(interrumpible,))
+
+
+def rutas_trabajos(trabajos):
+    return [ruta for _, _, ruta, _ in trabajos]
+
+
+def renderizar(trabajos, max_procesos=None, usar_cache=True):
+    """Dibuja todos los trabajos en paralelo y espera a que terminen; devuelve sus rutas."""
+    if not trabajos:
+        return []
+    with crear_pool(min(len(trabajos), max_procesos or os.cpu_count())) as pool:
+        return list(pool.map(partial(renderizar_trabajo, usar_cache=usar_cache), trabajos))
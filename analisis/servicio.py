@@ -0,0 +1,225 @@
+import argparse
+import json
+import os
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from almacen import EXTENSIONES, TIPOS_ETIQUETAS, leer_limpio, ruta_limpio
+from cubo import calcular_cubo, conteo, promedio, tabla_cruzada
+
+# --- SERVICIO LOCAL DE KPIs ---
+# Un servidor HTTP (solo biblioteca estándar) que carga una vez los datos limpios
+# (economía, estilo de vida y el combinado) y contesta consultas de KPIs desde
+# memoria, sin volver a correr el análisis:
+#
+#   /conteo?por=Sexo&Carrera=MAC                      estudiantes por valor
+#   /tabla_cruzada?filas=Situacion_Economica&columnas=Nivel_Ansiedad
+#   /promedio?por=Sentimiento_Financiero&medida=Promedio_Escolar
+#   /                                                  conjuntos y sus columnas
+#
+# `conjunto` elige los datos (por defecto, el combinado); cualquier otro
+# parámetro con nombre de columna es un filtro (Carrera=MAC). Cada consulta se
+# resuelve igual que los gráficos: un cubo de sus dimensiones y las lecturas de
+# cubo.py. La respuesta JSON ya codificada queda en una caché LRU.
+#
+# Antes de contestar se revisa (con un stat) si el archivo limpio del conjunto
+# cambió; si cambió, se vuelve a cargar y se descartan sus resultados en caché.
+# Cada petición se atiende en su propio hilo: solo se bloquea al tocar la caché
+# o al recargar un conjunto, nunca mientras se calcula una consulta.
+
+CONJUNTOS = ['economia', 'estilo_vida', 'combinado']
+CONJUNTO_PREDETERMINADO = 'combinado'
+MEDIDAS = ['Promedio_Escolar', 'Horas_Sueño']
+TAMANO_CACHE = 256
+PUERTO = 8765
+
+# Parámetros de cada consulta (lo demás son filtros)
+CONSULTAS = {
+    'conteo': ['por'],
+    'tabla_cruzada': ['filas', 'columnas'],
+    'promedio': ['por', 'medida'],
+}
+
+
+class ConsultaInvalida(ValueError):
+    pass
+
+
+def _firma(nombre):
+    # Cambia cada vez que la etapa reescribe su archivo limpio (siempre con os.replace)
+    firma = []
+    for formato in EXTENSIONES:
+        try:
+            estado = os.stat(ruta_limpio(nombre, formato))
+            firma.append((estado.st_mtime_ns, estado.st_size))
+        except FileNotFoundError:
+            firma.append(None)
+    return tuple(firma)
+
+
+def _calcular(df, consulta, parametros, filtro):
+    dimensiones = [parametros[nombre] for nombre in CONSULTAS[consulta] if nombre != 'medida']
+    medidas = [parametros['medida']] if consulta == 'promedio' else []
+    cubo = calcular_cubo(df, list(dict.fromkeys(dimensiones + list(filtro))), medidas)
+    if consulta == 'conteo':
+        resultado = conteo(cubo, parametros['por'], filtro).rename('n')
+    elif consulta == 'tabla_cruzada':
+        resultado = tabla_cruzada(cubo, parametros['filas'], parametros['columnas'], filtro)
+        resultado = resultado.rename_axis(columns=None)
+    else:
+        resultado = promedio(cubo, parametros['por'], parametros['medida'], filtro).rename(parametros['medida'])
+    return json.loads(resultado.reset_index().to_json(orient='records', force_ascii=False))
+
+
+class ServicioKPIs:
+    """Datos limpios en memoria y caché LRU de respuestas ya codificadas."""
+
+    def __init__(self, tamano_cache=TAMANO_CACHE):
+        self.tamano_cache = tamano_cache
+        self._datos = {}
+        self._cache = OrderedDict()
+        self._candado_cache = threading.Lock()
+        self._candados_carga = {nombre: threading.Lock() for nombre in CONJUNTOS}
+        self.aciertos = self.fallos = 0
+
+    def datos(self, nombre):
+        """El conjunto en memoria y su firma; lo (re)carga si el archivo limpio cambió."""
+        firma = _firma(nombre)
+        cargado = self._datos.get(nombre)
+        if cargado and cargado[0] == firma:
+            return cargado
+        with self._candados_carga[nombre]:
+            cargado = self._datos.get(nombre)
+            if not (cargado and cargado[0] == firma):
+                cargado = self._datos[nombre] = (firma, leer_limpio(nombre))
+                self._descartar(nombre)
+        return cargado
+
+    def _descartar(self, nombre):
+        with self._candado_cache:
+            for clave in [clave for clave in self._cache if clave[0] == nombre]:
+                del self._cache[clave]
+
+    def consultar(self, consulta, parametros):
+        """Respuesta JSON (bytes) de una consulta; `parametros` es un dict de texto."""
+        if consulta not in CONSULTAS:
+            raise ConsultaInvalida(f"Consulta desconocida '{consulta}'; opciones: {', '.join(CONSULTAS)}.")
+        parametros = dict(parametros)
+        conjunto = parametros.pop('conjunto', CONJUNTO_PREDETERMINADO)
+        if conjunto not in CONJUNTOS:
+            raise ConsultaInvalida(f"Conjunto desconocido '{conjunto}'; opciones: {', '.join(CONJUNTOS)}.")
+        faltantes = [nombre for nombre in CONSULTAS[consulta] if nombre not in parametros]
+        if faltantes:
+            raise ConsultaInvalida(f"La consulta '{consulta}' necesita {', '.join(faltantes)}.")
+
+        firma, df = self.datos(conjunto)
+        clave = (conjunto, firma, consulta, tuple(sorted(parametros.items())))
+        with self._candado_cache:
+            if clave in self._cache:
+                self._cache.move_to_end(clave)
+                self.aciertos += 1
+                return self._cache[clave]
+            self.fallos += 1
+
+        filtro = {columna: valor for columna, valor in parametros.items() if columna not in CONSULTAS[consulta]}
+        categoricas = [columna for columna in df.columns if columna in TIPOS_ETIQUETAS]
+        for columna in [parametros[nombre] for nombre in CONSULTAS[consulta] if nombre != 'medida'] + list(filtro):
+            if columna not in categoricas:
+                raise ConsultaInvalida(f"'{columna}' no es una columna categórica de {conjunto}; "
+                                       f"opciones: {', '.join(categoricas)}.")
+        medidas = [columna for columna in MEDIDAS if columna in df.columns]
+        if consulta == 'promedio' and parametros['medida'] not in medidas:
+            raise ConsultaInvalida(f"'{parametros['medida']}' no es una medida de {conjunto}; "
+                                   f"opciones: {', '.join(medidas)}.")
+
+        respuesta = json.dumps({
+            'consulta': consulta, 'conjunto': conjunto, 'filtro': filtro,
+            'resultado': _calcular(df, consulta, parametros, filtro),
+        }, ensure_ascii=False).encode('utf-8')
+        with self._candado_cache:
+            self._cache[clave] = respuesta
+            while len(self._cache) > self.tamano_cache:
+                self._cache.popitem(last=False)
+        return respuesta
+
+    def resumen(self):
+        conjuntos = {}
+        for nombre in CONJUNTOS:
+            try:
+                _, df = self.datos(nombre)
+            except FileNotFoundError:
+                continue
+            conjuntos[nombre] = {
+                'filas': len(df),
+                'categoricas': [columna for columna in df.columns if columna in TIPOS_ETIQUETAS],
+                'medidas': [columna for columna in MEDIDAS if columna in df.columns],
+            }
+        with self._candado_cache:
+            cache = {'entradas': len(self._cache), 'tamano': self.tamano_cache,
+                     'aciertos': self.aciertos, 'fallos': self.fallos}
+        return json.dumps({'consultas': CONSULTAS, 'conjuntos': conjuntos, 'cache': cache},
+                          ensure_ascii=False).encode('utf-8')
+
+
+def crear_manejador(servicio):
+    class Manejador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlsplit(self.path)
+            consulta = url.path.strip('/')
+            try:
+                if consulta == '':
+                    respuesta = servicio.resumen()
+                else:
+                    respuesta = servicio.consultar(consulta, parse_qsl(url.query))
+                self._responder(200, respuesta)
+            except ConsultaInvalida as error:
+                self._responder(400, json.dumps({'error': str(error)}, ensure_ascii=False).encode('utf-8'))
+            except FileNotFoundError:
+                self._responder(503, json.dumps(
+                    {'error': 'No se encontraron los datos limpios; ejecuta primero remoto.py.'},
+                    ensure_ascii=False).encode('utf-8'))
+            except Exception as error:
+                # Sin esto el hilo muere y el cliente se queda sin respuesta
+                self.log_error('Error al atender %s: %r', self.path, error)
+                self._responder(500, json.dumps({'error': f'Error interno: {error}'},
+                                                ensure_ascii=False).encode('utf-8'))
+
+        def _responder(self, codigo, cuerpo):
+            self.send_response(codigo)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+    return Manejador
+
+
+def servir(host='127.0.0.1', puerto=PUERTO, tamano_cache=TAMANO_CACHE):
+    servicio = ServicioKPIs(tamano_cache)
+    # Carga los conjuntos al arrancar para que la primera consulta no espere
+    for nombre in CONJUNTOS:
+        try:
+            servicio.datos(nombre)
+        except FileNotFoundError:
+            print(f"Aviso: todavía no hay datos limpios de {nombre}.")
+    servidor = ThreadingHTTPServer((host, puerto), crear_manejador(servicio))
+    servidor.daemon_threads = True
+    print(f"Servicio de KPIs en http://{host}:{puerto}/ (Ctrl+C para detener).")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Servicio HTTP local que contesta consultas de KPIs desde memoria.')
+    parser.add_argument('--host', default='127.0.0.1', help='Dirección en la que escucha (por defecto, solo local).')
+    parser.add_argument('--puerto', type=int, default=PUERTO, help=f'Puerto (por defecto, {PUERTO}).')
+    parser.add_argument('--tamano-cache', type=int, default=TAMANO_CACHE,
+                        help=f'Respuestas que se guardan en la caché LRU (por defecto, {TAMANO_CACHE}).')
+    args = parser.parse_args()
+    servir(args.host, args.puerto, args.tamano_cache)
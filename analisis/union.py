@@ -0,0 +1,216 @@
+import json
+import math
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from almacen import EscritorLimpio, aplicar_tipos, pa, ruta_limpio, ruta_vigente
+from instrumentacion import medir
+
+# --- UNIÓN POR NUMERO_CUENTA ---
+# Une dos conjuntos limpios por número de cuenta (entero, Int64):
+#   - Las filas sin número de cuenta no se unen; solo se cuentan en el informe.
+#   - Si un estudiante contestó más de una vez, la política de duplicados decide
+#     qué respuesta queda: 'ultima' (Timestamp más reciente), 'primera', o
+#     'todas' (como pd.merge: cada respuesta se une con cada respuesta del otro lado).
+#   - El Timestamp de cada lado solo sirve para elegir entre duplicados y no pasa
+#     a la unión (cada encuesta tiene el suyo).
+#   - Cada lado se ordena por clave una sola vez (IndiceClaves); el mismo índice
+#     sirve para emparejar y para contar claves coincidentes y no coincidentes.
+#   - Si los dos conjuntos no caben en memoria, se reparten por clave en
+#     particiones en disco (clave % particiones) y se unen de a una partición.
+
+CLAVE = 'Numero_Cuenta'
+TIEMPO = 'Timestamp'
+POLITICAS_DUPLICADOS = ('ultima', 'primera', 'todas')
+POLITICA_PREDETERMINADA = 'ultima'
+
+dir_particiones = '../data/cache/union/'
+
+# Fracción de la memoria disponible que puede usar la unión en memoria
+FRACCION_MEMORIA = 0.25
+# Memoria que ocupa la unión en pandas respecto del tamaño de los archivos
+FACTOR_MEMORIA = 4
+
+
+def depurar(df, politica=POLITICA_PREDETERMINADA):
+    """Quita filas sin clave y, según la política, respuestas repetidas.
+
+    Devuelve (df depurado en su orden original, {'filas', 'sin_clave', 'duplicados'}).
+    """
+    if politica not in POLITICAS_DUPLICADOS:
+        raise ValueError(f"Política de duplicados desconocida: '{politica}' (usa {', '.join(POLITICAS_DUPLICADOS)}).")
+    con_clave = df[df[CLAVE].notna()]
+    depurado = con_clave
+    if politica != 'todas':
+        # Las respuestas sin Timestamp válido cuentan como las más antiguas
+        orden = con_clave.sort_values(TIEMPO, kind='stable', na_position='first')
+        quedan = ~orden.duplicated(CLAVE, keep='last' if politica == 'ultima' else 'first')
+        depurado = con_clave[quedan.reindex(con_clave.index)]
+    return depurado, {
+        'filas': len(df),
+        'sin_clave': len(df) - len(con_clave),
+        'duplicados': len(con_clave) - len(depurado),
+    }
+
+
+class IndiceClaves:
+    """Claves de un lado de la unión, ordenadas una sola vez."""
+
+    def __init__(self, claves):
+        claves = np.asarray(claves, dtype='int64')
+        self.orden = np.argsort(claves, kind='stable')
+        self.claves = claves[self.orden]
+
+    def unicas(self):
+        if len(self.claves) == 0:
+            return self.claves
+        return self.claves[np.concatenate(([True], self.claves[1:] != self.claves[:-1]))]
+
+    def emparejar(self, claves):
+        """Pares (posición en `claves`, posición en este lado) con la misma clave.
+
+        Respeta el orden de `claves` y, dentro de una clave repetida, el de este lado.
+        """
+        claves = np.asarray(claves, dtype='int64')
+        desde = np.searchsorted(self.claves, claves, side='left')
+        cuantas = np.searchsorted(self.claves, claves, side='right') - desde
+        posiciones = np.repeat(np.arange(len(claves)), cuantas)
+        inicio_grupo = np.repeat(np.cumsum(cuantas) - cuantas, cuantas)
+        desplazamiento = np.arange(len(posiciones)) - inicio_grupo
+        return posiciones, self.orden[np.repeat(desde, cuantas) + desplazamiento]
+
+
+def claves_de(df):
+    return df[CLAVE].to_numpy(dtype='int64')
+
+
+def armar(izq, der, posiciones_izq, posiciones_der):
+    """Filas unidas: columnas de `izq` y luego las de `der` sin la clave (como pd.merge)."""
+    return pd.concat([izq.drop(columns=TIEMPO).iloc[posiciones_izq].reset_index(drop=True),
+                      der.drop(columns=[CLAVE, TIEMPO]).iloc[posiciones_der].reset_index(drop=True)], axis=1)
+
+
+def informe_claves(indice_izq, indice_der, nombres):
+    """Claves distintas de cada lado, cuántas coinciden y cuántas quedan sin pareja."""
+    unicas_izq, unicas_der = indice_izq.unicas(), indice_der.unicas()
+    coincidencias = len(np.intersect1d(unicas_izq, unicas_der, assume_unique=True))
+    izq, der = nombres
+    return {
+        f'claves_{izq}': len(unicas_izq),
+        f'claves_{der}': len(unicas_der),
+        'coincidencias': coincidencias,
+        f'solo_{izq}': len(unicas_izq) - coincidencias,
+        f'solo_{der}': len(unicas_der) - coincidencias,
+    }
+
+
+def guardar_informe(informe, ruta):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        json.dump(informe, archivo, indent=2, ensure_ascii=False)
+    return ruta
+
+
+def sumar_informes(acumulado, nuevo):
+    return {clave: sumar_informes(acumulado.get(clave, {}), valor) if isinstance(valor, dict)
+            else acumulado.get(clave, 0) + valor for clave, valor in nuevo.items()}
+
+
+# --- Unión en memoria o por particiones ---
+
+def memoria_disponible():
+    """Bytes de memoria física disponibles, o None si el sistema no lo informa."""
+    # MemAvailable cuenta también la caché de páginas que el kernel puede soltar;
+    # la memoria libre (SC_AVPHYS_PAGES) la deja fuera y suele ser mucho menor
+    try:
+        with open('/proc/meminfo', encoding='ascii') as archivo:
+            campos = dict(linea.split(':', 1) for linea in archivo)
+        return int(campos['MemAvailable'].split()[0]) * 1024
+    except (OSError, KeyError, ValueError):
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def particiones_necesarias(nombres):
+    """Cuántas particiones hacen falta para unir `nombres` (1 = cabe en memoria)."""
+    disponible = memoria_disponible()
+    rutas = [ruta_vigente(ruta_limpio(nombre, 'feather')) for nombre in nombres]
+    if pa is None or disponible is None or not all(os.path.exists(ruta) for ruta in rutas):
+        return 1
+    necesaria = FACTOR_MEMORIA * sum(os.path.getsize(ruta) for ruta in rutas)
+    return max(1, math.ceil(necesaria / (disponible * FRACCION_MEMORIA)))
+
+
+def _particionar(nombre, particiones):
+    """Reparte un conjunto limpio en `particiones` archivos Arrow según su clave, lote por lote."""
+    rutas = [os.path.join(dir_particiones, f'{nombre}_{numero}.arrow') for numero in range(particiones)]
+    with pa.memory_map(ruta_vigente(ruta_limpio(nombre, 'feather'))) as fuente:
+        lector = pa.ipc.open_file(fuente)
+        escritores = [pa.ipc.new_file(ruta, lector.schema) for ruta in rutas]
+        for numero_lote in range(lector.num_record_batches):
+            lote = lector.get_batch(numero_lote)
+            # Las claves nulas van a la partición 0; ahí se descartan al depurar
+            claves = lote.column(CLAVE).fill_null(0).to_numpy()
+            destinos = claves % particiones
+            for numero, escritor in enumerate(escritores):
+                seleccion = np.flatnonzero(destinos == numero)
+                if len(seleccion):
+                    escritor.write_batch(lote.take(pa.array(seleccion)))
+        for escritor in escritores:
+            escritor.close()
+    return rutas
+
+
+def _leer_particion(ruta):
+    with pa.memory_map(ruta) as fuente:
+        return aplicar_tipos(pa.ipc.open_file(fuente).read_pandas())
+
+
+def unir_particionado(izq, der, politica, particiones, agregar, formatos, destino):
+    """Une los conjuntos limpios `izq` y `der` partición por partición, escribiendo en `destino`.
+
+    Solo una partición de cada lado está en memoria a la vez. `agregar(df)` devuelve
+    el cubo de cada partición unida. Devuelve (rutas, cubos por partición, informe).
+    """
+    shutil.rmtree(dir_particiones, ignore_errors=True)
+    os.makedirs(dir_particiones)
+    try:
+        with medir('particionado'):
+            rutas_izq = _particionar(izq, particiones)
+            rutas_der = _particionar(der, particiones)
+        escritor = EscritorLimpio(destino, formatos)
+        cubos, informe = [], {}
+        for ruta_izq, ruta_der in zip(rutas_izq, rutas_der):
+            with medir('lectura') as paso:
+                df_izq, df_der = _leer_particion(ruta_izq), _leer_particion(ruta_der)
+                paso['filas_salida'] = len(df_izq) + len(df_der)
+            with medir('union', filas_entrada=len(df_izq) + len(df_der)) as paso:
+                df_unido, informe_particion = unir_depurados(df_izq, df_der, politica, (izq, der))
+                paso['filas_salida'] = len(df_unido)
+            with medir('escritura', filas_entrada=len(df_unido)):
+                escritor.escribir(df_unido)
+            with medir('cubo', filas_entrada=len(df_unido)):
+                cubos.append(agregar(df_unido))
+            informe = sumar_informes(informe, informe_particion)
+        escritor.cerrar()
+    finally:
+        shutil.rmtree(dir_particiones, ignore_errors=True)
+    informe['particiones'] = particiones
+    return list(escritor.rutas.values()), cubos, informe
+
+
+def unir_depurados(df_izq, df_der, politica, nombres):
+    """Depura ambos lados y los une en memoria; devuelve (df unido, informe)."""
+    df_izq, informe_izq = depurar(df_izq, politica)
+    df_der, informe_der = depurar(df_der, politica)
+    indice_izq, indice_der = IndiceClaves(claves_de(df_izq)), IndiceClaves(claves_de(df_der))
+    df_unido = armar(df_izq, df_der, *indice_der.emparejar(claves_de(df_izq)))
+    informe = {nombres[0]: informe_izq, nombres[1]: informe_der,
+               **informe_claves(indice_izq, indice_der, nombres), 'filas_unidas': len(df_unido)}
+    return df_unido, informe
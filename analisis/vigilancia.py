@@ -0,0 +1,97 @@
+import os
+import time
+
+from planificador import ETAPAS, TERMINADA, crear_pools
+
+# --- MODO VIGILANCIA ---
+# Proceso de larga duración que revisa los archivos crudos (data/01_crudos/) y
+# vuelve a correr el análisis en cuanto llega una exportación nueva, sin que
+# nadie tenga que acordarse de ejecutar remoto.py.
+#
+# Cada INTERVALO segundos se hace un stat de los CSV crudos que leen las etapas
+# (no se abre ningún archivo). Una exportación suele escribirse en varias
+# ráfagas, así que después del primer cambio se espera a que los archivos pasen
+# ESPERA segundos sin cambiar antes de correr nada.
+#
+# Solo se rehace la parte afectada: las etapas que leen los archivos que
+# cambiaron y las que dependen de ellas (combinado y asociaciones). Las demás
+# quedan reutilizadas por el manifiesto, como en cualquier corrida. Los pools de
+# etapas y de renderizado se crean una sola vez y se reutilizan: sus procesos
+# conservan pandas, pyarrow y matplotlib ya cargados entre una corrida y otra.
+
+INTERVALO = 0.5
+ESPERA = 2.0
+
+
+def archivos_crudos(etapas=ETAPAS):
+    """{ruta de un archivo crudo: etapa que lo lee} (las etapas sin dependencias)."""
+    return {os.path.normpath(ruta): nombre for nombre, etapa in etapas.items()
+            if not etapa['depende_de'] for ruta in etapa['entradas']}
+
+
+def _firmas(rutas):
+    firmas = {}
+    for ruta in rutas:
+        try:
+            estado = os.stat(ruta)
+            firmas[ruta] = (estado.st_mtime_ns, estado.st_size)
+        except FileNotFoundError:
+            firmas[ruta] = None
+    return firmas
+
+
+def esperar_cambios(firmas, intervalo=INTERVALO, espera=ESPERA):
+    """Espera a que cambie algún archivo de `firmas` y luego pase `espera` segundos quieto.
+
+    Devuelve (firmas actuales, rutas que cambiaron).
+    """
+    actuales = firmas
+    while actuales == firmas:
+        time.sleep(intervalo)
+        actuales = _firmas(firmas)
+    ultimo_cambio = time.monotonic()
+    while time.monotonic() - ultimo_cambio < espera:
+        time.sleep(intervalo)
+        nuevas = _firmas(firmas)
+        if nuevas != actuales:
+            actuales, ultimo_cambio = nuevas, time.monotonic()
+    return actuales, [ruta for ruta in firmas if actuales[ruta] != firmas[ruta]]
+
+
+def afectadas(etapas_cambiadas, etapas=ETAPAS):
+    """Las etapas cambiadas y todas las que dependen de ellas, en el orden de `etapas`."""
+    afectadas = set(etapas_cambiadas)
+    for nombre, etapa in etapas.items():
+        if afectadas & set(etapa['depende_de']):
+            afectadas.add(nombre)
+    return [nombre for nombre in etapas if nombre in afectadas]
+
+
+def vigilar(correr, max_procesos=None, max_procesos_graficos=None, graficos=True,
+            etapas=ETAPAS, intervalo=INTERVALO, espera=ESPERA):
+    """Corre `correr(pools)` al iniciar y cada vez que llega un archivo crudo nuevo, hasta Ctrl+C.
+
+    `correr` recibe los pools de crear_pools y devuelve {etapa: estado}, como remoto.ejecutar.
+    """
+    archivos = archivos_crudos(etapas)
+    pool, pool_graficos = pools = crear_pools(etapas, max_procesos, max_procesos_graficos, graficos,
+                                                 interrumpible=False)
+    try:
+        # La primera corrida pone al día lo que haya cambiado mientras nadie vigilaba
+        firmas = _firmas(archivos)
+        correr(pools)
+        while True:
+            print(f"\nVigilando {', '.join(archivos)} (Ctrl+C para detener)...")
+            firmas, cambiadas = esperar_cambios(firmas, intervalo, espera)
+            rehacer = afectadas({archivos[ruta] for ruta in cambiadas}, etapas)
+            print(f"\nCambió {', '.join(cambiadas)}: se rehacen {', '.join(rehacer)}.")
+            inicio = time.perf_counter()
+            estados = correr(pools)
+            resultado = 'listo' if all(estado in TERMINADA for estado in estados.values()) else 'con errores'
+            print(f"\nResultados actualizados ({resultado}) en {time.perf_counter() - inicio:.1f} s.")
+    except KeyboardInterrupt:
+        print("\nVigilancia detenida.")
+    finally:
+        pool.shutdown(cancel_futures=True)
+        if pool_graficos is not None:
+            pool_graficos.shutdown(cancel_futures=True)